@@ -0,0 +1,29 @@
+CREATE INDEX IF NOT EXISTS idx_executions_started ON executions(started_at, id);
+CREATE INDEX IF NOT EXISTS idx_executions_user_started ON executions(user_id, started_at, id);
+CREATE INDEX IF NOT EXISTS idx_executions_status_started ON executions(status, started_at, id);
+
+-- External-content FTS index over intents, keyed by the executions rowid.
+-- Rowids of a table without an INTEGER PRIMARY KEY can change on a full VACUUM,
+-- so run INSERT INTO executions_fts(executions_fts) VALUES ('rebuild') after one.
+CREATE VIRTUAL TABLE IF NOT EXISTS executions_fts USING fts5(
+    intent,
+    content='executions',
+    content_rowid='rowid'
+);
+
+CREATE TRIGGER IF NOT EXISTS executions_fts_ai AFTER INSERT ON executions BEGIN
+    INSERT INTO executions_fts(rowid, intent) VALUES (new.rowid, new.intent);
+END;
+
+CREATE TRIGGER IF NOT EXISTS executions_fts_ad AFTER DELETE ON executions BEGIN
+    INSERT INTO executions_fts(executions_fts, rowid, intent)
+    VALUES ('delete', old.rowid, old.intent);
+END;
+
+CREATE TRIGGER IF NOT EXISTS executions_fts_au AFTER UPDATE OF intent ON executions BEGIN
+    INSERT INTO executions_fts(executions_fts, rowid, intent)
+    VALUES ('delete', old.rowid, old.intent);
+    INSERT INTO executions_fts(rowid, intent) VALUES (new.rowid, new.intent);
+END;
+
+INSERT INTO executions_fts(executions_fts) VALUES ('rebuild');
@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS idx_audit_execution ON audit_log(execution_id);
+CREATE INDEX IF NOT EXISTS idx_audit_timestamp ON audit_log(timestamp);
@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS node_runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    execution_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    node_type TEXT,
+    tool_name TEXT,
+    attempt INT NOT NULL,
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL,
+    queued_ms REAL,
+    started_ms REAL,
+    ended_ms REAL,
+    error TEXT,
+    healing_strategy TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_node_runs_execution ON node_runs(execution_id, started_ms);
@@ -0,0 +1,57 @@
+-- Full-text index over entity names and fact text (attributes.raw).
+-- The content table is a view so the index stores no second copy of the text and
+-- 'rebuild' works; like executions_fts it is keyed by the entities rowid and must
+-- be rebuilt after a full VACUUM.
+CREATE VIEW IF NOT EXISTS entities_fts_source AS
+SELECT
+    rowid AS rid,
+    name,
+    CASE WHEN json_valid(attributes)
+        THEN coalesce(json_extract(attributes, '$.raw'), '')
+        ELSE ''
+    END AS body
+FROM entities;
+
+CREATE VIRTUAL TABLE IF NOT EXISTS entities_fts USING fts5(
+    name,
+    body,
+    content='entities_fts_source',
+    content_rowid='rid',
+    prefix='2 3',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS entities_fts_ai AFTER INSERT ON entities BEGIN
+    INSERT INTO entities_fts(rowid, name, body)
+    SELECT rid, name, body FROM entities_fts_source WHERE rid = new.rowid;
+END;
+
+CREATE TRIGGER IF NOT EXISTS entities_fts_ad AFTER DELETE ON entities BEGIN
+    INSERT INTO entities_fts(entities_fts, rowid, name, body)
+    VALUES (
+        'delete',
+        old.rowid,
+        old.name,
+        CASE WHEN json_valid(old.attributes)
+            THEN coalesce(json_extract(old.attributes, '$.raw'), '')
+            ELSE ''
+        END
+    );
+END;
+
+CREATE TRIGGER IF NOT EXISTS entities_fts_au AFTER UPDATE OF name, attributes ON entities BEGIN
+    INSERT INTO entities_fts(entities_fts, rowid, name, body)
+    VALUES (
+        'delete',
+        old.rowid,
+        old.name,
+        CASE WHEN json_valid(old.attributes)
+            THEN coalesce(json_extract(old.attributes, '$.raw'), '')
+            ELSE ''
+        END
+    );
+    INSERT INTO entities_fts(rowid, name, body)
+    SELECT rid, name, body FROM entities_fts_source WHERE rid = new.rowid;
+END;
+
+INSERT INTO entities_fts(entities_fts) VALUES ('rebuild');
@@ -0,0 +1,29 @@
+-- One row per (type, name) for extracted entities; facts are excluded because their
+-- name is a 128-character prefix of the statement, which distinct facts may share.
+-- Existing duplicates are merged into the oldest row and their relationships repointed.
+CREATE TEMP TABLE entity_merge AS
+SELECT d.id AS dup_id, k.id AS keep_id
+FROM (
+    SELECT type, name, MIN(rowid) AS keep_rowid
+    FROM entities
+    WHERE type != 'fact'
+    GROUP BY type, name
+    HAVING COUNT(*) > 1
+) g
+JOIN entities k ON k.rowid = g.keep_rowid
+JOIN entities d ON d.type = g.type AND d.name = g.name AND d.rowid != g.keep_rowid;
+
+UPDATE relationships
+SET source_id = (SELECT keep_id FROM entity_merge WHERE dup_id = relationships.source_id)
+WHERE source_id IN (SELECT dup_id FROM entity_merge);
+
+UPDATE relationships
+SET target_id = (SELECT keep_id FROM entity_merge WHERE dup_id = relationships.target_id)
+WHERE target_id IN (SELECT dup_id FROM entity_merge);
+
+DELETE FROM entities WHERE id IN (SELECT dup_id FROM entity_merge);
+
+DROP TABLE entity_merge;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_entities_type_name_unique
+ON entities(type, name) WHERE type != 'fact';
@@ -0,0 +1,43 @@
+-- Hierarchical summaries: 'window' rows summarise a run of new facts and fold into a
+-- rolling 'day' row; a day folds into its 'week' (period_start = Monday) once the next
+-- day starts. parent_id points at the row a summary was folded into.
+ALTER TABLE summaries ADD COLUMN level TEXT NOT NULL DEFAULT 'window';
+ALTER TABLE summaries ADD COLUMN period_start TIMESTAMP;
+ALTER TABLE summaries ADD COLUMN period_end TIMESTAMP;
+ALTER TABLE summaries ADD COLUMN parent_id TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_summaries_period
+ON summaries(level, period_start) WHERE level != 'window';
+CREATE INDEX IF NOT EXISTS idx_summaries_level_created ON summaries(level, created_at);
+
+-- Facts in insertion order, for folding everything after the summary cursor.
+CREATE INDEX IF NOT EXISTS idx_entities_fact_created
+ON entities(created_at, id) WHERE type = 'fact';
+
+-- facts_added only ever grows (TTL deletes do not touch it), so the pending count
+-- facts_added - facts_folded is a single-row read instead of COUNT(*) over facts.
+CREATE TABLE IF NOT EXISTS summary_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    facts_added INTEGER NOT NULL DEFAULT 0,
+    facts_folded INTEGER NOT NULL DEFAULT 0,
+    cursor_created_at TIMESTAMP NOT NULL DEFAULT '',
+    cursor_id TEXT NOT NULL DEFAULT ''
+);
+
+-- Facts stored before this migration count as already summarised.
+INSERT OR IGNORE INTO summary_state (id, facts_added, facts_folded, cursor_created_at, cursor_id)
+SELECT 1, (SELECT COUNT(*) FROM entities WHERE type = 'fact'),
+       (SELECT COUNT(*) FROM entities WHERE type = 'fact'),
+       coalesce(created_at, ''), id
+FROM (
+    SELECT created_at, id FROM entities WHERE type = 'fact'
+    UNION ALL SELECT '', ''
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+);
+
+CREATE TRIGGER IF NOT EXISTS summary_state_fact_ai AFTER INSERT ON entities
+WHEN NEW.type = 'fact'
+BEGIN
+    UPDATE summary_state SET facts_added = facts_added + 1 WHERE id = 1;
+END;
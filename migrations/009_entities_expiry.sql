@@ -0,0 +1,4 @@
+-- Expired entities are found by range scan instead of a full table scan; rows
+-- without a TTL stay out of the index.
+CREATE INDEX IF NOT EXISTS idx_entities_expires
+ON entities(expires_at) WHERE expires_at IS NOT NULL;
@@ -0,0 +1,11 @@
+-- Reads bump access_count and last_accessed_at (batched by the access tracker).
+-- Cold-tier scans order by last access, falling back to creation for unread rows.
+ALTER TABLE entities ADD COLUMN last_accessed_at TIMESTAMP;
+
+-- Reads were never counted before this migration, so every existing row counts as
+-- read now: tiering starts judging them tier_cold_after_days after the upgrade
+-- rather than moving the whole graph out on the first sweep.
+UPDATE entities SET last_accessed_at = strftime('%Y-%m-%dT%H:%M:%f', 'now');
+
+CREATE INDEX IF NOT EXISTS idx_entities_last_access
+ON entities(coalesce(last_accessed_at, created_at));
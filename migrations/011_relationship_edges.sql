@@ -0,0 +1,41 @@
+-- One row per (source, target, type) edge: repeats bump `mentions` and fold their
+-- confidence into a strength that halves every knowledge.relationship_half_life_days
+-- (as of last_seen_at). mentioned_in edges no longer copy the statement into
+-- `context`; it is the target fact's attributes.raw.
+ALTER TABLE relationships ADD COLUMN mentions INTEGER NOT NULL DEFAULT 1;
+ALTER TABLE relationships ADD COLUMN last_seen_at TIMESTAMP;
+
+UPDATE relationships SET last_seen_at = created_at;
+
+UPDATE relationships SET context = NULL WHERE relation_type = 'mentioned_in';
+
+-- Existing duplicates collapse into the oldest row; their strengths are summed
+-- without decay.
+CREATE TEMP TABLE edge_groups AS
+SELECT MIN(rowid) AS keep_rowid, source_id, target_id, relation_type,
+       COUNT(*) AS mentions, SUM(coalesce(strength, 0)) AS strength,
+       MAX(created_at) AS last_seen_at
+FROM relationships
+GROUP BY source_id, target_id, relation_type
+HAVING COUNT(*) > 1;
+
+UPDATE relationships
+SET mentions = g.mentions, strength = g.strength, last_seen_at = g.last_seen_at
+FROM edge_groups AS g
+WHERE relationships.rowid = g.keep_rowid;
+
+DELETE FROM relationships
+WHERE EXISTS (
+    SELECT 1 FROM edge_groups g
+    WHERE g.source_id IS relationships.source_id
+      AND g.target_id IS relationships.target_id
+      AND g.relation_type = relationships.relation_type
+      AND g.keep_rowid != relationships.rowid
+);
+
+DROP TABLE edge_groups;
+
+-- The unique index also serves source_id lookups, replacing idx_rel_source.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_rel_edge
+ON relationships(source_id, target_id, relation_type);
+DROP INDEX IF EXISTS idx_rel_source;
@@ -0,0 +1,7 @@
+-- Facts are unique by a hash of their normalised text (casefolded, whitespace
+-- collapsed). Facts stored before this migration get a hash from
+-- POST /knowledge/reindex; older exact duplicates keep a NULL hash.
+ALTER TABLE entities ADD COLUMN content_hash TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_entities_content_hash
+ON entities(content_hash) WHERE content_hash IS NOT NULL;
@@ -0,0 +1,17 @@
+-- Workspace files indexed into the graph, keyed by path relative to the workspace
+-- root. size + mtime_ns decide whether a file needs re-reading; content_hash whether
+-- a re-read file actually changed.
+CREATE TABLE IF NOT EXISTS documents (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    chunks INTEGER NOT NULL DEFAULT 0,
+    indexed_at TIMESTAMP
+);
+
+-- Facts stored from a document keep its path in attributes.source; re-indexing a
+-- changed or deleted file looks its previous chunks up by that path.
+CREATE INDEX IF NOT EXISTS idx_entities_source
+ON entities(json_extract(attributes, '$.source'))
+WHERE json_extract(attributes, '$.source') IS NOT NULL;
@@ -0,0 +1,8 @@
+-- Indexes and triggers dropped for a bulk import, with the SQL that recreates them.
+-- The import restores them when it finishes; KnowledgeGraph.init restores any left
+-- behind by an interrupted import.
+CREATE TABLE IF NOT EXISTS deferred_schema (
+    name TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    sql TEXT NOT NULL
+);
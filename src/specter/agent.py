@@ -1,14 +1,22 @@
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Callable, Coroutine
 from dataclasses import dataclass, field
+from typing import Any
 
 from .brain.orchestrator import Orchestrator
-from .config import AgentConfig, SpecterConfig
+from .config import AgentConfig, SpecterConfig, settings
+from .core.backends import build_backend
 from .core.security import ToolPolicy, load_tool_policy
 from .knowledge.graph import KnowledgeGraph
 from .skills.forge import SkillForge
 from .storage import ExecutionStore
 
+# Background loops of every initialised runtime, keyed by job and database path so
+# runtimes sharing a database run each job once.
+_background: dict[str, asyncio.Task[None]] = {}
+
 
 @dataclass
 class AgentRuntime:
@@ -19,13 +27,45 @@ class AgentRuntime:
     forge: SkillForge
     policy: ToolPolicy
     initialized: bool = field(default=False)
+    tasks: list[asyncio.Task[None]] = field(default_factory=list)
 
     async def init(self) -> None:
         if self.initialized:
             return
+        await self.store.init()
         await self.kg.init()
-        await self.orchestrator.skills.load_from_db(self.store.db_path)
+        await self.orchestrator.skills.load_from_db(self.store.db)
         self.initialized = True
+        self._start_background()
+
+    def _start_background(self) -> None:
+        """Start the ANN rebuild, TTL sweep and retention loops for this runtime's databases."""
+        path = self.kg.db.db_path
+        if self.kg.ann.enabled:
+            self._spawn(f"ann:{path}", self.kg.ann.run_periodically)
+        if settings.specter.knowledge.ttl_sweep_interval_seconds > 0:
+            self._spawn(f"ttl:{path}", self.kg.sweep_periodically)
+        if settings.specter.retention.enabled:
+            for engine in self.store.retention_engines:
+                self._spawn(f"retention:{engine.db.db_path}", engine.run_periodically)
+
+    def _spawn(self, key: str, loop: Callable[[], Coroutine[Any, Any, None]]) -> None:
+        task = _background.get(key)
+        if task is None or task.done():
+            _background[key] = task = asyncio.create_task(loop())
+            self.tasks.append(task)
+
+    async def close(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for key, task in list(_background.items()):
+            if task in self.tasks:
+                del _background[key]
+        self.tasks.clear()
+        await self.kg.close()
+        await self.store.close()
+        await self.store.backend.close()
 
 
 def resolve_agent_config(config: SpecterConfig, agent_id: str) -> AgentConfig | None:
@@ -50,9 +90,11 @@ def build_agent_runtime(config: SpecterConfig, agent_id: str) -> AgentRuntime:
     agent_cfg = resolve_agent_config(config, agent_id)
     db_path = resolve_db_path(config, agent_id)
     policy = load_tool_policy(agent_cfg.security if agent_cfg else config.security)
-    store = ExecutionStore(db_path=db_path)
-    kg = KnowledgeGraph(db_path=db_path)
+    backend = build_backend(db_path, config.storage)
+    store = ExecutionStore(db_path=db_path, backend=backend)
+    kg = KnowledgeGraph(db_path=db_path, db=backend.home)
     orchestrator = Orchestrator(store=store, policy=policy)
+    orchestrator.skills.register_memory_tools(kg)
     forge = SkillForge(orchestrator.skills.register)
     return AgentRuntime(
         agent_id=agent_id,
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from .config import settings
+from .core.serialization import dumpb, loads
+
+BLOB_KEY = "$blob"
+_DIGEST_RE = re.compile(r"[0-9a-f]{64}")
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and isinstance(value.get(BLOB_KEY), str)
+
+
+class BlobStore:
+    """Content-addressed files named by the SHA-256 of their bytes.
+
+    Identical payloads are stored once. Values whose JSON encoding exceeds
+    ``threshold`` bytes are replaced by a small reference via :meth:`spill`.
+    """
+
+    def __init__(self, root: str | Path | None = None, threshold: int | None = None) -> None:
+        cfg = settings.specter.storage
+        self.root = Path(root or cfg.blob_dir or Path(settings.specter.data_dir) / "blobs")
+        self.threshold = cfg.blob_threshold_bytes if threshold is None else threshold
+
+    def path(self, digest: str) -> Path:
+        if not _DIGEST_RE.fullmatch(digest):
+            raise ValueError(f"Invalid blob digest: {digest}")
+        return self.root / digest[:2] / digest
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest).exists()
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        target = self.path(digest)
+        if target.exists():
+            return digest
+        target.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=target.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        return digest
+
+    def read(self, digest: str) -> bytes:
+        return b"".join(self.iter_chunks(digest))
+
+    def iter_chunks(self, digest: str, chunk_size: int = 256 * 1024) -> Iterator[bytes]:
+        with open(self.path(digest), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for offset in range(0, len(mm), chunk_size):
+                    yield mm[offset : offset + chunk_size]
+
+    def spill(self, value: Any) -> Any:
+        """Return ``value`` unchanged if small, otherwise a reference to its stored JSON."""
+        if is_blob_ref(value):
+            return value
+        data = dumpb(value)
+        if len(data) <= self.threshold:
+            return value
+        return {
+            BLOB_KEY: self.put(data),
+            "size": len(data),
+            "media_type": "application/json",
+            "preview": data[:256].decode(errors="ignore"),
+        }
+
+    def load(self, ref: dict[str, Any]) -> Any:
+        return loads(self.read(ref[BLOB_KEY]))
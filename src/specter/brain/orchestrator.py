@@ -2,21 +2,28 @@ from __future__ import annotations
 
 from typing import Any
 
+import structlog
+
+from ..blobs import BlobStore
 from ..core.security import ToolPolicy
 from ..graph.compiler import IntentCompiler
 from ..graph.executor import StreamingExecutor
 from ..graph.streaming import StreamCallback
+from ..graph.trace import ExecutionTrace
 from ..healing.engine import HealingEngine
 from ..skills.manager import SkillManager
 from ..storage import ExecutionStore
 
+logger = structlog.get_logger(__name__)
+
 
 class Orchestrator:
     def __init__(self, store: ExecutionStore, policy: ToolPolicy) -> None:
         self.skills = SkillManager()
         self.healer = HealingEngine()
         self.compiler = IntentCompiler()
-        self.executor = StreamingExecutor(self.skills, self.healer, policy)
+        self.blobs = BlobStore()
+        self.executor = StreamingExecutor(self.skills, self.healer, policy, blobs=self.blobs)
         self.store = store
 
     async def run(
@@ -34,10 +41,17 @@ class Orchestrator:
 
         self.skills.set_audit_hook(audit)
 
+        trace = ExecutionTrace()
         try:
-            result = await self.executor.execute(graph, callback, audit=audit)
+            result = await self.executor.execute(graph, callback, audit=audit, trace=trace)
             await self.store.complete_execution(exec_id, result)
             return {"execution_id": exec_id, "result": result}
         except Exception as exc:  # noqa: BLE001
             await self.store.fail_execution(exec_id, str(exc))
             raise
+        finally:
+            try:
+                await self.store.add_node_runs(exec_id, trace.runs)
+            except Exception:  # noqa: BLE001
+                # Never mask the execution's own outcome with a trace write failure.
+                logger.exception("node_runs_write_failed", execution_id=exec_id)
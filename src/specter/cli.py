@@ -3,6 +3,7 @@ from __future__ import annotations
 import argparse
 import json
 import os
+import time
 from pathlib import Path
 
 import httpx
@@ -40,7 +41,17 @@ def cmd_exec_get(args: argparse.Namespace) -> None:
 
 def cmd_exec_list(args: argparse.Namespace) -> None:
     url = f"{_base_url()}/executions"
-    resp = httpx.get(url, timeout=30)
+    params = {
+        "limit": args.limit,
+        "cursor": args.cursor,
+        "user_id": args.user_id,
+        "status": args.status,
+        "since": args.since,
+        "until": args.until,
+        "q": args.query,
+    }
+    params = {k: v for k, v in params.items() if v is not None}
+    resp = httpx.get(url, params=params, timeout=30)
     resp.raise_for_status()
     _print(resp.json())
 
@@ -52,6 +63,82 @@ def cmd_exec_replay(args: argparse.Namespace) -> None:
     _print(resp.json())
 
 
+def cmd_ann_bench(args: argparse.Namespace) -> None:
+    url = f"{_base_url()}/knowledge/ann/benchmark"
+    params = {"user_id": args.user_id, "queries": args.queries, "k": args.k}
+    resp = httpx.get(url, params=params, timeout=600)
+    resp.raise_for_status()
+    _print(resp.json())
+
+
+def cmd_kg_import(args: argparse.Namespace) -> None:
+    url = f"{_base_url()}/knowledge/facts"
+    started = time.perf_counter()
+    total = 0
+
+    def send(batch: list[str]) -> None:
+        nonlocal total
+        resp = httpx.post(
+            url, params={"user_id": args.user_id}, json={"statements": batch}, timeout=600
+        )
+        resp.raise_for_status()
+        total += len(batch)
+        rate = total / max(time.perf_counter() - started, 1e-9)
+        print(f"imported {total} facts ({rate:.0f}/s)")
+
+    batch: list[str] = []
+    with open(args.file, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if args.jsonl:
+                line = json.loads(line)[args.field]
+            batch.append(line)
+            if len(batch) >= args.batch:
+                send(batch)
+                batch = []
+    if batch:
+        send(batch)
+
+
+def cmd_kg_index(args: argparse.Namespace) -> None:
+    base = f"{_base_url()}/knowledge/documents"
+    params = {"user_id": args.user_id}
+    resp = httpx.post(f"{base}/index", params={**params, "path": args.path}, timeout=30)
+    if resp.status_code != 409:
+        resp.raise_for_status()
+    progress = resp.json()
+    while progress.get("running"):
+        print(
+            f"{progress['indexed']} indexed, {progress['unchanged']} unchanged "
+            f"of {progress['files']} files, {progress['chunks']} chunks "
+            f"({progress['files_per_s']:.0f} files/s)"
+        )
+        time.sleep(args.interval)
+        resp = httpx.get(base, params=params, timeout=30)
+        resp.raise_for_status()
+        progress = resp.json()
+    _print(progress)
+
+
+def cmd_kg_export(args: argparse.Namespace) -> None:
+    url = f"{_base_url()}/knowledge/export"
+    resp = httpx.post(url, params={"user_id": args.user_id, "path": args.path}, timeout=None)
+    resp.raise_for_status()
+    _print(resp.json())
+
+
+def cmd_kg_load(args: argparse.Namespace) -> None:
+    url = f"{_base_url()}/knowledge/import"
+    params = {"user_id": args.user_id, "path": args.path}
+    if args.defer_indexes is not None:
+        params["defer_indexes"] = args.defer_indexes
+    resp = httpx.post(url, params=params, timeout=None)
+    resp.raise_for_status()
+    _print(resp.json())
+
+
 def cmd_skill_install(args: argparse.Namespace) -> None:
     data = json.loads(Path(args.file).read_text(encoding="utf-8"))
     payload = {
@@ -82,12 +169,55 @@ def build_parser() -> argparse.ArgumentParser:
     eg.set_defaults(func=cmd_exec_get)
 
     el = sub.add_parser("exec-list", help="List executions")
+    el.add_argument("--limit", type=int, default=20)
+    el.add_argument("--cursor", default=None, help="next_cursor from a previous page")
+    el.add_argument("--user-id", default=None)
+    el.add_argument("--status", default=None)
+    el.add_argument("--since", default=None, help="ISO timestamp (inclusive)")
+    el.add_argument("--until", default=None, help="ISO timestamp (exclusive)")
+    el.add_argument("--query", "-q", default=None, help="Full-text search over intents")
     el.set_defaults(func=cmd_exec_list)
 
     er = sub.add_parser("exec-replay", help="Replay execution")
     er.add_argument("exec_id")
     er.set_defaults(func=cmd_exec_replay)
 
+    ab = sub.add_parser("ann-bench", help="Recall/latency of the memory ANN index vs exact")
+    ab.add_argument("--user-id", default="local")
+    ab.add_argument("--queries", type=int, default=100)
+    ab.add_argument("--k", type=int, default=10)
+    ab.set_defaults(func=cmd_ann_bench)
+
+    ki = sub.add_parser("kg-import", help="Bulk-import facts (one per line) into memory")
+    ki.add_argument("file")
+    ki.add_argument("--user-id", default="local")
+    ki.add_argument("--batch", type=int, default=500)
+    ki.add_argument("--jsonl", action="store_true", help="Read JSON lines instead of text")
+    ki.add_argument("--field", default="text", help="JSON field holding the fact")
+    ki.set_defaults(func=cmd_kg_import)
+
+    kx = sub.add_parser("kg-index", help="Index workspace documents into memory")
+    kx.add_argument("path", nargs="?", default=".", help="Relative to the workspace root")
+    kx.add_argument("--user-id", default="local")
+    kx.add_argument("--interval", type=float, default=2.0, help="Seconds between progress polls")
+    kx.set_defaults(func=cmd_kg_index)
+
+    ke = sub.add_parser("kg-export", help="Export memory to a bundle directory")
+    ke.add_argument("path", help="Bundle directory, relative to the server's workspace root")
+    ke.add_argument("--user-id", default="local")
+    ke.set_defaults(func=cmd_kg_export)
+
+    kl = sub.add_parser("kg-load", help="Merge a bundle written by kg-export into memory")
+    kl.add_argument("path", help="Bundle directory, relative to the server's workspace root")
+    kl.add_argument("--user-id", default="local")
+    kl.add_argument(
+        "--defer-indexes",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Rebuild indexes once at the end (default: when the bundle is the larger side)",
+    )
+    kl.set_defaults(func=cmd_kg_load)
+
     si = sub.add_parser("skill-install", help="Install skill from JSON")
     si.add_argument("file")
     si.set_defaults(func=cmd_skill_install)
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Literal
+
 from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -28,11 +30,80 @@ class ExecutionConfig(BaseModel):
 class KnowledgeConfig(BaseModel):
     graph_pruning: bool = True
     vector_cache_size: int = 10_000
+    embedder: str = "hashing"  # hashing|litellm
+    embedding_dim: int = 256
+    embedding_model: str | None = None
+    ann_enabled: bool = True
+    ann_min_entities: int = 20_000
+    ann_nlist: int = 0  # 0 = sqrt(entities)
+    ann_nprobe: int = 16
+    ann_rebuild_ratio: float = 0.2
+    ann_rebuild_interval_seconds: int = 300
+    retrieval_budget_ms: int = 150
+    retrieval_rrf_k: int = 60
+    neighbourhood_cache_size: int = 4096
+    entity_cache_size: int = 50_000
+    gazetteer_min_chars: int = 3
+    relationship_half_life_days: float = 30.0
+    traversal_max_depth: int = 4
+    traversal_fan_out: int = 25
+    traversal_max_nodes: int = 2000
+    ingest_queue_size: int = 10_000
+    ingest_workers: int = 2
+    ingest_batch_size: int = 64
+    ingest_coalesce_ms: int = 50
+    ingest_drain_timeout_seconds: float = 10.0
+    # Workspace document indexing (POST /knowledge/documents/index)
+    documents_extensions: list[str] = [".md", ".txt", ".rst"]
+    documents_chunk_chars: int = 1200
+    documents_max_file_bytes: int = 5_000_000
+    documents_workers: int = 4
+    documents_batch_size: int = 256
+    bundle_batch_size: int = 5000  # records per transaction on import
     default_ttl_days: int = 30
     sensitive_ttl_days: int = 7
+    ttl_sweep_interval_seconds: int = 300  # 0 disables the background sweeper
+    ttl_sweep_batch_size: int = 500
+    access_flush_seconds: float = 5.0
+    # Tiering (runs with the TTL sweeper when graph_pruning is on)
+    tier_hot_min_access: int = 3
+    tier_access_half_life_days: float = 7.0  # reads count half as much per half-life
+    tier_cold_after_days: int = 30  # never shorter than default_ttl_days
+    tier_max_entities: int = 0  # 0 = no size budget
+    tier_cold_action: Literal["archive", "prune"] = "archive"
     summary_window: int = 20
 
 
+class StorageConfig(BaseModel):
+    backend: str = "sqlite"  # sqlite|sharded|memory
+    shards: int = 4
+    reader_pool_size: int = 4
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    busy_timeout_ms: int = 5000
+    cache_size_kb: int = 16_384
+    mmap_size_mb: int = 256
+    statement_cache_size: int = 256
+    payload_codec: str = "json"  # json|zjson|msgpack
+    audit_durability: str = "buffered"  # buffered|sync
+    audit_batch_size: int = 256
+    audit_flush_interval: float = 0.5
+    audit_queue_size: int = 10_000
+    blob_dir: str | None = None
+    blob_threshold_bytes: int = 64 * 1024
+
+
+class RetentionConfig(BaseModel):
+    # Off by default: audit pruning deletes rows for good; opt in per deployment.
+    enabled: bool = False
+    interval_seconds: int = 3600
+    execution_max_age_days: int = 90
+    audit_max_age_days: int = 30
+    archive_dir: str | None = None
+    batch_size: int = 500
+    vacuum_pages: int = 2000
+
+
 class TelegramConfig(BaseModel):
     enabled: bool = True
     webhook_url: str | None = None
@@ -77,6 +148,8 @@ class SpecterConfig(BaseModel):
     data_dir: str = "./data"
     execution: ExecutionConfig = Field(default_factory=ExecutionConfig)
     knowledge: KnowledgeConfig = Field(default_factory=KnowledgeConfig)
+    storage: StorageConfig = Field(default_factory=StorageConfig)
+    retention: RetentionConfig = Field(default_factory=RetentionConfig)
     channels: ChannelsConfig = Field(default_factory=ChannelsConfig)
     llm: dict[str, list[LLMRoute]] = Field(default_factory=dict)
     security: SecurityConfig = Field(default_factory=SecurityConfig)
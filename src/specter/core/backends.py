@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import uuid
+import zlib
+from datetime import datetime
+from pathlib import Path
+from typing import Protocol
+
+from ..config import StorageConfig, settings
+from .database import Database, get_database
+
+
+def _execution_id(suffix: str = "") -> str:
+    exec_id = f"exec_{int(datetime.utcnow().timestamp() * 1000)}_{uuid.uuid4().hex[:8]}"
+    return f"{exec_id}_{suffix}" if suffix else exec_id
+
+
+class StorageBackend(Protocol):
+    """Routes an agent's tables to SQLite databases.
+
+    Executions, their audit rows and node runs live on the database chosen for the
+    user; knowledge entities, relationships, summaries and skills live on ``home``.
+    Every backend speaks the same SQLite schema, so stores stay backend-agnostic.
+    """
+
+    name: str
+
+    @property
+    def home(self) -> Database: ...
+
+    def databases(self) -> list[Database]: ...
+
+    def for_user(self, user_id: str) -> Database: ...
+
+    def for_execution(self, exec_id: str) -> Database: ...
+
+    def new_execution_id(self, user_id: str) -> str: ...
+
+    async def init(self) -> None: ...
+
+    async def close(self) -> None: ...
+
+
+class SQLiteBackend:
+    """Everything in one database file (the default)."""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str) -> None:
+        self._db = get_database(db_path)
+
+    @property
+    def home(self) -> Database:
+        return self._db
+
+    def databases(self) -> list[Database]:
+        return [self._db]
+
+    def for_user(self, user_id: str) -> Database:
+        return self._db
+
+    def for_execution(self, exec_id: str) -> Database:
+        return self._db
+
+    def new_execution_id(self, user_id: str) -> str:
+        return _execution_id()
+
+    async def init(self) -> None:
+        await self._db.migrate()
+
+    async def close(self) -> None:
+        await self._db.close()
+
+
+class MemoryBackend(SQLiteBackend):
+    """A private in-memory SQLite database, for tests and benchmarks."""
+
+    name = "memory"
+
+    def __init__(self, config: StorageConfig | None = None) -> None:
+        self._db = Database(":memory:", config)
+
+
+class ShardedSQLiteBackend:
+    """Spreads executions across ``shards`` files by a stable hash of ``user_id``.
+
+    Shard 0 is the configured ``db_path`` and doubles as the home database, so an
+    existing single-file database keeps working after sharding is enabled. Execution
+    ids carry their shard (``..._s3``) so lookups by id go straight to one file.
+    """
+
+    name = "sharded"
+
+    def __init__(self, db_path: str, shards: int) -> None:
+        base = Path(db_path)
+        self._shards = [get_database(db_path)]
+        for index in range(1, max(1, shards)):
+            shard_path = base.with_name(f"{base.stem}.shard{index}{base.suffix}")
+            self._shards.append(get_database(str(shard_path)))
+
+    @property
+    def home(self) -> Database:
+        return self._shards[0]
+
+    def databases(self) -> list[Database]:
+        return list(self._shards)
+
+    def shard_index(self, user_id: str) -> int:
+        return zlib.crc32(user_id.encode()) % len(self._shards)
+
+    def for_user(self, user_id: str) -> Database:
+        return self._shards[self.shard_index(user_id)]
+
+    def for_execution(self, exec_id: str) -> Database:
+        _, _, tag = exec_id.rpartition("_s")
+        if tag.isdigit() and int(tag) < len(self._shards):
+            return self._shards[int(tag)]
+        return self.home
+
+    def new_execution_id(self, user_id: str) -> str:
+        return _execution_id(f"s{self.shard_index(user_id)}")
+
+    async def init(self) -> None:
+        for db in self._shards:
+            await db.migrate()
+
+    async def close(self) -> None:
+        for db in self._shards:
+            await db.close()
+
+
+def build_backend(db_path: str, config: StorageConfig | None = None) -> StorageBackend:
+    cfg = config or settings.specter.storage
+    if cfg.backend == "memory":
+        return MemoryBackend(cfg)
+    if cfg.backend == "sharded":
+        return ShardedSQLiteBackend(db_path, cfg.shards)
+    if cfg.backend != "sqlite":
+        raise ValueError(f"Unknown storage backend: {cfg.backend}")
+    return SQLiteBackend(db_path)
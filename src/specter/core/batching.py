@@ -0,0 +1,42 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+async def drain_batches(
+    queue: asyncio.Queue[T],
+    handle: Callable[[list[T]], Awaitable[None]],
+    batch_size: int,
+    linger: float,
+) -> None:
+    """Write-behind loop: pass ``queue`` items to ``handle`` in batches, forever.
+
+    A batch starts with the next item and takes whatever else arrives within
+    ``linger`` seconds, up to ``batch_size`` items. Items are marked done once
+    ``handle`` returns or raises, so ``queue.join()`` waits for them to be written;
+    ``handle`` is expected to deal with its own errors.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await queue.get()]
+        deadline = loop.time() + linger
+        while len(batch) < batch_size:
+            if not queue.empty():
+                batch.append(queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except TimeoutError:
+                break
+        try:
+            await handle(batch)
+        finally:
+            for _ in batch:
+                queue.task_done()
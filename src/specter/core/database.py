@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+
+import aiosqlite
+
+from ..config import StorageConfig, settings
+
+
+def fts_query(text: str, column: str | None = None) -> str:
+    """Quote each term so user input is matched literally; the last term is a prefix.
+
+    ``column`` restricts the match to one FTS column.
+    """
+    terms = [t.replace('"', '""') for t in text.split()]
+    if not terms:
+        return '""'
+    quoted = [f'"{t}"' for t in terms]
+    quoted[-1] += "*"
+    expr = " ".join(quoted)
+    return f"{column} : ({expr})" if column else expr
+
+
+class Database:
+    """Persistent connections for one SQLite file: a single writer plus a reader pool."""
+
+    def __init__(self, db_path: str, config: StorageConfig | None = None) -> None:
+        self.db_path = db_path
+        self.config = config or settings.specter.storage
+        self._writer: aiosqlite.Connection | None = None
+        self._readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._reader_conns: list[aiosqlite.Connection] = []
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    @property
+    def _shared(self) -> bool:
+        # In-memory databases are private to a connection, so readers share the writer.
+        return self.db_path == ":memory:" or self.config.reader_pool_size <= 0
+
+    async def open(self) -> None:
+        if self._writer is not None:
+            return
+        async with self._open_lock:
+            if self._writer is not None:
+                return
+            writer = await self._connect()
+            # auto_vacuum only takes effect on a fresh file; existing files need one VACUUM.
+            await writer.executescript(
+                "PRAGMA auto_vacuum = INCREMENTAL;"
+                f"PRAGMA journal_mode = {self.config.journal_mode};"
+            )
+            readers: list[aiosqlite.Connection] = []
+            try:
+                if not self._shared:
+                    for _ in range(self.config.reader_pool_size):
+                        readers.append(await self._connect("PRAGMA query_only = ON;"))
+            except BaseException:
+                for conn in [writer, *readers]:
+                    await conn.close()
+                raise
+            for conn in readers:
+                self._reader_conns.append(conn)
+                self._readers.put_nowait(conn)
+            self._writer = writer
+
+    async def _connect(self, extra_pragmas: str = "") -> aiosqlite.Connection:
+        cfg = self.config
+        conn = await aiosqlite.connect(self.db_path, cached_statements=cfg.statement_cache_size)
+        try:
+            await conn.executescript(
+                f"PRAGMA busy_timeout = {int(cfg.busy_timeout_ms)};"
+                f"PRAGMA synchronous = {cfg.synchronous};"
+                f"PRAGMA cache_size = -{int(cfg.cache_size_kb)};"
+                f"PRAGMA mmap_size = {int(cfg.mmap_size_mb) * 1024 * 1024};"
+                "PRAGMA temp_store = MEMORY;" + extra_pragmas
+            )
+        except BaseException:
+            await conn.close()
+            raise
+        return conn
+
+    @asynccontextmanager
+    async def writer(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Serialised write transaction; commits on success and rolls back on error."""
+        await self.open()
+        async with self._write_lock:
+            assert self._writer is not None
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            await self._writer.commit()
+
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        await self.open()
+        if self._shared:
+            async with self._write_lock:
+                assert self._writer is not None
+                yield self._writer
+            return
+        conn = await self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    async def migrate(self, migrations_dir: str | Path = "migrations") -> None:
+        async with self.writer() as db:
+            await db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    id TEXT PRIMARY KEY,
+                    applied_at TIMESTAMP
+                )
+                """
+            )
+            cursor = await db.execute("SELECT id FROM schema_migrations")
+            applied = {row[0] for row in await cursor.fetchall()}
+            for migration in sorted(Path(migrations_dir).glob("*.sql")):
+                if migration.name in applied:
+                    continue
+                with open(migration, encoding="utf-8") as f:
+                    await db.executescript(f.read())
+                await db.execute(
+                    "INSERT OR REPLACE INTO schema_migrations (id, applied_at) VALUES (?, ?)",
+                    (migration.name, datetime.utcnow().isoformat()),
+                )
+
+    async def close(self) -> None:
+        async with self._open_lock:
+            if self._writer is None:
+                return
+            async with self._write_lock:
+                for conn in self._reader_conns:
+                    await conn.close()
+                self._reader_conns.clear()
+                self._readers = asyncio.Queue()
+                await self._writer.close()
+                self._writer = None
+
+
+_databases: dict[str, Database] = {}
+
+
+def get_database(db_path: str) -> Database:
+    if db_path not in _databases:
+        _databases[db_path] = Database(db_path)
+    return _databases[db_path]
+
+
+async def close_databases() -> None:
+    for db in list(_databases.values()):
+        await db.close()
+    _databases.clear()
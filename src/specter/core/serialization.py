@@ -0,0 +1,99 @@
+from __future__ import annotations
+
+import json
+import zlib
+from typing import Any
+
+import ujson
+from fastapi.responses import JSONResponse
+
+try:  # optional, faster than ujson when present
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:  # optional, enables the msgpack codec for stored payloads
+    import msgpack
+except ImportError:  # pragma: no cover - depends on the environment
+    msgpack = None
+
+# Binary payloads start with MAGIC followed by one codec byte; anything else is
+# treated as legacy JSON text, so rows written before this module keep decoding.
+MAGIC = b"\x00SP"
+CODEC_ZJSON = 1
+CODEC_MSGPACK = 2
+CODECS = {"json", "zjson", "msgpack"}
+
+
+def dumps(obj: Any) -> str:
+    """Compact JSON text."""
+    return dumpb(obj).decode()
+
+
+def dumpb(obj: Any) -> bytes:
+    """Compact UTF-8 JSON bytes; unknown types fall back to ``str``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # orjson rejects integers beyond 64 bits; ujson encodes them.
+            pass
+    return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False, default=str).encode()
+
+
+def loads(data: str | bytes | bytearray | memoryview | None) -> Any:
+    if data is None:
+        return None
+    if isinstance(data, memoryview):
+        data = bytes(data)
+    if isinstance(data, bytes | bytearray) and data[:3] == MAGIC:
+        codec, body = data[3], zlib.decompress(data[4:])
+        if codec == CODEC_MSGPACK:
+            if msgpack is None:
+                raise RuntimeError("msgpack is required to decode this payload")
+            return msgpack.unpackb(body, raw=False, strict_map_key=False)
+        if codec == CODEC_ZJSON:
+            return _loads_json(body)
+        raise ValueError(f"Unknown payload codec: {codec}")
+    return _loads_json(data)
+
+
+def _loads_json(data: str | bytes | bytearray) -> Any:
+    if orjson is not None:
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            # orjson rejects NaN/Infinity, which older rows written by json.dumps hold.
+            return json.loads(data)
+    if isinstance(data, bytes | bytearray):
+        data = data.decode()
+    try:
+        return ujson.loads(data)
+    except ValueError:
+        # ujson rejects a few inputs the stdlib accepts (e.g. NaN from json.dumps).
+        return json.loads(data)
+
+
+def encode_payload(obj: Any, codec: str = "json") -> str | bytes:
+    """Encode a stored payload column (graph, result, audit details).
+
+    ``json`` keeps plain JSON text; ``zjson`` and ``msgpack`` store a compressed
+    binary value that :func:`loads` recognises by its header.
+    """
+    if codec == "json":
+        return dumps(obj)
+    if codec == "msgpack":
+        if msgpack is None:
+            raise RuntimeError("storage.payload_codec=msgpack requires the msgpack package")
+        body = msgpack.packb(obj, default=str, use_bin_type=True)
+        return MAGIC + bytes([CODEC_MSGPACK]) + zlib.compress(body, 1)
+    if codec == "zjson":
+        return MAGIC + bytes([CODEC_ZJSON]) + zlib.compress(dumpb(obj), 1)
+    raise ValueError(f"Unknown payload codec: {codec}")
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson/ujson instead of the stdlib encoder."""
+
+    def render(self, content: Any) -> bytes:
+        return dumpb(content)
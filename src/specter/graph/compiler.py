@@ -69,6 +69,28 @@ TOOL_CATALOG: list[dict[str, Any]] = [
         "description": "Search email (connector required).",
         "params": {"query": "string", "max_results": "int"},
     },
+    {
+        "name": "memory_neighbourhood",
+        "description": "Entities related to a remembered entity within a few hops.",
+        "params": {
+            "entity": "string",
+            "depth": "int",
+            "relation_types": "list[string]",
+            "min_strength": "float",
+            "fan_out": "int",
+        },
+    },
+    {
+        "name": "memory_path",
+        "description": "Shortest chain of relationships between two remembered entities.",
+        "params": {
+            "source": "string",
+            "target": "string",
+            "max_depth": "int",
+            "relation_types": "list[string]",
+            "min_strength": "float",
+        },
+    },
 ]
 
 
@@ -3,27 +3,38 @@ from __future__ import annotations
 import asyncio
 from typing import Any
 
+from ..blobs import BlobStore
 from ..core.security import ToolPolicy
 from ..healing.engine import HealingEngine
 from ..llm.router import LLMRouter
 from ..skills.manager import SkillManager
 from .models import ExecutionGraph, Node
 from .streaming import StreamCallback
+from .trace import ExecutionTrace
 
 
 class StreamingExecutor:
-    def __init__(self, skills: SkillManager, healer: HealingEngine, policy: ToolPolicy) -> None:
+    def __init__(
+        self,
+        skills: SkillManager,
+        healer: HealingEngine,
+        policy: ToolPolicy,
+        blobs: BlobStore | None = None,
+    ) -> None:
         self.skills = skills
         self.healer = healer
         self.llm = LLMRouter()
         self.policy = policy
+        self.blobs = blobs
 
     async def execute(
         self,
         graph: ExecutionGraph,
         callback: StreamCallback,
         audit: callable | None = None,
+        trace: ExecutionTrace | None = None,
     ) -> Any:
+        trace = trace or ExecutionTrace()
         sorted_nodes = graph.topological_sort()
         states = {n.id: "pending" for n in graph.nodes}
         results: dict[str, Any] = {}
@@ -31,14 +42,39 @@ class StreamingExecutor:
 
         semaphore = asyncio.Semaphore(graph.max_parallel)
 
+        async def attempt(
+            node: Node,
+            number: int,
+            phase: str,
+            queued_ms: float,
+            override_params: dict[str, Any] | None = None,
+            healing_strategy: str | None = None,
+            timeout: float | None = None,
+        ) -> Any:
+            started_ms = trace.now_ms()
+            try:
+                result = await asyncio.wait_for(
+                    self._execute_node(node, results, audit, override_params), timeout=timeout
+                )
+            except Exception as exc:
+                trace.record(
+                    node, number, phase, "failed", queued_ms, started_ms, exc, healing_strategy
+                )
+                raise
+            if self.blobs is not None:
+                result = await asyncio.to_thread(self.blobs.spill, result)
+            trace.record(
+                node, number, phase, "completed", queued_ms, started_ms, None, healing_strategy
+            )
+            return result
+
         async def run_node(node: Node) -> None:
+            queued_ms = trace.now_ms()
             async with semaphore:
                 states[node.id] = "running"
                 await callback.on_node_start(node, progress)
                 try:
-                    result = await asyncio.wait_for(
-                        self._execute_node(node, results, audit), timeout=node.timeout_seconds
-                    )
+                    result = await attempt(node, 1, "run", queued_ms, timeout=node.timeout_seconds)
                     states[node.id] = "completed"
                     results[node.id] = result
                     progress["completed"] += 1
@@ -49,9 +85,8 @@ class StreamingExecutor:
                     results[node.id] = exc
                     if node.error_strategy == "retry":
                         try:
-                            result = await asyncio.wait_for(
-                                self._execute_node(node, results, audit),
-                                timeout=node.timeout_seconds,
+                            result = await attempt(
+                                node, 2, "retry", queued_ms, timeout=node.timeout_seconds
                             )
                             states[node.id] = "completed"
                             results[node.id] = result
@@ -60,15 +95,31 @@ class StreamingExecutor:
                         except Exception:
                             pass
                     if node.error_strategy == "heal":
+                        heal_started_ms = trace.now_ms()
                         fix = await self.healer.attempt_fix(node, exc)
                         if fix.get("success"):
-                            healed = await self._execute_node(
-                                node, results, audit, fix.get("new_params")
+                            healed = await attempt(
+                                node,
+                                2,
+                                "heal",
+                                queued_ms,
+                                fix.get("new_params"),
+                                healing_strategy=fix.get("strategy"),
                             )
                             states[node.id] = "completed"
                             results[node.id] = healed
                             progress["completed"] += 1
                         else:
+                            trace.record(
+                                node,
+                                2,
+                                "heal",
+                                "failed",
+                                queued_ms,
+                                heal_started_ms,
+                                exc,
+                                fix.get("strategy"),
+                            )
                             await callback.on_healing_failed(node, fix, progress)
                     else:
                         await callback.on_node_error(node, exc, progress)
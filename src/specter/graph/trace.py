@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .models import Node
+
+
+@dataclass
+class NodeRun:
+    node_id: str
+    node_type: str
+    tool_name: str | None
+    attempt: int
+    phase: str  # run|retry|heal
+    status: str  # completed|failed
+    queued_ms: float
+    started_ms: float
+    ended_ms: float
+    error: str | None = None
+    healing_strategy: str | None = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class ExecutionTrace:
+    """Per-node attempt timings, in milliseconds relative to the start of the execution."""
+
+    runs: list[NodeRun] = field(default_factory=list)
+    _origin: float = field(default_factory=time.perf_counter, repr=False)
+
+    def now_ms(self) -> float:
+        return (time.perf_counter() - self._origin) * 1000
+
+    def record(
+        self,
+        node: Node,
+        attempt: int,
+        phase: str,
+        status: str,
+        queued_ms: float,
+        started_ms: float,
+        error: Exception | None = None,
+        healing_strategy: str | None = None,
+    ) -> None:
+        self.runs.append(
+            NodeRun(
+                node_id=node.id,
+                node_type=node.type,
+                tool_name=node.spec.tool_name,
+                attempt=attempt,
+                phase=phase,
+                status=status,
+                queued_ms=queued_ms,
+                started_ms=started_ms,
+                ended_ms=self.now_ms(),
+                error=str(error) if error else None,
+                healing_strategy=healing_strategy,
+            )
+        )
+
+
+def build_timeline(runs: list[dict[str, Any]], deps: dict[str, list[str]]) -> dict[str, Any]:
+    """Gantt-style view of stored node runs with the realised critical path.
+
+    A node is *ready* once its last dependency finished; the gap between ready and
+    queued is time lost in the scheduler, the gap between queued and started is time
+    spent waiting for a ``max_parallel`` slot.
+    """
+    if not runs:
+        return {
+            "spans": [],
+            "makespan_ms": 0.0,
+            "busy_ms": 0.0,
+            "idle_ms": 0.0,
+            "parallelism": {"average": 0.0, "max": 0},
+            "critical_path": [],
+            "time_by_type": {},
+        }
+
+    nodes: dict[str, dict[str, Any]] = {}
+    for run in runs:
+        item = nodes.setdefault(
+            run["node_id"],
+            {
+                "queued_ms": run["queued_ms"],
+                "started_ms": run["started_ms"],
+                "ended_ms": run["ended_ms"],
+            },
+        )
+        item["queued_ms"] = min(item["queued_ms"], run["queued_ms"])
+        item["started_ms"] = min(item["started_ms"], run["started_ms"])
+        item["ended_ms"] = max(item["ended_ms"], run["ended_ms"])
+
+    def ready_ms(node_id: str) -> float:
+        ends = [nodes[d]["ended_ms"] for d in deps.get(node_id, []) if d in nodes]
+        return max(ends, default=0.0)
+
+    spans = []
+    time_by_type: dict[str, float] = {}
+    for run in sorted(runs, key=lambda r: (r["started_ms"], r["attempt"])):
+        duration = run["ended_ms"] - run["started_ms"]
+        time_by_type[run["node_type"]] = time_by_type.get(run["node_type"], 0.0) + duration
+        spans.append(
+            {
+                **run,
+                "duration_ms": duration,
+                "ready_ms": ready_ms(run["node_id"]),
+                "queue_wait_ms": run["started_ms"] - run["queued_ms"],
+            }
+        )
+
+    makespan = max(r["ended_ms"] for r in runs)
+    events = sorted(
+        [(r["started_ms"], 1) for r in runs] + [(r["ended_ms"], -1) for r in runs],
+        key=lambda e: (e[0], e[1]),
+    )
+    active = max_active = 0
+    busy = 0.0
+    last = 0.0
+    for at, delta in events:
+        if active:
+            busy += at - last
+        active += delta
+        max_active = max(max_active, active)
+        last = at
+
+    # Walk back from the last node to finish through the dependency that gated each start.
+    critical: list[dict[str, Any]] = []
+    current: str | None = max(nodes, key=lambda n: nodes[n]["ended_ms"])
+    while current is not None:
+        info = nodes[current]
+        ready = ready_ms(current)
+        critical.append(
+            {
+                "node_id": current,
+                "ready_ms": ready,
+                "started_ms": info["started_ms"],
+                "ended_ms": info["ended_ms"],
+                "scheduler_delay_ms": max(0.0, info["started_ms"] - ready),
+            }
+        )
+        gating = [d for d in deps.get(current, []) if d in nodes]
+        current = max(gating, key=lambda d: nodes[d]["ended_ms"]) if gating else None
+    critical.reverse()
+
+    total_work = sum(r["ended_ms"] - r["started_ms"] for r in runs)
+    return {
+        "spans": spans,
+        "makespan_ms": makespan,
+        "busy_ms": busy,
+        "idle_ms": max(0.0, makespan - busy),
+        "parallelism": {
+            "average": total_work / makespan if makespan else 0.0,
+            "max": max_active,
+        },
+        "critical_path": critical,
+        "time_by_type": time_by_type,
+    }
@@ -0,0 +1,463 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import os
+import tempfile
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+import structlog
+
+from ..config import KnowledgeConfig, settings
+from ..core.database import Database
+from ..core.serialization import dumps
+from .vectors import Hit, VectorCache, normalise, require_numpy, top_k
+
+try:  # optional, required for the ANN index
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+logger = structlog.get_logger(__name__)
+
+Row = tuple[str, str, bytes]
+# Indexed ids checked against ``entities`` per query when a saved index is loaded.
+_RECONCILE_PAGE = 5000
+
+
+def _assign(data: Any, centroids: Any, chunk: int = 65536) -> Any:
+    """Nearest centroid (by cosine) for each row, computed in bounded chunks."""
+    out = np.empty(len(data), dtype=np.int32)
+    for start in range(0, len(data), chunk):
+        out[start : start + chunk] = np.argmax(data[start : start + chunk] @ centroids.T, axis=1)
+    return out
+
+
+def kmeans(data: Any, nlist: int, iters: int = 10, seed: int = 0) -> Any:
+    """Spherical k-means on a sample of ``data``; returns unit-length centroids."""
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(data), nlist * 64)
+    sample = data[rng.choice(len(data), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iters):
+        assign = _assign(sample, centroids)
+        counts = np.bincount(assign, minlength=nlist)
+        order = np.argsort(assign, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        filled = counts > 0
+        centroids[filled] = np.add.reduceat(sample[order], starts[filled], axis=0)
+        # Re-seed empty clusters from random sample points.
+        empty = np.flatnonzero(~filled)
+        if len(empty):
+            centroids[empty] = sample[rng.choice(sample_size, len(empty), replace=False)]
+        centroids = normalise(centroids)
+    return centroids.astype(np.float32)
+
+
+class IVFIndex:
+    """Inverted-file index over unit-length vectors.
+
+    ``build`` clusters the vectors with k-means and stores each cluster's rows
+    contiguously; rows added afterwards go to an unclustered tail. A search scores
+    the ``nprobe`` clusters nearest to the query plus the tail. Removals are
+    tombstones until the next build.
+    """
+
+    def __init__(self, dim: int) -> None:
+        self.dim = dim
+        self.centroids = np.zeros((0, dim), dtype=np.float32)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.codes = np.zeros(0, dtype=np.int32)
+        self.alive = np.zeros(0, dtype=bool)
+        self.ids: list[str] = []
+        self.rows: dict[str, int] = {}
+        self.type_codes: dict[str, int] = {}
+        self.built = 0
+        self.deleted = 0
+        self.max_rowid = 0
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def live(self) -> int:
+        return self.size - self.deleted
+
+    @property
+    def stale_ratio(self) -> float:
+        """Share of rows that are tombstones or outside the clustered lists."""
+        return (self.size - self.built + self.deleted) / max(1, self.size)
+
+    @classmethod
+    def build(
+        cls,
+        dim: int,
+        ids: Sequence[str],
+        types: Sequence[str],
+        vectors: Any,
+        nlist: int = 0,
+        max_rowid: int = 0,
+    ) -> IVFIndex:
+        index = cls(dim)
+        index.max_rowid = max_rowid
+        if not len(ids):
+            return index
+        vectors = normalise(np.asarray(vectors, dtype=np.float32))
+        nlist = min(len(ids), nlist or max(1, int(math.sqrt(len(ids)))))
+        index.centroids = kmeans(vectors, nlist)
+        assign = _assign(vectors, index.centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        index.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        index.vectors = np.ascontiguousarray(vectors[order])
+        index.codes = np.array([index._code(types[i]) for i in order], dtype=np.int32)
+        index.alive = np.ones(len(ids), dtype=bool)
+        index.ids = [ids[i] for i in order]
+        index.rows = {entity_id: row for row, entity_id in enumerate(index.ids)}
+        index.built = len(ids)
+        return index
+
+    def add(self, rows: Sequence[Row]) -> int:
+        rows = [r for r in rows if len(r[2]) == self.dim * 4 and r[0] not in self.rows]
+        if not rows:
+            return 0
+        blob = b"".join(r[2] for r in rows)
+        vectors = normalise(np.frombuffer(blob, dtype=np.float32).reshape(-1, self.dim))
+        start, end = self.size, self.size + len(rows)
+        if end > len(self.vectors):
+            grown = max(end, 2 * len(self.vectors), 64)
+            self.vectors = np.resize(self.vectors, (grown, self.dim))
+            self.codes = np.resize(self.codes, grown)
+            self.alive = np.resize(self.alive, grown)
+        self.vectors[start:end] = vectors
+        self.codes[start:end] = [self._code(r[1]) for r in rows]
+        self.alive[start:end] = True
+        for offset, row in enumerate(rows):
+            self.rows[row[0]] = start + offset
+            self.ids.append(row[0])
+        return len(rows)
+
+    def remove(self, ids: Sequence[str]) -> int:
+        removed = 0
+        for entity_id in ids:
+            row = self.rows.pop(entity_id, None)
+            if row is not None:
+                self.alive[row] = False
+                removed += 1
+        self.deleted += removed
+        return removed
+
+    def search(
+        self, queries: Any, k: int, nprobe: int, ent_type: str | None = None
+    ) -> list[list[Hit]]:
+        q = normalise(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        code = None if ent_type is None else self.type_codes.get(ent_type, -2)
+        nlist = len(self.centroids)
+        probe_scores = q @ self.centroids.T if nlist else None
+        results: list[list[Hit]] = []
+        for i, query in enumerate(q):
+            spans: list[tuple[int, int]] = []
+            if probe_scores is not None:
+                for c in top_k(probe_scores[i], min(nprobe, nlist)):
+                    if self.offsets[c + 1] > self.offsets[c]:
+                        spans.append((int(self.offsets[c]), int(self.offsets[c + 1])))
+            if self.size > self.built:
+                spans.append((self.built, self.size))
+            if not spans:
+                results.append([])
+                continue
+            # Contiguous slices are views, so each cluster costs one small matmul.
+            scores = np.concatenate([self.vectors[lo:hi] @ query for lo, hi in spans])
+            rows = np.concatenate([np.arange(lo, hi) for lo, hi in spans])
+            mask = self.alive[rows]
+            if code is not None:
+                mask &= self.codes[rows] == code
+            scores = np.where(mask, scores, -np.inf)
+            results.append(
+                [
+                    (self.ids[rows[j]], float(scores[j]))
+                    for j in top_k(scores, k)
+                    if np.isfinite(scores[j])
+                ]
+            )
+        return results
+
+    def save(self, path: Path, embedder: str) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        type_names = sorted(self.type_codes, key=self.type_codes.__getitem__)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".npz")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    meta=np.array([self.dim, self.built, self.max_rowid], dtype=np.int64),
+                    embedder=np.array(embedder),
+                    centroids=self.centroids,
+                    offsets=self.offsets,
+                    vectors=self.vectors[: self.size],
+                    codes=self.codes[: self.size],
+                    alive=self.alive[: self.size],
+                    ids=np.array(self.ids, dtype=str),
+                    type_names=np.array(type_names, dtype=str),
+                )
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> tuple[IVFIndex, str]:
+        with np.load(path, allow_pickle=False) as data:
+            dim, built, max_rowid = (int(v) for v in data["meta"])
+            index = cls(dim)
+            index.built = built
+            index.max_rowid = max_rowid
+            index.centroids = data["centroids"]
+            index.offsets = data["offsets"]
+            index.vectors = data["vectors"]
+            index.codes = data["codes"]
+            index.alive = data["alive"]
+            index.ids = data["ids"].tolist()
+            index.type_codes = {name: i for i, name in enumerate(data["type_names"].tolist())}
+            embedder = str(data["embedder"])
+        index.rows = {eid: row for row, eid in enumerate(index.ids) if index.alive[row]}
+        index.deleted = index.size - len(index.rows)
+        return index, embedder
+
+    def _code(self, ent_type: str) -> int:
+        return self.type_codes.setdefault(ent_type, len(self.type_codes))
+
+
+class AnnIndex:
+    """Keeps an :class:`IVFIndex` for one database in step with ``entities``.
+
+    The index file sits next to the SQLite database (``<stem>.ann.npz``). Inserts
+    and deletes are applied incrementally; a background task rebuilds the clusters
+    once the unclustered tail plus tombstones pass ``ann_rebuild_ratio``.
+    """
+
+    def __init__(
+        self, db: Database, dim: int, embedder: str, config: KnowledgeConfig | None = None
+    ) -> None:
+        self.db = db
+        self.dim = dim
+        self.embedder = embedder
+        self.config = config or settings.specter.knowledge
+        self.path = None if db.db_path == ":memory:" else Path(db.db_path).with_suffix(".ann.npz")
+        self.index: IVFIndex | None = None
+        self._journal: list[tuple[str, Any]] | None = None
+        self._dirty = False
+        self._rebuild_lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return np is not None and self.config.ann_enabled
+
+    @property
+    def active(self) -> bool:
+        """True once the index is large enough to be used instead of exact search."""
+        return self.index is not None and self.index.live >= self.config.ann_min_entities
+
+    async def load(self) -> None:
+        if not self.enabled or self.path is None or not self.path.exists():
+            return
+        try:
+            index, embedder = await asyncio.to_thread(IVFIndex.load, self.path)
+        except (OSError, ValueError, KeyError):
+            logger.exception("ann_load_failed", path=str(self.path))
+            return
+        if index.dim != self.dim or embedder != self.embedder:
+            logger.info("ann_index_discarded", path=str(self.path), reason="embedder_changed")
+            return
+        # Catch up with rows written after the file was saved, and tombstone the
+        # indexed ones deleted since (another process, or a crash before save).
+        indexed = list(index.rows)
+        gone: list[str] = []
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                "SELECT rowid, id, type, vector FROM entities "
+                "WHERE rowid > ? AND length(vector) = ?",
+                (index.max_rowid, self.dim * 4),
+            )
+            for start in range(0, len(indexed), _RECONCILE_PAGE):
+                page = dumps(indexed[start : start + _RECONCILE_PAGE])
+                gone.extend(
+                    row[0]
+                    for row in await db.execute_fetchall(
+                        "SELECT value FROM json_each(?) "
+                        "WHERE value NOT IN (SELECT id FROM entities)",
+                        (page,),
+                    )
+                )
+        index.add([(r[1], r[2], r[3]) for r in rows])
+        if rows:
+            index.max_rowid = max(r[0] for r in rows)
+            self._dirty = True
+        if index.remove(gone):
+            self._dirty = True
+        self.index = index
+
+    def add(self, rows: Sequence[Row]) -> None:
+        if not self.enabled or not rows:
+            return
+        if self._journal is not None:
+            self._journal.append(("add", list(rows)))
+        if self.index is not None:
+            self.index.add(rows)
+            self._dirty = True
+
+    def remove(self, ids: Sequence[str]) -> None:
+        if not self.enabled or not ids:
+            return
+        if self._journal is not None:
+            self._journal.append(("remove", list(ids)))
+        if self.index is not None and self.index.remove(ids):
+            self._dirty = True
+
+    async def search(
+        self, queries: Sequence[Sequence[float]], k: int, ent_type: str | None = None
+    ) -> list[list[Hit]]:
+        require_numpy()
+        if self.index is None:
+            return [[] for _ in queries]
+        return await asyncio.to_thread(
+            self.index.search, queries, k, self.config.ann_nprobe, ent_type
+        )
+
+    def needs_rebuild(self, stored: int) -> bool:
+        if stored < self.config.ann_min_entities:
+            return False
+        if self.index is None:
+            return True
+        return (
+            self.index.stale_ratio > self.config.ann_rebuild_ratio
+            or abs(self.index.live - stored) > self.config.ann_rebuild_ratio * stored
+        )
+
+    async def rebuild(self) -> dict[str, Any]:
+        """Re-cluster every stored vector; writes during the rebuild are replayed."""
+        require_numpy()
+        async with self._rebuild_lock:
+            started = time.perf_counter()
+            self._journal = []
+            try:
+                ids: list[str] = []
+                types: list[str] = []
+                chunks: list[Any] = []
+                max_rowid = 0
+                async with self.db.reader() as db:
+                    cursor = await db.execute(
+                        "SELECT rowid, id, type, vector FROM entities WHERE length(vector) = ?",
+                        (self.dim * 4,),
+                    )
+                    try:
+                        while rows := await cursor.fetchmany(10_000):
+                            ids.extend(r[1] for r in rows)
+                            types.extend(r[2] for r in rows)
+                            blob = b"".join(r[3] for r in rows)
+                            chunks.append(np.frombuffer(blob, dtype=np.float32))
+                            max_rowid = max(max_rowid, max(r[0] for r in rows))
+                    finally:
+                        await cursor.close()
+                vectors = (
+                    np.concatenate(chunks).reshape(-1, self.dim)
+                    if chunks
+                    else np.zeros((0, self.dim), dtype=np.float32)
+                )
+                index = await asyncio.to_thread(
+                    IVFIndex.build, self.dim, ids, types, vectors, self.config.ann_nlist, max_rowid
+                )
+                # No await between replay and swap, so no write can slip in between.
+                for op, payload in self._journal:
+                    if op == "add":
+                        index.add(payload)
+                    else:
+                        index.remove(payload)
+                self.index = index
+            finally:
+                self._journal = None
+            self._dirty = True
+            await self.save()
+        stats = {
+            "entities": index.live,
+            "lists": len(index.centroids),
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logger.info("ann_rebuilt", db_path=self.db.db_path, **stats)
+        return stats
+
+    async def maintain(self) -> bool:
+        """Rebuild if the index is missing or stale; returns True if it rebuilt."""
+        if not self.enabled:
+            return False
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                "SELECT COUNT(*) FROM entities WHERE length(vector) = ?", (self.dim * 4,)
+            )
+        if not self.needs_rebuild(rows[0][0]):
+            return False
+        await self.rebuild()
+        return True
+
+    async def run_periodically(self) -> None:
+        while True:
+            try:
+                await self.maintain()
+            except Exception:  # noqa: BLE001
+                logger.exception("ann_maintenance_failed", db_path=self.db.db_path)
+            await asyncio.sleep(self.config.ann_rebuild_interval_seconds)
+
+    async def save(self) -> None:
+        if self.index is None or self.path is None or not self._dirty:
+            return
+        self._dirty = False
+        await asyncio.to_thread(self.index.save, self.path, self.embedder)
+
+    async def benchmark(
+        self, exact: VectorCache, queries: int = 100, k: int = 10, seed: int = 0
+    ) -> dict[str, Any]:
+        """Recall@k and per-query latency of the ANN index against exact search.
+
+        Query vectors are sampled from the indexed rows.
+        """
+        require_numpy()
+        if self.index is None or not self.index.live:
+            return {"error": "empty_index"}
+        index = self.index
+        rng = np.random.default_rng(seed)
+        live_rows = np.flatnonzero(index.alive[: index.size])
+        sample = index.vectors[rng.choice(live_rows, min(queries, len(live_rows)), replace=False)]
+        exact_ms: list[float] = []
+        ann_ms: list[float] = []
+        recall: list[float] = []
+        for query in sample:
+            t0 = time.perf_counter()
+            [truth] = await exact.search([query], k)
+            t1 = time.perf_counter()
+            [approx] = await self.search([query], k)
+            t2 = time.perf_counter()
+            exact_ms.append((t1 - t0) * 1000)
+            ann_ms.append((t2 - t1) * 1000)
+            expected = {entity_id for entity_id, _ in truth}
+            if expected:
+                found = {entity_id for entity_id, _ in approx}
+                recall.append(len(expected & found) / len(expected))
+
+        def pct(values: list[float], q: float) -> float:
+            return round(float(np.percentile(values, q)), 3)
+
+        return {
+            "entities": index.live,
+            "lists": len(index.centroids),
+            "nprobe": self.config.ann_nprobe,
+            "queries": len(sample),
+            "k": k,
+            "recall": round(float(np.mean(recall)) if recall else 0.0, 4),
+            "exact_ms": {"p50": pct(exact_ms, 50), "p95": pct(exact_ms, 95)},
+            "ann_ms": {"p50": pct(ann_ms, 50), "p95": pct(ann_ms, 95)},
+        }
@@ -0,0 +1,423 @@
+from __future__ import annotations
+
+import asyncio
+import mmap
+import time
+from collections.abc import AsyncIterator, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import IO, Any
+
+import aiosqlite
+import structlog
+
+from ..core.database import Database
+from ..core.serialization import dumps, loads
+
+logger = structlog.get_logger(__name__)
+
+FORMAT = "specter-kg"
+VERSION = 1
+MANIFEST = "manifest.json"
+ENTITIES = "entities.ndjson"
+RELATIONSHIPS = "relationships.ndjson"
+SUMMARIES = "summaries.ndjson"
+VECTORS = "vectors.f32"
+_PAGE = 1000
+
+
+def _json(column: str) -> str:
+    # JSON columns are exported as JSON values; anything unparsable as a string.
+    return f"CASE WHEN json_valid({column}) THEN json({column}) ELSE {column} END"
+
+
+# Each row is serialised by SQLite itself, so export never builds Python dicts.
+_EXPORT_ENTITIES = f"""
+    SELECT json_object(
+        'id', id, 'type', type, 'name', name, 'attributes', {_json("attributes")},
+        'created_at', created_at, 'expires_at', expires_at, 'access_count', access_count,
+        'last_accessed_at', last_accessed_at, 'content_hash', content_hash
+    ), vector
+    FROM entities ORDER BY rowid
+"""
+_EXPORT_RELATIONSHIPS = f"""
+    SELECT json_object(
+        'id', id, 'source_id', source_id, 'target_id', target_id,
+        'relation_type', relation_type, 'strength', strength, 'context', {_json("context")},
+        'created_at', created_at, 'mentions', mentions, 'last_seen_at', last_seen_at
+    )
+    FROM relationships ORDER BY rowid
+"""
+_EXPORT_SUMMARIES = """
+    SELECT json_object(
+        'id', id, 'summary', summary, 'source_count', source_count, 'created_at', created_at,
+        'level', level, 'period_start', period_start, 'period_end', period_end,
+        'parent_id', parent_id
+    )
+    FROM summaries ORDER BY rowid
+"""
+_IMPORT_ENTITY = """
+    INSERT INTO entities (
+        id, type, name, attributes, vector, created_at, expires_at, access_count,
+        last_accessed_at, content_hash
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+# Edges whose endpoints are in neither the bundle nor the graph are dropped.
+_IMPORT_RELATIONSHIP = """
+    INSERT INTO relationships (
+        id, source_id, target_id, relation_type, strength, context, created_at, mentions,
+        last_seen_at
+    )
+    SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9
+    WHERE EXISTS (SELECT 1 FROM entities WHERE id = ?2)
+      AND EXISTS (SELECT 1 FROM entities WHERE id = ?3)
+    ON CONFLICT DO NOTHING
+"""
+_IMPORT_SUMMARY = """
+    INSERT INTO summaries (
+        id, summary, source_count, created_at, level, period_start, period_end, parent_id
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT DO NOTHING
+"""
+# Bundle ids that lost to an existing row on (type, name) or content hash.
+_CONFLICTS = """
+    WITH missing AS (
+        SELECT json_extract(j.value, '$[0]') AS id, json_extract(j.value, '$[1]') AS type,
+               json_extract(j.value, '$[2]') AS name, json_extract(j.value, '$[3]') AS hash
+        FROM json_each(?) AS j
+        WHERE NOT EXISTS (SELECT 1 FROM entities WHERE id = json_extract(j.value, '$[0]'))
+    )
+    SELECT m.id, e.id FROM missing m
+    JOIN entities e ON e.type = m.type AND e.name = m.name AND e.type != 'fact'
+    UNION ALL
+    SELECT m.id, e.id FROM missing m JOIN entities e ON e.content_hash = m.hash
+"""
+
+
+async def export_bundle(db: Database, path: Path, dim: int, embedder: str) -> dict[str, Any]:
+    """Write the graph to the directory ``path`` and return its manifest.
+
+    Records are NDJSON, streamed a page at a time from one read snapshot, so memory
+    does not grow with the graph. ``vectors.f32`` holds one little-endian float32 row
+    of ``dim`` values per entity whose ``vector`` field is that row number, e.g.
+    ``numpy.memmap(path, dtype="<f4").reshape(-1, dim)``.
+    """
+    await asyncio.to_thread(path.mkdir, parents=True, exist_ok=True)
+    started = time.perf_counter()
+    counts = {"entities": 0, "relationships": 0, "summaries": 0, "vectors": 0}
+    row_bytes = dim * 4
+    async with db.reader() as conn:
+        await conn.execute("BEGIN")
+        try:
+            with (
+                open(path / ENTITIES, "w", encoding="utf-8") as records,
+                open(path / VECTORS, "wb") as vectors,
+            ):
+                async for page in _pages(conn, _EXPORT_ENTITIES):
+                    lines: list[str] = []
+                    blobs: list[bytes] = []
+                    for record, vector in page:
+                        if vector is not None and len(vector) == row_bytes:
+                            record = f'{record[:-1]},"vector":{counts["vectors"]}}}'
+                            blobs.append(vector)
+                            counts["vectors"] += 1
+                        lines.append(record)
+                    await asyncio.to_thread(_write, records, lines, vectors, blobs)
+                    counts["entities"] += len(page)
+            for name, query, key in (
+                (RELATIONSHIPS, _EXPORT_RELATIONSHIPS, "relationships"),
+                (SUMMARIES, _EXPORT_SUMMARIES, "summaries"),
+            ):
+                with open(path / name, "w", encoding="utf-8") as records:
+                    async for page in _pages(conn, query):
+                        await asyncio.to_thread(_write, records, [row[0] for row in page])
+                        counts[key] += len(page)
+        finally:
+            await conn.rollback()
+    manifest = {
+        "format": FORMAT,
+        "version": VERSION,
+        "created_at": datetime.utcnow().isoformat(),
+        "embedder": embedder,
+        "dim": dim,
+        "counts": counts,
+    }
+    await asyncio.to_thread((path / MANIFEST).write_text, dumps(manifest), "utf-8")
+    logger.info(
+        "kg_exported",
+        path=str(path),
+        elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+        **counts,
+    )
+    return manifest
+
+
+async def import_bundle(
+    db: Database,
+    path: Path,
+    dim: int,
+    embedder: str,
+    batch_size: int = 5000,
+    defer_indexes: bool | None = None,
+) -> dict[str, Any]:
+    """Merge a bundle written by ``export_bundle`` into the graph.
+
+    Each page of ``batch_size`` records is one transaction. Rows that already exist
+    are kept: an entity that loses on ``(type, name)`` or content hash is mapped to
+    the existing id, so its relationships still land. Vectors are only imported from
+    a bundle made with the same embedder; the others can be re-embedded with
+    ``POST /knowledge/reindex``.
+
+    With ``defer_indexes`` (by default when the bundle is at least as large as the
+    graph) non-unique indexes and the full-text insert trigger are dropped for the
+    duration and rebuilt once at the end.
+    """
+    manifest_path = path / MANIFEST
+    if not manifest_path.exists():
+        raise FileNotFoundError(str(manifest_path))
+    manifest = loads(await asyncio.to_thread(manifest_path.read_text, "utf-8"))
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise ValueError("Not a knowledge graph bundle this version can read")
+    started = time.perf_counter()
+    async with db.reader() as conn:
+        existing = (await conn.execute_fetchall("SELECT COUNT(*) FROM entities"))[0][0]
+        state = await conn.execute_fetchall(
+            "SELECT facts_added, facts_folded FROM summary_state WHERE id = 1"
+        )
+    if defer_indexes is None:
+        defer_indexes = manifest["counts"]["entities"] >= existing
+    use_vectors = manifest.get("dim") == dim and manifest.get("embedder") == embedder
+    stats: dict[str, Any] = {
+        "entities": 0,
+        "relationships": 0,
+        "summaries": 0,
+        "vectors": 0,
+        "remapped": 0,
+        "skipped": 0,
+        "deferred_indexes": defer_indexes,
+        "vectors_compatible": use_vectors,
+    }
+    batch = max(1, batch_size)
+    remap: dict[str, str] = {}
+    if defer_indexes:
+        await defer_schema(db)
+    try:
+        await _import_entities(db, path, dim if use_vectors else 0, batch, remap, stats)
+        await _import_relationships(db, path, batch, remap, stats)
+        await _import_summaries(db, path, batch, stats)
+    finally:
+        if defer_indexes:
+            await restore_schema(db)
+    if state:
+        await _mark_summarised(db, state[0], manifest["counts"].get("summaries", 0))
+    stats["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("kg_imported", path=str(path), **stats)
+    return stats
+
+
+async def defer_schema(db: Database) -> int:
+    """Drop non-unique graph indexes and the FTS insert trigger, remembering their SQL."""
+    async with db.writer() as conn:
+        rows = await conn.execute_fetchall(
+            """
+            SELECT name, type, sql FROM sqlite_master
+            WHERE tbl_name IN ('entities', 'relationships', 'summaries') AND sql IS NOT NULL
+              AND ((type = 'index' AND sql NOT LIKE 'CREATE UNIQUE%')
+                   OR (type = 'trigger' AND name = 'entities_fts_ai'))
+            """
+        )
+        await conn.executemany(
+            "INSERT OR IGNORE INTO deferred_schema (name, type, sql) VALUES (?, ?, ?)", rows
+        )
+        for name, kind, _ in rows:
+            await conn.execute(f'DROP {kind.upper()} IF EXISTS "{name}"')
+    return len(rows)
+
+
+async def restore_schema(db: Database) -> int:
+    """Recreate whatever ``defer_schema`` dropped; rebuilds the FTS index if needed."""
+    async with db.writer() as conn:
+        rows = await conn.execute_fetchall("SELECT name, type, sql FROM deferred_schema")
+        if not rows:
+            return 0
+        present = {row[0] for row in await conn.execute_fetchall("SELECT name FROM sqlite_master")}
+        for name, _, sql in rows:
+            if name not in present:
+                await conn.execute(sql)
+        if any(name == "entities_fts_ai" for name, _, _ in rows):
+            await conn.execute("INSERT INTO entities_fts(entities_fts) VALUES ('rebuild')")
+        await conn.execute("DELETE FROM deferred_schema")
+    logger.info("kg_schema_restored", db_path=db.db_path, objects=len(rows))
+    return len(rows)
+
+
+async def _import_entities(
+    db: Database,
+    path: Path,
+    dim: int,
+    batch: int,
+    remap: dict[str, str],
+    stats: dict[str, Any],
+) -> None:
+    row_bytes = dim * 4
+    with (
+        open(path / ENTITIES, encoding="utf-8") as records,
+        _mapped(path / VECTORS if dim else None) as matrix,
+    ):
+        while lines := await asyncio.to_thread(_read, records, batch):
+            rows = []
+            for line in lines:
+                record = loads(line)
+                index = record.get("vector")
+                vector = None
+                if matrix is not None and index is not None:
+                    vector = matrix[index * row_bytes : (index + 1) * row_bytes]
+                rows.append(
+                    (
+                        record["id"],
+                        record["type"],
+                        record["name"],
+                        _json_text(record.get("attributes")),
+                        vector,
+                        record.get("created_at"),
+                        record.get("expires_at"),
+                        record.get("access_count") or 0,
+                        record.get("last_accessed_at"),
+                        record.get("content_hash"),
+                    )
+                )
+            async with db.writer() as conn:
+                cursor = await conn.executemany(_IMPORT_ENTITY, rows)
+                conflicts = dict(
+                    await conn.execute_fetchall(
+                        _CONFLICTS, (dumps([[r[0], r[1], r[2], r[9]] for r in rows]),)
+                    )
+                )
+            remap.update(conflicts)
+            stats["entities"] += max(0, cursor.rowcount)
+            stats["remapped"] += len(conflicts)
+            stats["vectors"] += sum(row[4] is not None and row[0] not in conflicts for row in rows)
+
+
+async def _import_relationships(
+    db: Database, path: Path, batch: int, remap: dict[str, str], stats: dict[str, Any]
+) -> None:
+    with open(path / RELATIONSHIPS, encoding="utf-8") as records:
+        while lines := await asyncio.to_thread(_read, records, batch):
+            rows = []
+            for line in lines:
+                record = loads(line)
+                rows.append(
+                    (
+                        record["id"],
+                        remap.get(record["source_id"], record["source_id"]),
+                        remap.get(record["target_id"], record["target_id"]),
+                        record["relation_type"],
+                        record.get("strength"),
+                        _json_text(record.get("context")),
+                        record.get("created_at"),
+                        record.get("mentions") or 1,
+                        record.get("last_seen_at"),
+                    )
+                )
+            async with db.writer() as conn:
+                cursor = await conn.executemany(_IMPORT_RELATIONSHIP, rows)
+            inserted = max(0, cursor.rowcount)
+            stats["relationships"] += inserted
+            stats["skipped"] += len(rows) - inserted
+
+
+async def _import_summaries(db: Database, path: Path, batch: int, stats: dict[str, Any]) -> None:
+    with open(path / SUMMARIES, encoding="utf-8") as records:
+        while lines := await asyncio.to_thread(_read, records, batch):
+            rows = [
+                (
+                    record["id"],
+                    record["summary"],
+                    record.get("source_count") or 0,
+                    record.get("created_at"),
+                    record.get("level") or "window",
+                    record.get("period_start"),
+                    record.get("period_end"),
+                    record.get("parent_id"),
+                )
+                for record in map(loads, lines)
+            ]
+            async with db.writer() as conn:
+                cursor = await conn.executemany(_IMPORT_SUMMARY, rows)
+            stats["summaries"] += max(0, cursor.rowcount)
+
+
+async def _mark_summarised(db: Database, before: tuple[int, int], summaries: int) -> None:
+    """Imported facts come with their summaries; don't summarise them again.
+
+    The summary cursor only moves past them if nothing local was pending.
+    """
+    added, folded = before
+    async with db.writer() as conn:
+        rows = await conn.execute_fetchall("SELECT facts_added FROM summary_state WHERE id = 1")
+        imported = rows[0][0] - added
+        if not imported or not summaries:
+            return
+        await conn.execute(
+            "UPDATE summary_state SET facts_folded = facts_folded + ? WHERE id = 1", (imported,)
+        )
+        if added == folded:
+            await conn.execute(
+                """
+                UPDATE summary_state SET (cursor_created_at, cursor_id) = (
+                    SELECT coalesce(created_at, ''), id FROM entities WHERE type = 'fact'
+                    ORDER BY created_at DESC, id DESC LIMIT 1
+                )
+                WHERE id = 1
+                """
+            )
+
+
+async def _pages(conn: aiosqlite.Connection, query: str) -> AsyncIterator[list[Any]]:
+    cursor = await conn.execute(query)
+    try:
+        while rows := await cursor.fetchmany(_PAGE):
+            yield list(rows)
+    finally:
+        await cursor.close()
+
+
+def _write(
+    records: IO[str],
+    lines: list[str],
+    vectors: IO[bytes] | None = None,
+    blobs: list[bytes] | None = None,
+) -> None:
+    records.writelines(f"{line}\n" for line in lines)
+    if vectors is not None and blobs:
+        vectors.write(b"".join(blobs))
+
+
+def _read(records: IO[str], count: int) -> list[str]:
+    lines: list[str] = []
+    for line in records:
+        if line.strip():
+            lines.append(line)
+            if len(lines) >= count:
+                break
+    return lines
+
+
+def _json_text(value: Any) -> str | None:
+    if value is None or isinstance(value, str):
+        return value
+    return dumps(value)
+
+
+@contextmanager
+def _mapped(path: Path | None) -> Iterator[mmap.mmap | None]:
+    if path is None or not path.exists() or path.stat().st_size == 0:
+        yield None
+        return
+    with open(path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        yield m
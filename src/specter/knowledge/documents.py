@@ -0,0 +1,375 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import islice
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+import aiosqlite
+import structlog
+
+from ..config import KnowledgeConfig, settings
+from ..core.serialization import dumps
+from ..skills.builtin.file_ops import resolve_workspace_path, workspace_root
+
+if TYPE_CHECKING:
+    from .graph import KnowledgeGraph
+
+logger = structlog.get_logger(__name__)
+
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+_SKIP_DIRS = frozenset({"node_modules", "__pycache__", "venv"})
+# Files stat'ed per walk step (and per documents lookup).
+_WALK_PAGE = 500
+_PROGRESS_SECONDS = 5.0
+_UPSERT_DOCUMENT = """
+    INSERT INTO documents (path, size, mtime_ns, content_hash, chunks, indexed_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(path) DO UPDATE SET
+        size = excluded.size,
+        mtime_ns = excluded.mtime_ns,
+        content_hash = excluded.content_hash,
+        chunks = excluded.chunks,
+        indexed_at = excluded.indexed_at
+"""
+
+
+@dataclass(frozen=True)
+class FileEntry:
+    path: str  # relative to the workspace root, with forward slashes
+    size: int
+    mtime_ns: int
+
+
+# (file, content hash, chunks or None when the content did not change)
+Loaded = tuple[FileEntry, str, list[str] | None]
+
+
+def chunk_text(text: str, max_chars: int) -> list[str]:
+    """Paragraphs packed into chunks of at most ``max_chars``; long ones split at spaces."""
+    chunks: list[str] = []
+    current: list[str] = []
+    size = 0
+    for paragraph in _PARAGRAPHS.split(text):
+        for piece in _split_long(paragraph.strip(), max_chars):
+            if current and size + 2 + len(piece) > max_chars:
+                chunks.append("\n\n".join(current))
+                current, size = [], 0
+            size += len(piece) + (2 if current else 0)
+            current.append(piece)
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def _split_long(paragraph: str, max_chars: int) -> Iterator[str]:
+    while len(paragraph) > max_chars:
+        cut = paragraph.rfind(" ", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        yield paragraph[:cut].rstrip()
+        paragraph = paragraph[cut:].lstrip()
+    if paragraph:
+        yield paragraph
+
+
+def walk(root: Path, start: Path, extensions: frozenset[str], exclude: Path) -> Iterator[FileEntry]:
+    """Files under ``start`` with a matching extension; hidden entries are skipped."""
+    if start.is_file():
+        stat = start.stat()
+        yield FileEntry(start.relative_to(root).as_posix(), stat.st_size, stat.st_mtime_ns)
+        return
+    stack = [start]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.name.startswith(".") or entry.name in _SKIP_DIRS:
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        if Path(entry.path) != exclude:
+                            stack.append(Path(entry.path))
+                    elif (
+                        entry.is_file(follow_symlinks=False)
+                        and os.path.splitext(entry.name)[1].lower() in extensions
+                    ):
+                        stat = entry.stat(follow_symlinks=False)
+                        yield FileEntry(
+                            Path(entry.path).relative_to(root).as_posix(),
+                            stat.st_size,
+                            stat.st_mtime_ns,
+                        )
+        except OSError:
+            logger.warning("kg_documents_unreadable_dir", path=str(directory))
+
+
+def _take(entries: Iterator[FileEntry], count: int) -> list[FileEntry]:
+    return list(islice(entries, count))
+
+
+def _load(path: Path, previous_hash: str | None, max_chars: int) -> tuple[str, list[str] | None]:
+    data = path.read_bytes()
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == previous_hash:
+        return digest, None
+    return digest, chunk_text(data.decode("utf-8", errors="ignore"), max_chars)
+
+
+async def release_chunks(db: aiosqlite.Connection, paths: list[str], expires_at: str) -> None:
+    """Hand the chunks stored from ``paths`` back to the usual fact TTL."""
+    if paths:
+        await db.execute(
+            """
+            UPDATE entities
+            SET expires_at = ?, attributes = json_remove(attributes, '$.source')
+            WHERE json_extract(attributes, '$.source') IN (SELECT value FROM json_each(?))
+            """,
+            (expires_at, dumps(list(dict.fromkeys(paths)))),
+        )
+
+
+class DocumentIndexer:
+    """Indexes text files under the workspace root into the knowledge graph.
+
+    The walk streams file metadata a page at a time; files whose size and mtime match
+    the ``documents`` table are not read again. ``documents_workers`` tasks read,
+    hash and chunk changed files off the event loop and store the chunks of several
+    files with one ``add_facts`` call (one transaction) of about
+    ``documents_batch_size`` chunks. Chunks are deduplicated by content hash, so a
+    file stored again after a crash does not duplicate facts.
+
+    Chunks keep their file's path in ``attributes["source"]`` and neither expire nor
+    go cold while the file is indexed. When a file changes or disappears, its
+    previous chunks get the usual fact TTL; those still in the file are claimed
+    again by the re-index. A chunk shared by several files belongs to the last one
+    that stored it.
+    """
+
+    def __init__(self, kg: KnowledgeGraph, config: KnowledgeConfig | None = None) -> None:
+        self.kg = kg
+        self.config = config or settings.specter.knowledge
+        self.progress: dict[str, Any] = {"running": False}
+        self._task: asyncio.Task[dict[str, Any]] | None = None
+        self._started = 0.0
+        self._last_report = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, path: str = ".") -> bool:
+        """Index ``path`` (relative to the workspace root) in the background.
+
+        Returns ``False`` if a run is already in progress. Raises ``ValueError`` for
+        paths outside the workspace and ``FileNotFoundError`` for missing ones.
+        """
+        if self.running:
+            return False
+        root, target = self._resolve(path)
+        self.progress = self._new_progress(root, target)
+        self._started = self._last_report = time.perf_counter()
+        self._task = asyncio.create_task(self._index(root, target))
+        return True
+
+    async def wait(self) -> dict[str, Any]:
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        return self.progress
+
+    async def run(self, path: str = ".") -> dict[str, Any]:
+        if not self.start(path):
+            raise RuntimeError("Document indexing already running")
+        assert self._task is not None
+        return await self._task
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @staticmethod
+    def _resolve(path: str) -> tuple[Path, Path]:
+        target = resolve_workspace_path(path)
+        if not target.exists():
+            raise FileNotFoundError(path)
+        return workspace_root(), target
+
+    @staticmethod
+    def _new_progress(root: Path, target: Path) -> dict[str, Any]:
+        return {
+            "path": target.relative_to(root).as_posix(),
+            "running": True,
+            "started_at": datetime.utcnow().isoformat(),
+            "files": 0,
+            "indexed": 0,
+            "unchanged": 0,
+            "skipped": 0,
+            "failed": 0,
+            "removed": 0,
+            "chunks": 0,
+            "bytes": 0,
+            "elapsed_ms": 0.0,
+            "files_per_s": 0.0,
+            "chunks_per_s": 0.0,
+        }
+
+    async def _index(self, root: Path, target: Path) -> dict[str, Any]:
+        stats = self.progress
+        exclude = Path(settings.specter.data_dir).resolve()
+        extensions = frozenset(ext.lower() for ext in self.config.documents_extensions)
+        workers = max(1, self.config.documents_workers)
+        queue: asyncio.Queue[tuple[FileEntry, str | None] | None] = asyncio.Queue(
+            maxsize=workers * 16
+        )
+        tasks = [asyncio.create_task(self._worker(root, queue, stats)) for _ in range(workers)]
+        seen: list[str] = []
+        entries = walk(root, target, extensions, exclude)
+        try:
+            while page := await asyncio.to_thread(_take, entries, _WALK_PAGE):
+                stats["files"] += len(page)
+                seen.extend(entry.path for entry in page)
+                known = await self._known([entry.path for entry in page])
+                for entry in page:
+                    stored = known.get(entry.path)
+                    if entry.size > self.config.documents_max_file_bytes:
+                        stats["skipped"] += 1
+                    elif stored is not None and stored[:2] == (entry.size, entry.mtime_ns):
+                        stats["unchanged"] += 1
+                    else:
+                        await queue.put((entry, stored[2] if stored else None))
+                self._report(stats)
+            for _ in tasks:
+                await queue.put(None)
+            await asyncio.gather(*tasks)
+            prefix = "" if target == root else stats["path"]
+            stats["removed"] = await self._remove_missing(prefix, seen)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            stats["running"] = False
+            raise
+        stats["running"] = False
+        self._report(stats, final=True)
+        return stats
+
+    async def _worker(
+        self,
+        root: Path,
+        queue: asyncio.Queue[tuple[FileEntry, str | None] | None],
+        stats: dict[str, Any],
+    ) -> None:
+        batch: list[Loaded] = []
+        pending = 0
+        while True:
+            item = await queue.get()
+            if item is None:
+                await self._store(batch, stats)
+                return
+            entry, previous_hash = item
+            try:
+                digest, chunks = await asyncio.to_thread(
+                    _load, root / entry.path, previous_hash, self.config.documents_chunk_chars
+                )
+            except OSError:
+                stats["failed"] += 1
+                logger.warning("kg_documents_unreadable_file", path=entry.path)
+                continue
+            batch.append((entry, digest, chunks))
+            pending += len(chunks or ())
+            if pending >= self.config.documents_batch_size or queue.empty():
+                await self._store(batch, stats)
+                self._report(stats)
+                batch, pending = [], 0
+
+    async def _store(self, batch: list[Loaded], stats: dict[str, Any]) -> None:
+        """Chunks of ``batch`` in one ``add_facts`` call, then the files' rows."""
+        if not batch:
+            return
+        texts = [chunk for _, _, chunks in batch for chunk in chunks or ()]
+        sources = [entry.path for entry, _, chunks in batch for _ in chunks or ()]
+        # Every changed file gives up its previous chunks, even one now empty.
+        changed_paths = [entry.path for entry, _, chunks in batch if chunks is not None]
+        try:
+            if texts:
+                await self.kg.add_facts(texts, sources=sources, release=changed_paths)
+        except Exception:  # noqa: BLE001
+            # The rows are not written, so the next run retries these files.
+            stats["failed"] += len(batch)
+            logger.exception("kg_documents_batch_failed", files=len(batch), chunks=len(texts))
+            return
+        now = datetime.utcnow().isoformat()
+        async with self.kg.db.writer() as db:
+            if not texts:
+                await release_chunks(db, changed_paths, self._fact_expires())
+            await db.executemany(
+                _UPSERT_DOCUMENT,
+                [
+                    (entry.path, entry.size, entry.mtime_ns, digest, len(chunks), now)
+                    for entry, digest, chunks in batch
+                    if chunks is not None
+                ],
+            )
+            await db.executemany(
+                "UPDATE documents SET size = ?, mtime_ns = ? WHERE path = ?",
+                [
+                    (entry.size, entry.mtime_ns, entry.path)
+                    for entry, _, chunks in batch
+                    if chunks is None
+                ],
+            )
+        changed = sum(chunks is not None for _, _, chunks in batch)
+        stats["indexed"] += changed
+        stats["unchanged"] += len(batch) - changed
+        stats["chunks"] += len(texts)
+        stats["bytes"] += sum(entry.size for entry, _, chunks in batch if chunks is not None)
+
+    async def _known(self, paths: list[str]) -> dict[str, tuple[int, int, str]]:
+        async with self.kg.db.reader() as db:
+            rows = await db.execute_fetchall(
+                """
+                SELECT d.path, d.size, d.mtime_ns, d.content_hash
+                FROM json_each(?) AS j JOIN documents d ON d.path = j.value
+                """,
+                (dumps(paths),),
+            )
+        return {row[0]: tuple(row[1:]) for row in rows}
+
+    async def _remove_missing(self, prefix: str, seen: list[str]) -> int:
+        async with self.kg.db.writer() as db:
+            rows = await db.execute_fetchall(
+                """
+                DELETE FROM documents
+                WHERE (?1 = '' OR path = ?1 OR substr(path, 1, length(?1) + 1) = ?1 || '/')
+                  AND path NOT IN (SELECT value FROM json_each(?2))
+                RETURNING path
+                """,
+                (prefix, dumps(seen)),
+            )
+            await release_chunks(db, [row[0] for row in rows], self._fact_expires())
+        return len(rows)
+
+    def _fact_expires(self) -> str:
+        return (datetime.utcnow() + timedelta(days=self.config.default_ttl_days)).isoformat()
+
+    def _report(self, stats: dict[str, Any], final: bool = False) -> None:
+        now = time.perf_counter()
+        elapsed = max(now - self._started, 1e-9)
+        stats["elapsed_ms"] = round(elapsed * 1000, 1)
+        done = stats["indexed"] + stats["unchanged"] + stats["skipped"] + stats["failed"]
+        stats["files_per_s"] = round(done / elapsed, 1)
+        stats["chunks_per_s"] = round(stats["chunks"] / elapsed, 1)
+        if final:
+            logger.info("kg_documents_indexed", db_path=self.kg.db_path, **stats)
+        elif now - self._last_report >= _PROGRESS_SECONDS:
+            self._last_report = now
+            logger.info("kg_documents_progress", db_path=self.kg.db_path, **stats)
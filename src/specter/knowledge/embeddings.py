@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import asyncio
+import math
+import re
+import zlib
+from array import array
+from collections.abc import Sequence
+from typing import Protocol
+
+from ..config import KnowledgeConfig, settings
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def pack_vector(vector: Sequence[float]) -> bytes:
+    """Little-endian float32 bytes, the format stored in ``entities.vector``."""
+    packed = array("f", vector)
+    if packed.itemsize != 4:  # pragma: no cover - float is 32-bit on supported platforms
+        raise RuntimeError("float32 arrays are required")
+    return packed.tobytes()
+
+
+def unpack_vector(blob: bytes) -> list[float]:
+    return array("f", blob).tolist()
+
+
+class Embedder(Protocol):
+    """Turns texts into fixed-size vectors; cosine similarity is used for search."""
+
+    name: str
+    dim: int
+
+    async def embed(self, texts: list[str]) -> list[list[float]]: ...
+
+
+class HashingEmbedder:
+    """Offline embedder: word and character n-grams hashed into ``dim`` signed buckets.
+
+    Deterministic across processes (crc32, not ``hash``), so stored vectors stay
+    comparable after a restart. Output vectors are L2-normalised.
+    """
+
+    name = "hashing"
+
+    def __init__(self, dim: int = 256, ngram: int = 3) -> None:
+        self.dim = dim
+        self.ngram = ngram
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        # Pure-Python hashing: run the batch off the event loop so a bulk ingest
+        # does not stall other requests.
+        return await asyncio.to_thread(lambda: [self.embed_one(text) for text in texts])
+
+    def embed_one(self, text: str) -> list[float]:
+        vector = [0.0] * self.dim
+        for feature, weight in self._features(text.lower()):
+            h = zlib.crc32(feature.encode())
+            vector[h % self.dim] += weight if (h >> 31) & 1 else -weight
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def _features(self, text: str) -> list[tuple[str, float]]:
+        features: list[tuple[str, float]] = []
+        for word in _WORD_RE.findall(text):
+            features.append((f"w:{word}", 1.0))
+            padded = f" {word} "
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                features.append((f"c:{padded[i : i + self.ngram]}", 0.5))
+        return features
+
+
+class LiteLLMEmbedder:
+    """Embeddings from a hosted model through litellm (e.g. ``text-embedding-3-small``)."""
+
+    name = "litellm"
+
+    def __init__(self, model: str, dim: int) -> None:
+        self.model = model
+        self.dim = dim
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        import litellm
+
+        response = await litellm.aembedding(model=self.model, input=texts)
+        return [item["embedding"] for item in response.data]
+
+
+def build_embedder(config: KnowledgeConfig | None = None) -> Embedder:
+    cfg = config or settings.specter.knowledge
+    if cfg.embedder == "hashing":
+        return HashingEmbedder(cfg.embedding_dim)
+    if cfg.embedder == "litellm":
+        if not cfg.embedding_model:
+            raise ValueError("knowledge.embedder=litellm requires knowledge.embedding_model")
+        return LiteLLMEmbedder(cfg.embedding_model, cfg.embedding_dim)
+    raise ValueError(f"Unknown embedder: {cfg.embedder}")
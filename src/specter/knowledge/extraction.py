@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import re
+from collections import deque
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+
+EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+URL = re.compile(r"https?://[^\s<>\"'()\[\]]+")
+NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+# Runs of capitalised words ("Acme", "New York", "O'Brien"); all-caps tokens excluded.
+CAPITALISED = re.compile(r"\b[A-Z][a-z][\w'-]*(?: +[A-Z][a-z][\w'-]*)*")
+TOKEN = re.compile(r"\w+")
+
+# Types found by the patterns above, never loaded into the gazetteer.
+PATTERN_TYPES = frozenset({"fact", "email", "url", "number"})
+
+Span = tuple[int, int]
+Entity = dict[str, str]
+
+
+class AhoCorasick:
+    """Aho–Corasick automaton over token sequences.
+
+    Patterns are tuples of casefolded word tokens, so matches always fall on word
+    boundaries and the trie has one node per distinct name prefix in words.
+    """
+
+    def __init__(self, patterns: Iterable[tuple[str, ...]]) -> None:
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[list[int]] = [[]]
+        self.patterns: list[tuple[str, ...]] = []
+        for pattern in patterns:
+            self._insert(pattern)
+        self._fail = [0] * len(self._goto)
+        # Nearest node along the failure chain that ends a pattern, or -1.
+        self._link = [-1] * len(self._goto)
+        self._build()
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def _insert(self, pattern: tuple[str, ...]) -> None:
+        node = 0
+        for token in pattern:
+            child = self._goto[node].get(token)
+            if child is None:
+                child = len(self._goto)
+                self._goto.append({})
+                self._out.append([])
+                self._goto[node][token] = child
+            node = child
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self._goto[node].items():
+                state = self._fail[node]
+                while state and token not in self._goto[state]:
+                    state = self._fail[state]
+                fail = self._goto[state].get(token, 0)
+                self._fail[child] = fail
+                self._link[child] = fail if self._out[fail] else self._link[fail]
+                queue.append(child)
+
+    def iter(self, tokens: list[str]) -> Iterator[tuple[int, int]]:
+        """``(end_token_index, pattern_index)`` for every match, in one pass."""
+        node = 0
+        for position, token in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            state = node
+            while state > 0:
+                for pattern in self._out[state]:
+                    yield position, pattern
+                state = self._link[state]
+
+
+class Gazetteer:
+    """Known entity names, matched case-insensitively in one pass over the text.
+
+    ``add`` is incremental: new names go into a small pending automaton that is
+    rebuilt on each add, and are folded into the main automaton once they exceed
+    ``rebuild_ratio`` of it. ``discard`` hides names without a rebuild.
+    """
+
+    def __init__(self, min_chars: int = 3, rebuild_ratio: float = 0.1) -> None:
+        self.min_chars = min_chars
+        self.rebuild_ratio = rebuild_ratio
+        # tokens -> (type, name) as first stored
+        self._known: dict[tuple[str, ...], tuple[str, str]] = {}
+        self._main = AhoCorasick(())
+        self._pending: list[tuple[str, ...]] = []
+        self._recent = AhoCorasick(())
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def add(self, entries: Iterable[tuple[str, str]]) -> int:
+        """Add ``(type, name)`` pairs; returns how many names were new."""
+        added = 0
+        for ent_type, name in entries:
+            if ent_type in PATTERN_TYPES or len(name) < self.min_chars:
+                continue
+            key = tuple(TOKEN.findall(name.casefold()))
+            if not key or key in self._known:
+                continue
+            self._known[key] = (ent_type, name)
+            self._pending.append(key)
+            added += 1
+        if added:
+            if len(self._pending) > max(256, self.rebuild_ratio * len(self._main)):
+                self._main = AhoCorasick(self._known)
+                self._pending = []
+            self._recent = AhoCorasick(self._pending)
+        return added
+
+    def discard(self, entries: Iterable[tuple[str, str]]) -> None:
+        for _, name in entries:
+            key = tuple(TOKEN.findall(name.casefold()))
+            self._known.pop(key, None)
+
+    def find(self, text: str) -> list[tuple[Span, tuple[str, str]]]:
+        """Leftmost-longest non-overlapping matches as ``((start, end), (type, name))``."""
+        if not self._known:
+            return []
+        matches = list(TOKEN.finditer(text))
+        spans = [match.span() for match in matches]
+        tokens = [match.group().casefold() for match in matches]
+        candidates: list[tuple[int, int, tuple[str, ...]]] = []
+        for automaton in (self._main, self._recent):
+            for end, index in automaton.iter(tokens):
+                pattern = automaton.patterns[index]
+                if pattern in self._known:
+                    candidates.append((end - len(pattern) + 1, end, pattern))
+        candidates.sort(key=lambda c: (c[0], c[0] - c[1]))
+        found: list[tuple[Span, tuple[str, str]]] = []
+        covered = -1
+        for first, last, pattern in candidates:
+            if first > covered:
+                found.append(((spans[first][0], spans[last][1]), self._known[pattern]))
+                covered = last
+        return found
+
+
+@dataclass
+class Scan:
+    """What the local patterns and gazetteer found in one text."""
+
+    entities: list[Entity] = field(default_factory=list)
+    # Capitalised spans the gazetteer does not know.
+    unknown: list[str] = field(default_factory=list)
+
+    def found(self) -> list[Entity]:
+        """The entities, with the unknown spans as proper nouns."""
+        return self.entities + [{"type": "proper_noun", "name": name} for name in self.unknown]
+
+
+class LocalExtractor:
+    """Entity extraction without the LLM: precompiled patterns plus a gazetteer."""
+
+    def __init__(self, gazetteer: Gazetteer | None = None) -> None:
+        self.gazetteer = gazetteer or Gazetteer()
+
+    def scan(self, text: str) -> Scan:
+        scan = Scan()
+        taken: list[Span] = []
+        for pattern, ent_type in ((URL, "url"), (EMAIL, "email")):
+            for match in pattern.finditer(text):
+                if not _overlaps(match.span(), taken):
+                    taken.append(match.span())
+                    scan.entities.append({"type": ent_type, "name": match.group()})
+        for match in NUMBER.finditer(text):
+            if not _overlaps(match.span(), taken):
+                scan.entities.append({"type": "number", "name": match.group()})
+        for span, (ent_type, name) in self.gazetteer.find(text):
+            if not _overlaps(span, taken):
+                taken.append(span)
+                scan.entities.append({"type": ent_type, "name": name})
+        for match in CAPITALISED.finditer(text):
+            span = match.span()
+            if _overlaps(span, taken):
+                continue
+            name = match.group()
+            # A capitalised word opening a sentence is usually just grammar.
+            if _opens_sentence(text, span[0]):
+                name = name.partition(" ")[2].lstrip()
+            if name:
+                scan.unknown.append(name)
+        return scan
+
+    def extract(self, text: str) -> list[Entity]:
+        """Everything ``scan`` finds, with unknown capitalised spans as proper nouns."""
+        return self.scan(text).found()
+
+
+def _opens_sentence(text: str, start: int) -> bool:
+    position = start - 1
+    while position >= 0 and text[position].isspace():
+        if text[position] == "\n":
+            return True
+        position -= 1
+    return position < 0 or text[position] in ".!?:;"
+
+
+def _overlaps(span: Span, taken: list[Span]) -> bool:
+    return any(span[0] < end and start < span[1] for start, end in taken)
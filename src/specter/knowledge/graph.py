@@ -1,136 +1,706 @@
 from __future__ import annotations
 
-import json
-import re
+import asyncio
+import hashlib
+import time
 import uuid
-from datetime import datetime, timedelta
+from collections import Counter
+from datetime import date, datetime, timedelta
 from pathlib import Path
 from typing import Any
 
 import aiosqlite
+import structlog
 
 from ..config import settings
+from ..core.database import Database, fts_query, get_database
+from ..core.serialization import dumps, loads
 from ..llm.router import LLMRouter
+from . import bundle, traversal
+from .ann import AnnIndex
+from .cache import LRUCache
+from .documents import DocumentIndexer, release_chunks
+from .embeddings import Embedder, build_embedder, pack_vector
+from .extraction import Gazetteer, LocalExtractor
+from .ingest import IngestQueue
+from .retrieval import NeighbourhoodCache, expand, rrf_merge
+from .tiering import AccessTracker, ColdTier, Removed
+from .vectors import VectorCache
+
+logger = structlog.get_logger(__name__)
+
+# bm25 column weights for entities_fts(name, body): name hits rank above body hits.
+_BM25 = "bm25(entities_fts, 2.0, 1.0)"
+_SNIPPET = "snippet(entities_fts, -1, '[', ']', '…', 12)"
+_INSERT_FACT = (
+    "INSERT INTO entities (id, type, name, attributes, vector, created_at, expires_at, "
+    "content_hash) VALUES (?, 'fact', ?, ?, ?, ?, ?, ?)"
+)
+_INSERT_ENTITY = (
+    "INSERT INTO entities (id, type, name, attributes, vector, created_at, expires_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?)"
+)
+# One row per (source, target, type): a repeat adds its confidence to the stored
+# strength after decaying it by the time since the edge was last seen. The last
+# parameter is the half-life in days.
+_UPSERT_EDGE = """
+    INSERT INTO relationships (
+        id, source_id, target_id, relation_type, strength, created_at, last_seen_at
+    )
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(source_id, target_id, relation_type) DO UPDATE SET
+        mentions = mentions + 1,
+        strength = coalesce(strength, 0) * pow(
+            0.5,
+            max(0, julianday(excluded.last_seen_at)
+                   - julianday(coalesce(last_seen_at, created_at)))
+            / ?
+        ) + excluded.strength,
+        last_seen_at = excluded.last_seen_at
+"""
+# Day and week rollups are one row per period; folding replaces the text.
+_UPSERT_ROLLUP = """
+    INSERT INTO summaries (id, summary, source_count, created_at, level, period_start, period_end)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(level, period_start) WHERE level != 'window' DO UPDATE SET
+        summary = excluded.summary,
+        source_count = summaries.source_count + excluded.source_count,
+        period_end = excluded.period_end,
+        created_at = excluded.created_at
+"""
+# Statements per batched entity-extraction prompt.
+_EXTRACT_BATCH = 25
+
+
+def content_hash(text: str) -> str:
+    """Hash of a fact's text, ignoring case and whitespace differences."""
+    normalised = " ".join(text.casefold().split())
+    return hashlib.blake2b(normalised.encode("utf-8"), digest_size=16).hexdigest()
 
 
 class KnowledgeGraph:
-    def __init__(self, db_path: str) -> None:
+    def __init__(
+        self, db_path: str, db: Database | None = None, embedder: Embedder | None = None
+    ) -> None:
         self.db_path = db_path
+        self.db = db or get_database(db_path)
+        self.embedder = embedder or build_embedder()
+        self.vectors = VectorCache(
+            self.db, self.embedder.dim, settings.specter.knowledge.vector_cache_size
+        )
+        self.ann = AnnIndex(self.db, self.embedder.dim, self.embedder.name)
+        self.neighbours = NeighbourhoodCache(
+            self.db, settings.specter.knowledge.neighbourhood_cache_size
+        )
+        self.ingest = IngestQueue(self.add_facts)
+        self.documents = DocumentIndexer(self)
+        self.access = AccessTracker(self.db)
+        self.cold = ColdTier(self.db)
+        self._summary_lock = asyncio.Lock()
+        # Rows deleted by TTL sweeps since start-up.
+        self.reclaimed = {"entities": 0, "relationships": 0}
+        # (type, name) -> id for extracted entities; evicted when TTL cleanup deletes them.
+        self.entity_ids: LRUCache[tuple[str, str], str] = LRUCache(
+            settings.specter.knowledge.entity_cache_size
+        )
+        self.extractor = LocalExtractor(Gazetteer(settings.specter.knowledge.gazetteer_min_chars))
+        # Highest entities rowid loaded into the gazetteer; -1 until the first load.
+        self._gazetteer_rowid = -1
+        # Texts whose entities came from the local extractor vs. an LLM prompt.
+        self.extraction = {"local": 0, "llm": 0}
 
     async def init(self) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS schema_migrations (
-                    id TEXT PRIMARY KEY,
-                    applied_at TIMESTAMP
-                )
-                """
-            )
-            cursor = await db.execute("SELECT id FROM schema_migrations")
-            applied = {row[0] for row in await cursor.fetchall()}
-            for migration in sorted(Path("migrations").glob("*.sql")):
-                if migration.name in applied:
-                    continue
-                with open(migration, encoding="utf-8") as f:
-                    await db.executescript(f.read())
-                await db.execute(
-                    "INSERT OR REPLACE INTO schema_migrations (id, applied_at) VALUES (?, ?)",
-                    (migration.name, datetime.utcnow().isoformat()),
-                )
-            await db.commit()
-        await self.cleanup_expired()
+        await self.db.migrate()
+        # Indexes left dropped by an interrupted bulk import.
+        await bundle.restore_schema(self.db)
+        await self.ann.load()
+
+    async def close(self) -> None:
+        await self.documents.close()
+        await self.ingest.close()
+        await self.access.close()
+        await self.ann.save()
 
     async def add_fact(self, statement: str, confidence: float = 1.0) -> str:
-        fact_id = str(uuid.uuid4())
+        return (await self.add_facts([statement], confidence))[0]
+
+    async def add_facts(
+        self,
+        statements: list[str],
+        confidence: float = 1.0,
+        sources: list[str | None] | None = None,
+        release: list[str] | None = None,
+    ) -> list[str]:
+        """Store many facts in one transaction; returns their ids in input order.
+
+        Entities are extracted locally, with batched LLM prompts only for statements
+        that mention unknown names, embedded in one call and resolved with set-based
+        lookups. A fact whose normalised text is already stored is not extracted
+        again: its existing id is returned, its ``access_count`` bumped and its TTL
+        refreshed. ``sources`` gives a document path per statement: those facts keep
+        it in ``attributes["source"]``, never expire and are never tiered. Facts of the
+        documents in ``release`` first go back to the fact TTL, in the same transaction.
+        """
+        if not statements:
+            return []
         now = datetime.utcnow().isoformat()
-        expires_at = self._expires_at("fact")
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT INTO entities (id, type, name, attributes, created_at, expires_at) "
-                "VALUES (?, ?, ?, ?, ?, ?)",
-                (fact_id, "fact", statement[:128], json.dumps({"raw": statement}), now, expires_at),
-            )
-            entities = await self._extract_entities(statement)
-            for ent in entities:
-                ent_id = await self._get_or_create_entity(db, ent["type"], ent["name"], now)
+        fact_expires = self._expires_at("fact")
+        hashes = [content_hash(text) for text in statements]
+        sourced = {
+            digest: source
+            for digest, source in zip(hashes, sources or [None] * len(hashes), strict=True)
+            if source
+        }
+        async with self.db.reader() as db:
+            fact_ids = await self._facts_by_hash(db, hashes)
+        # First occurrence of each text not stored yet.
+        fresh: dict[str, str] = {}
+        for digest, text in zip(hashes, statements, strict=True):
+            if digest not in fact_ids:
+                fresh.setdefault(digest, text)
+        proposed = {digest: str(uuid.uuid4()) for digest in fresh}
+        texts = list(fresh.values())
+        extracted = await self._extract_entities_batch(texts) if texts else []
+        mentions = [list(dict.fromkeys((e["type"], e["name"]) for e in ents)) for ents in extracted]
+        pairs = list(dict.fromkeys(pair for found in mentions for pair in found))
+        vectors = await self._embed(texts + [name for _, name in pairs]) if texts else []
+        fact_vectors, pair_vectors = vectors[: len(texts)], vectors[len(texts) :]
+        ids: dict[tuple[str, str], str] = {}
+        created: set[tuple[str, str]] = set()
+        async with self.db.writer() as db:
+            await release_chunks(db, release or [], fact_expires)
+            if fresh:
+                await db.executemany(
+                    f"{_INSERT_FACT} ON CONFLICT DO NOTHING",
+                    [
+                        (
+                            proposed[digest],
+                            text[:128],
+                            dumps({"raw": text, "source": sourced[digest]})
+                            if digest in sourced
+                            else dumps({"raw": text}),
+                            vector,
+                            now,
+                            None if digest in sourced else fact_expires,
+                            digest,
+                        )
+                        for (digest, text), vector in zip(fresh.items(), fact_vectors, strict=True)
+                    ],
+                )
+                # Another writer may have stored the same text since the lookup.
+                fact_ids.update(await self._facts_by_hash(db, list(fresh)))
+                ids, created = await self._resolve_entities(
+                    db, pairs, dict(zip(pairs, pair_vectors, strict=True)), now
+                )
+                half_life = settings.specter.knowledge.relationship_half_life_days
+                await db.executemany(
+                    _UPSERT_EDGE,
+                    [
+                        (
+                            str(uuid.uuid4()),
+                            ids[pair],
+                            fact_ids[digest],
+                            "mentioned_in",
+                            confidence,
+                            now,
+                            now,
+                            half_life,
+                        )
+                        for digest, found in zip(fresh, mentions, strict=True)
+                        for pair in found
+                    ],
+                )
+            stored = {digest for digest in fresh if fact_ids[digest] == proposed[digest]}
+            repeats = Counter(hashes)
+            repeats.subtract(stored)
+            if +repeats:
                 await db.execute(
                     """
-                    INSERT INTO relationships (
-                        id, source_id, target_id, relation_type, strength, context, created_at
-                    )
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    UPDATE entities
+                    SET access_count = coalesce(access_count, 0) + json_extract(j.value, '$[1]'),
+                        last_accessed_at = ?1,
+                        attributes = CASE WHEN json_extract(j.value, '$[2]') IS NULL
+                            THEN attributes
+                            ELSE json_set(coalesce(attributes, '{}'), '$.source',
+                                          json_extract(j.value, '$[2]'))
+                        END,
+                        expires_at = CASE WHEN json_extract(j.value, '$[2]') IS NULL
+                                          AND json_extract(attributes, '$.source') IS NULL
+                            THEN ?2
+                        END
+                    FROM json_each(?3) AS j
+                    WHERE entities.id = json_extract(j.value, '$[0]')
                     """,
                     (
-                        str(uuid.uuid4()),
-                        ent_id,
-                        fact_id,
-                        "mentioned_in",
-                        confidence,
-                        json.dumps({"statement": statement}),
                         now,
+                        fact_expires,
+                        dumps([[fact_ids[d], n, sourced.get(d)] for d, n in (+repeats).items()]),
                     ),
                 )
-            await db.commit()
-        await self._auto_summarize()
-        return fact_id
+        inserted = [
+            (proposed[digest], "fact", vector)
+            for digest, vector in zip(fresh, fact_vectors, strict=True)
+            if digest in stored and vector is not None
+        ] + [
+            (ids[pair], pair[0], vector)
+            for pair, vector in zip(pairs, pair_vectors, strict=True)
+            if pair in created and vector is not None
+        ]
+        self.vectors.add(inserted)
+        self.ann.add(inserted)
+        self.neighbours.invalidate([*(fact_ids[d] for d in fresh), *ids.values()])
+        for pair, ent_id in ids.items():
+            self.entity_ids.put(pair, ent_id)
+        if stored:
+            await self._auto_summarize()
+        return [fact_ids[digest] for digest in hashes]
+
+    @staticmethod
+    async def _facts_by_hash(db: aiosqlite.Connection, hashes: list[str]) -> dict[str, str]:
+        found: dict[str, str] = {}
+        unique = list(dict.fromkeys(hashes))
+        for start in range(0, len(unique), 500):
+            rows = await db.execute_fetchall(
+                """
+                SELECT e.content_hash, e.id FROM json_each(?) AS j
+                JOIN entities e ON e.content_hash = j.value
+                """,
+                (dumps(unique[start : start + 500]),),
+            )
+            found.update(rows)
+        return found
+
+    async def backfill_fact_hashes(self, batch_size: int = 1000) -> int:
+        """Hash facts stored before content hashes existed; later duplicates stay NULL."""
+        total = 0
+        last_rowid = 0
+        while True:
+            async with self.db.writer() as db:
+                rows = await db.execute_fetchall(
+                    """
+                    SELECT rowid, id, attributes FROM entities
+                    WHERE type = 'fact' AND content_hash IS NULL AND rowid > ?
+                    ORDER BY rowid
+                    LIMIT ?
+                    """,
+                    (last_rowid, batch_size),
+                )
+                if not rows:
+                    return total
+                cursor = await db.executemany(
+                    "UPDATE OR IGNORE entities SET content_hash = ? WHERE id = ?",
+                    [
+                        (content_hash(loads(attributes or "{}").get("raw", "")), ent_id)
+                        for _, ent_id, attributes in rows
+                    ],
+                )
+                total += max(0, cursor.rowcount)
+            last_rowid = rows[-1][0]
+
+    async def _resolve_entities(
+        self,
+        db: aiosqlite.Connection,
+        pairs: list[tuple[str, str]],
+        vectors: dict[tuple[str, str], bytes | None],
+        now: str,
+    ) -> tuple[dict[tuple[str, str], str], set[tuple[str, str]]]:
+        """Ids for ``(type, name)`` pairs, inserting the missing ones in one batch.
+
+        Cached pairs skip the database. Inserts use ``ON CONFLICT DO NOTHING`` against
+        the unique (type, name) index, so a row another writer created first wins.
+        Returns the id map and the set of pairs this call created. Callers add the
+        pairs to ``entity_ids`` once the transaction has committed.
+        """
+        ids: dict[tuple[str, str], str] = {}
+        misses: list[tuple[str, str]] = []
+        for pair in pairs:
+            cached = self.entity_ids.get(pair)
+            if cached is None:
+                misses.append(pair)
+            else:
+                ids[pair] = cached
+        ids.update(await self._lookup_entities(db, misses))
+        proposed = {pair: str(uuid.uuid4()) for pair in misses if pair not in ids}
+        if proposed:
+            await db.executemany(
+                f"{_INSERT_ENTITY} ON CONFLICT DO NOTHING",
+                [
+                    (ent_id, pair[0], pair[1], dumps({}), vectors.get(pair), now, expires)
+                    for pair, ent_id in proposed.items()
+                    for expires in [self._expires_at(pair[0])]
+                ],
+            )
+            ids.update(await self._lookup_entities(db, list(proposed)))
+        created = {pair for pair, ent_id in proposed.items() if ids[pair] == ent_id}
+        return ids, created
+
+    @staticmethod
+    async def _lookup_entities(
+        db: aiosqlite.Connection, pairs: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], str]:
+        ids: dict[tuple[str, str], str] = {}
+        for start in range(0, len(pairs), 500):
+            rows = await db.execute_fetchall(
+                """
+                SELECT e.type, e.name, e.id FROM json_each(?) AS j
+                JOIN entities e
+                  ON e.type = json_extract(j.value, '$[0]')
+                 AND e.name = json_extract(j.value, '$[1]')
+                """,
+                (dumps(pairs[start : start + 500]),),
+            )
+            for ent_type, name, ent_id in rows:
+                ids.setdefault((ent_type, name), ent_id)
+        return ids
 
     async def query(self, question: str, limit: int = 5) -> list[dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
+        """Full-text search over entity names and fact text, best BM25 match first."""
+        if not question.split():
+            return []
+        async with self.db.reader() as db:
             cursor = await db.execute(
-                """
-                SELECT id, name, attributes FROM entities
-                WHERE name LIKE ? OR attributes LIKE ?
-                ORDER BY created_at DESC LIMIT ?
+                f"""
+                SELECT e.id, e.name, e.attributes, {_BM25} AS rank, {_SNIPPET}
+                FROM entities_fts
+                JOIN entities e ON e.rowid = entities_fts.rowid
+                WHERE entities_fts MATCH ?
+                ORDER BY rank LIMIT ?
                 """,
-                (f"%{question}%", f"%{question}%", limit),
+                (fts_query(question), limit),
             )
             rows = await cursor.fetchall()
+            self.access.record(r[0] for r in rows)
             return [
-                {"id": r[0], "name": r[1], "attributes": json.loads(r[2] or "{}")} for r in rows
+                {
+                    "id": r[0],
+                    "name": r[1],
+                    "attributes": loads(r[2] or "{}"),
+                    "score": round(-r[3], 6),
+                    "snippet": r[4],
+                }
+                for r in rows
             ]
 
-    async def summarize_recent(self, limit: int | None = None) -> dict[str, Any]:
-        window = limit or settings.specter.knowledge.summary_window
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """
-                SELECT attributes FROM entities
-                WHERE type = 'fact'
-                ORDER BY created_at DESC
-                LIMIT ?
+    async def semantic_search(
+        self, text: str, limit: int = 5, ent_type: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Entities closest to ``text`` by cosine similarity of their embeddings.
+
+        Large graphs are served from the ANN index, smaller ones by exact search.
+        """
+        hits = await self._vector_hits(text, limit, ent_type)
+        rows = await self._fetch_entities([entity_id for entity_id, _ in hits])
+        self.access.record(list(rows))
+        return [
+            {**rows[entity_id], "score": round(score, 6)}
+            for entity_id, score in hits
+            if entity_id in rows
+        ]
+
+    async def retrieve(
+        self, text: str, limit: int = 10, budget_ms: float | None = None
+    ) -> dict[str, Any]:
+        """Hybrid retrieval: keyword, vector and graph-neighbourhood candidates fused by RRF.
+
+        The generators run concurrently. Any still running after ``budget_ms`` is
+        cancelled and listed under ``partial``; the others are still fused.
+        """
+        cfg = settings.specter.knowledge
+        budget = cfg.retrieval_budget_ms if budget_ms is None else budget_ms
+        depth = max(20, 3 * limit)
+        timings: dict[str, float] = {}
+
+        async def timed(name: str, coro: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return await coro
+            finally:
+                timings[name] = round((time.perf_counter() - started) * 1000, 3)
+
+        tasks = {
+            "keyword": asyncio.create_task(timed("keyword", self._keyword_hits(text, depth))),
+            "vector": asyncio.create_task(timed("vector", self._vector_hits(text, depth))),
+            "graph": asyncio.create_task(timed("graph", self._graph_hits(text, depth))),
+        }
+        _, pending = await asyncio.wait(tasks.values(), timeout=budget / 1000)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        rankings: dict[str, list[str]] = {}
+        snippets: dict[str, str] = {}
+        partial: list[str] = []
+        for name, task in tasks.items():
+            if task.cancelled() or task.exception() is not None:
+                if not task.cancelled():
+                    logger.warning(
+                        "retrieval_generator_failed", generator=name, error=str(task.exception())
+                    )
+                partial.append(name)
+                continue
+            hits = task.result()
+            rankings[name] = [hit[0] for hit in hits]
+            if name == "keyword":
+                snippets = dict(hits)
+
+        fused = rrf_merge(rankings, k=cfg.retrieval_rrf_k)[:limit]
+        rows = await self._fetch_entities([entity_id for entity_id, _, _ in fused])
+        results = []
+        for entity_id, score, sources in fused:
+            if entity_id not in rows:
+                continue
+            item = {**rows[entity_id], "score": round(score, 6), "sources": sources}
+            if entity_id in snippets:
+                item["snippet"] = snippets[entity_id]
+            results.append(item)
+        self.access.record(item["id"] for item in results)
+        return {"results": results, "partial": partial, "timings_ms": timings}
+
+    async def _keyword_hits(self, text: str, limit: int) -> list[tuple[str, str]]:
+        """``(entity_id, snippet)`` by BM25."""
+        if not text.split():
+            return []
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                SELECT e.id, {_SNIPPET} FROM entities_fts
+                JOIN entities e ON e.rowid = entities_fts.rowid
+                WHERE entities_fts MATCH ? ORDER BY {_BM25} LIMIT ?
                 """,
-                (window,),
-            )
-            rows = await cursor.fetchall()
-        facts = [json.loads(r[0]).get("raw", "") for r in rows if r[0]]
-        if not facts:
-            return {"summary": "", "source_count": 0}
-        summary = await self._summarize_texts(facts)
-        summary_id = str(uuid.uuid4())
-        now = datetime.utcnow().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                "INSERT INTO summaries (id, summary, source_count, created_at) VALUES (?, ?, ?, ?)",
-                (summary_id, summary, len(facts), now),
+                (fts_query(text), limit),
             )
-            await db.commit()
-        return {"summary": summary, "source_count": len(facts), "id": summary_id}
+        return [(r[0], r[1]) for r in rows]
 
-    async def list_summaries(self, limit: int = 5) -> list[dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """
-                SELECT id, summary, source_count, created_at
-                FROM summaries
-                ORDER BY created_at DESC
-                LIMIT ?
+    async def _vector_hits(
+        self, text: str, limit: int, ent_type: str | None = None
+    ) -> list[tuple[str, float]]:
+        [vector] = await self.embedder.embed([text])
+        index = self.ann if self.ann.active else self.vectors
+        return (await index.search([vector], limit, ent_type))[0]
+
+    async def _graph_hits(self, text: str, limit: int) -> list[tuple[str]]:
+        """Neighbours of the entities whose names match ``text``."""
+        if not text.split():
+            return []
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                SELECT e.id FROM entities_fts
+                JOIN entities e ON e.rowid = entities_fts.rowid
+                WHERE entities_fts MATCH ? ORDER BY {_BM25} LIMIT 8
                 """,
-                (limit,),
+                (fts_query(text, column="name"),),
             )
-            rows = await cursor.fetchall()
+        seeds = [r[0] for r in rows]
+        if not seeds:
+            return []
+        neighbours = await self.neighbours.neighbours(seeds)
+        return [(entity_id,) for entity_id in expand(seeds, neighbours, limit)]
+
+    async def _fetch_entities(self, ids: list[str]) -> dict[str, dict[str, Any]]:
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                f"SELECT id, type, name, attributes FROM entities WHERE id IN ({marks})", ids
+            )
+        return {
+            r[0]: {"id": r[0], "type": r[1], "name": r[2], "attributes": loads(r[3] or "{}")}
+            for r in rows
+        }
+
+    async def neighbourhood(
+        self,
+        entity: str,
+        depth: int = 2,
+        *,
+        direction: str = "both",
+        relation_types: list[str] | None = None,
+        min_strength: float = 0.0,
+        fan_out: int | None = None,
+        max_nodes: int | None = None,
+    ) -> dict[str, Any] | None:
+        """Entities within ``depth`` hops of ``entity`` (an id or exact name).
+
+        Returns ``None`` when the entity does not exist.
+        """
+        cfg = settings.specter.knowledge
+        edges = self._edge_filter(direction, relation_types, min_strength, fan_out)
+        depth = max(0, min(depth, cfg.traversal_max_depth))
+        async with self.db.reader() as db:
+            root = await self._resolve_ref(db, entity)
+            if root is None:
+                return None
+            depths, found, truncated = await traversal.k_hop(
+                db, root, depth, edges, max_nodes or cfg.traversal_max_nodes
+            )
+        nodes = await self._fetch_entities(list(depths))
+        self.access.record([root])
+        return {
+            "root": root,
+            "nodes": [
+                {**nodes[node_id], "depth": hops}
+                for node_id, hops in depths.items()
+                if node_id in nodes
+            ],
+            "edges": [edge.to_dict() for edge in found],
+            "truncated": truncated,
+        }
+
+    async def shortest_path(
+        self,
+        source: str,
+        target: str,
+        max_depth: int | None = None,
+        *,
+        direction: str = "both",
+        relation_types: list[str] | None = None,
+        min_strength: float = 0.0,
+        fan_out: int | None = None,
+    ) -> dict[str, Any] | None:
+        """Fewest-hop path between two entities (ids or exact names).
+
+        Returns ``None`` when either end does not exist; ``path`` is empty when no
+        path exists within ``max_depth`` hops.
+        """
+        cfg = settings.specter.knowledge
+        edges = self._edge_filter(direction, relation_types, min_strength, fan_out)
+        max_depth = max(1, min(max_depth or cfg.traversal_max_depth, cfg.traversal_max_depth))
+        async with self.db.reader() as db:
+            start = await self._resolve_ref(db, source)
+            end = await self._resolve_ref(db, target)
+            if start is None or end is None:
+                return None
+            found = await traversal.shortest_path(
+                db, start, end, max_depth, edges, cfg.traversal_max_nodes
+            )
+        if found is None:
+            return {"source": start, "target": end, "hops": None, "path": [], "edges": []}
+        order = [start]
+        for edge in found:
+            order.append(edge.other(order[-1]))
+        nodes = await self._fetch_entities(order)
+        self.access.record(order)
+        return {
+            "source": start,
+            "target": end,
+            "hops": len(found),
+            "path": [nodes[node_id] for node_id in order if node_id in nodes],
+            "edges": [edge.to_dict() for edge in found],
+        }
+
+    @staticmethod
+    def _edge_filter(
+        direction: str,
+        relation_types: list[str] | None,
+        min_strength: float,
+        fan_out: int | None,
+    ) -> traversal.EdgeFilter:
+        if direction not in traversal.DIRECTIONS:
+            raise ValueError(f"direction must be one of {', '.join(traversal.DIRECTIONS)}")
+        return traversal.EdgeFilter(
+            direction=direction,
+            relation_types=tuple(relation_types or ()),
+            min_strength=min_strength,
+            fan_out=max(1, fan_out or settings.specter.knowledge.traversal_fan_out),
+        )
+
+    @staticmethod
+    async def _resolve_ref(db: aiosqlite.Connection, ref: str) -> str | None:
+        """Entity id for an id, else for an exact (case-insensitive) non-fact name."""
+        rows = await db.execute_fetchall("SELECT id FROM entities WHERE id = ?", (ref,))
+        if rows:
+            return rows[0][0]
+        rows = await db.execute_fetchall(
+            f"""
+            SELECT e.id FROM entities_fts
+            JOIN entities e ON e.rowid = entities_fts.rowid
+            WHERE entities_fts MATCH ? AND e.type != 'fact' AND e.name = ? COLLATE NOCASE
+            ORDER BY {_BM25}
+            LIMIT 1
+            """,
+            (fts_query(ref, column="name"), ref.strip()),
+        )
+        return rows[0][0] if rows else None
+
+    async def export_bundle(self, path: Path) -> dict[str, Any]:
+        """Stream the graph to a bundle directory (see ``bundle.export_bundle``)."""
+        await self.access.flush()
+        return await bundle.export_bundle(self.db, path, self.embedder.dim, self.embedder.name)
+
+    async def import_bundle(self, path: Path, defer_indexes: bool | None = None) -> dict[str, Any]:
+        """Merge a bundle into the graph; the ANN index catches up in the background."""
+        stats = await bundle.import_bundle(
+            self.db,
+            path,
+            self.embedder.dim,
+            self.embedder.name,
+            settings.specter.knowledge.bundle_batch_size,
+            defer_indexes,
+        )
+        self.vectors.invalidate()
+        self.neighbours.clear()
+        return stats
+
+    async def backfill_vectors(self, batch_size: int = 256) -> int:
+        """Embed entities stored without a vector (e.g. before embeddings existed)."""
+        total = 0
+        while True:
+            async with self.db.reader() as db:
+                rows = await db.execute_fetchall(
+                    "SELECT id, type, name, attributes FROM entities WHERE vector IS NULL LIMIT ?",
+                    (batch_size,),
+                )
+            if not rows:
+                break
+            texts = [self._embedding_text(r[1], r[2], r[3]) for r in rows]
+            vectors = await self.embedder.embed(texts)
+            async with self.db.writer() as db:
+                await db.executemany(
+                    "UPDATE entities SET vector = ? WHERE id = ?",
+                    [(pack_vector(v), r[0]) for v, r in zip(vectors, rows, strict=True)],
+                )
+            total += len(rows)
+        if total:
+            self.vectors.invalidate()
+        return total
+
+    async def summarize_recent(self, limit: int | None = None) -> dict[str, Any]:
+        """Fold every fact added since the last summary into the rollups now.
+
+        Returns the newest window summary (``limit`` facts per window at most).
+        """
+        window = limit or settings.specter.knowledge.summary_window
+        latest = await self._fold_new_facts(window, force=True)
+        return latest or {"summary": "", "source_count": 0}
+
+    async def list_summaries(
+        self, limit: int = 5, level: str | None = None
+    ) -> list[dict[str, Any]]:
+        """Newest summaries first; ``level`` is ``window``, ``day`` or ``week``."""
+        sql = """
+            SELECT id, summary, source_count, created_at, level, period_start, period_end
+            FROM summaries
+        """
+        params: list[Any] = []
+        if level:
+            sql += " WHERE level = ?"
+            params.append(level)
+        sql += " ORDER BY created_at DESC LIMIT ?"
+        params.append(limit)
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(sql, params)
         return [
-            {"id": r[0], "summary": r[1], "source_count": r[2], "created_at": r[3]}
+            {
+                "id": r[0],
+                "summary": r[1],
+                "source_count": r[2],
+                "created_at": r[3],
+                "level": r[4],
+                "period_start": r[5],
+                "period_end": r[6],
+            }
             for r in rows
         ]
 
@@ -140,6 +710,8 @@ class KnowledgeGraph:
         limit: int = 50,
         search: str | None = None,
         include_relations: bool = False,
+        relation_limit: int = 12,
+        relation_names: bool = False,
     ) -> list[dict[str, Any]]:
         query = "SELECT id, type, name, created_at, expires_at FROM entities"
         clauses = []
@@ -148,140 +720,275 @@ class KnowledgeGraph:
             clauses.append("type = ?")
             params.append(ent_type)
         if search:
-            clauses.append("name LIKE ?")
-            params.append(f"%{search}%")
+            clauses.append("rowid IN (SELECT rowid FROM entities_fts WHERE entities_fts MATCH ?)")
+            params.append(fts_query(search, column="name"))
         if clauses:
             query += " WHERE " + " AND ".join(clauses)
         query += " ORDER BY created_at DESC LIMIT ?"
         params.append(limit)
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(query, params)
-            rows = await cursor.fetchall()
-            results = []
-            for row in rows:
-                item = {
-                    "id": row[0],
-                    "type": row[1],
-                    "name": row[2],
-                    "created_at": row[3],
-                    "expires_at": row[4],
-                }
-                if include_relations:
-                    rel_cursor = await db.execute(
-                        """
-                        SELECT relation_type, target_id FROM relationships
-                        WHERE source_id = ?
-                        LIMIT 12
-                        """,
-                        (row[0],),
-                    )
-                    rels = await rel_cursor.fetchall()
-                    item["relations"] = [
-                        {"type": rel[0], "target_id": rel[1]} for rel in rels
-                    ]
-                results.append(item)
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(query, params)
+            relations = (
+                await self._relations(db, [r[0] for r in rows], relation_limit, relation_names)
+                if include_relations
+                else {}
+            )
+        results = []
+        for row in rows:
+            item = {
+                "id": row[0],
+                "type": row[1],
+                "name": row[2],
+                "created_at": row[3],
+                "expires_at": row[4],
+            }
+            if include_relations:
+                item["relations"] = relations.get(row[0], [])
+            results.append(item)
         return results
 
-    async def query_entities(self, query: str, limit: int = 10) -> list[dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """
-                SELECT id, type, name FROM entities
-                WHERE name LIKE ?
-                ORDER BY created_at DESC LIMIT ?
+    async def query_entities(
+        self,
+        query: str,
+        limit: int = 10,
+        relation_limit: int = 5,
+        relation_names: bool = False,
+    ) -> list[dict[str, Any]]:
+        """Entities whose name matches ``query`` (prefix on the last term), best first."""
+        if not query.split():
+            return []
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                SELECT e.id, e.type, e.name, {_BM25} AS rank
+                FROM entities_fts
+                JOIN entities e ON e.rowid = entities_fts.rowid
+                WHERE entities_fts MATCH ?
+                ORDER BY rank LIMIT ?
                 """,
-                (f"%{query}%", limit),
+                (fts_query(query, column="name"), limit),
             )
-            rows = await cursor.fetchall()
-            results: list[dict[str, Any]] = []
-            for entity_id, ent_type, name in rows:
-                rel_cursor = await db.execute(
+            relations = await self._relations(
+                db, [r[0] for r in rows], relation_limit, relation_names
+            )
+        self.access.record(r[0] for r in rows)
+        return [
+            {
+                "id": entity_id,
+                "type": ent_type,
+                "name": name,
+                "score": round(-rank, 6),
+                "relations": relations.get(entity_id, []),
+            }
+            for entity_id, ent_type, name, rank in rows
+        ]
+
+    @staticmethod
+    async def _relations(
+        db: aiosqlite.Connection, entity_ids: list[str], per_entity: int, names: bool
+    ) -> dict[str, list[dict[str, Any]]]:
+        """Outgoing relations for a page of entities in one query, capped per entity."""
+        if not entity_ids or per_entity <= 0:
+            return {}
+        marks = ",".join("?" * len(entity_ids))
+        target_name = "t.name" if names else "NULL"
+        join = "LEFT JOIN entities t ON t.id = r.target_id" if names else ""
+        rows = await db.execute_fetchall(
+            f"""
+            SELECT source_id, relation_type, target_id, target_name FROM (
+                SELECT r.source_id, r.relation_type, r.target_id, {target_name} AS target_name,
+                       ROW_NUMBER() OVER (
+                           PARTITION BY r.source_id
+                           ORDER BY r.strength DESC, r.created_at DESC
+                       ) AS position
+                FROM relationships r {join}
+                WHERE r.source_id IN ({marks})
+            )
+            WHERE position <= ?
+            ORDER BY source_id, position
+            """,
+            [*entity_ids, per_entity],
+        )
+        relations: dict[str, list[dict[str, Any]]] = {}
+        for source_id, relation_type, target_id, name in rows:
+            rel = {"type": relation_type, "target_id": target_id}
+            if names:
+                rel["target_name"] = name
+            relations.setdefault(source_id, []).append(rel)
+        return relations
+
+    async def _extract_entities_batch(self, texts: list[str]) -> list[list[dict[str, str]]]:
+        """Entities per text, asking the LLM only about capitalised spans nobody knows.
+
+        Emails, URLs, numbers and names already in the graph are found locally. Texts
+        with unknown capitalised spans go to the LLM, ``_EXTRACT_BATCH`` per prompt;
+        the rest, and any the LLM fails on, keep what their scan found.
+        """
+        await self._refresh_gazetteer()
+        scans = [self.extractor.scan(text) for text in texts]
+        results: list[list[dict[str, str]] | None] = [None] * len(texts)
+        pending = [index for index, scan in enumerate(scans) if scan.unknown]
+        router = LLMRouter()
+        if router.routes and pending:
+            for start in range(0, len(pending), _EXTRACT_BATCH):
+                chunk = pending[start : start + _EXTRACT_BATCH]
+                numbered = "\n".join(
+                    f"{number}. {texts[index]}" for number, index in enumerate(chunk, start=1)
+                )
+                prompt = (
+                    "Extract entities from each numbered text. Return a JSON object mapping each "
+                    "text number to an array of objects with type and name.\n"
+                    "Types: person, org, location, concept, url, email, number.\n\n"
+                    f"{numbered}\n"
+                )
+                try:
+                    data = loads(await router.generate(prompt))
+                except Exception:
+                    continue
+                if not isinstance(data, dict):
+                    continue
+                for key, items in data.items():
+                    number = int(key) if str(key).isdigit() else 0
+                    if 1 <= number <= len(chunk) and isinstance(items, list):
+                        index = chunk[number - 1]
+                        results[index] = scans[index].entities + [
+                            {"type": str(item.get("type", "concept")), "name": str(item["name"])}
+                            for item in items
+                            if isinstance(item, dict) and item.get("name")
+                        ]
+        llm = sum(found is not None for found in results)
+        self.extraction["llm"] += llm
+        self.extraction["local"] += len(texts) - llm
+        return [
+            found if found is not None else scan.found()
+            for found, scan in zip(results, scans, strict=True)
+        ]
+
+    async def _refresh_gazetteer(self) -> None:
+        """Add entity names stored since the last refresh (all of them the first time)."""
+        pairs: list[tuple[str, str]] = []
+        last_rowid = self._gazetteer_rowid
+        async with self.db.reader() as db:
+            while True:
+                rows = await db.execute_fetchall(
                     """
-                    SELECT relation_type, target_id FROM relationships
-                    WHERE source_id = ? LIMIT 5
+                    SELECT rowid, type, name FROM entities
+                    WHERE rowid > ? AND type NOT IN ('fact', 'email', 'url', 'number')
+                    ORDER BY rowid
+                    LIMIT 5000
                     """,
-                    (entity_id,),
-                )
-                rels = await rel_cursor.fetchall()
-                results.append(
-                    {
-                        "id": entity_id,
-                        "type": ent_type,
-                        "name": name,
-                        "relations": [{"type": r[0], "target_id": r[1]} for r in rels],
-                    }
+                    (last_rowid,),
                 )
-            return results
+                if not rows:
+                    break
+                pairs.extend((ent_type, name) for _, ent_type, name in rows)
+                last_rowid = rows[-1][0]
+        self._gazetteer_rowid = max(self._gazetteer_rowid, last_rowid, 0)
+        # One add for the whole refresh, so a first load builds the automaton once.
+        self.extractor.gazetteer.add(pairs)
 
-    async def _extract_entities(self, text: str) -> list[dict[str, str]]:
-        router = LLMRouter()
-        if router.routes:
-            prompt = (
-                "Extract entities from the text. Return JSON array of objects with type and name.\n"
-                "Types: person, org, location, concept, url, email, number.\n\n"
-                f"Text: {text}\n"
-            )
-            try:
-                raw = await router.generate(prompt)
-                data = json.loads(raw)
-                if isinstance(data, list):
-                    return [
-                        {"type": item.get("type", "concept"), "name": item.get("name", "")}
-                        for item in data
-                        if isinstance(item, dict) and item.get("name")
-                    ]
-            except Exception:
-                pass
+    async def _embed(self, texts: list[str]) -> list[bytes | None]:
+        """Packed vectors for ``texts``; ``None`` each if the embedder fails."""
+        try:
+            return [pack_vector(v) for v in await self.embedder.embed(texts)]
+        except Exception:  # noqa: BLE001
+            # Keep the fact; backfill_vectors can embed it later.
+            logger.exception("embedding_failed", embedder=self.embedder.name)
+            return [None] * len(texts)
 
-        entities: list[dict[str, str]] = []
-        for email in re.findall(r"[\\w\\.-]+@[\\w\\.-]+", text):
-            entities.append({"type": "email", "name": email})
-        for url in re.findall(r"https?://\\S+", text):
-            entities.append({"type": "url", "name": url})
-        for number in re.findall(r"\\b\\d+(?:\\.\\d+)?\\b", text):
-            entities.append({"type": "number", "name": number})
-        for word in re.findall(r"\\b[A-Z][a-z]{2,}\\b", text):
-            entities.append({"type": "proper_noun", "name": word})
-        return entities
-
-    async def _get_or_create_entity(
-        self, db: aiosqlite.Connection, ent_type: str, name: str, now: str
-    ) -> str:
-        cursor = await db.execute(
-            "SELECT id FROM entities WHERE type = ? AND name = ?",
-            (ent_type, name),
-        )
-        row = await cursor.fetchone()
-        if row:
-            return row[0]
-        ent_id = str(uuid.uuid4())
-        await db.execute(
-            "INSERT INTO entities (id, type, name, attributes, created_at, expires_at) "
-            "VALUES (?, ?, ?, ?, ?, ?)",
-            (ent_id, ent_type, name, json.dumps({}), now, self._expires_at(ent_type)),
-        )
-        return ent_id
+    @staticmethod
+    def _embedding_text(ent_type: str, name: str, attributes: str | None) -> str:
+        if ent_type == "fact" and attributes:
+            return loads(attributes).get("raw", name)
+        return name
 
-    async def cleanup_expired(self) -> None:
+    async def cleanup_expired(self, batch_size: int | None = None) -> dict[str, int]:
+        """Delete expired entities and their relationships in bounded batches.
+
+        Each batch is its own short writer transaction: expired ids come from the
+        ``expires_at`` index and relationships are removed through the source/target
+        indexes. Returns the rows reclaimed by this run.
+        """
+        batch = max(1, batch_size or settings.specter.knowledge.ttl_sweep_batch_size)
         now = datetime.utcnow().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                DELETE FROM relationships
-                WHERE source_id IN (
-                    SELECT id FROM entities WHERE expires_at IS NOT NULL AND expires_at < ?
+        started = time.perf_counter()
+        stats = {"entities": 0, "relationships": 0, "batches": 0}
+        while True:
+            async with self.db.writer() as db:
+                expired = await db.execute_fetchall(
+                    """
+                    SELECT id, type, name FROM entities
+                    WHERE expires_at IS NOT NULL AND expires_at < ?
+                    ORDER BY expires_at
+                    LIMIT ?
+                    """,
+                    (now, batch),
                 )
-                   OR target_id IN (
-                    SELECT id FROM entities WHERE expires_at IS NOT NULL AND expires_at < ?
+                if not expired:
+                    break
+                ids = dumps([row[0] for row in expired])
+                relationships = 0
+                for column in ("source_id", "target_id"):
+                    cursor = await db.execute(
+                        f"DELETE FROM relationships WHERE {column} IN "
+                        "(SELECT value FROM json_each(?))",
+                        (ids,),
+                    )
+                    relationships += cursor.rowcount
+                await db.execute(
+                    "DELETE FROM entities WHERE id IN (SELECT value FROM json_each(?))", (ids,)
                 )
-                """,
-                (now, now),
+            self._forget(expired)
+            stats["entities"] += len(expired)
+            stats["relationships"] += relationships
+            stats["batches"] += 1
+            if len(expired) < batch:
+                break
+            # Yield between batches so queued writers get the lock.
+            await asyncio.sleep(0)
+        for key in ("entities", "relationships"):
+            self.reclaimed[key] += stats[key]
+        if stats["batches"]:
+            logger.info(
+                "kg_ttl_sweep",
+                db_path=self.db_path,
+                elapsed_ms=round((time.perf_counter() - started) * 1000, 1),
+                **stats,
             )
-            await db.execute(
-                "DELETE FROM entities WHERE expires_at IS NOT NULL AND expires_at < ?",
-                (now,),
+        return stats
+
+    async def tier_cold(self, now: datetime | None = None) -> dict[str, int]:
+        """Archive or prune cold entities (see ``ColdTier``) if ``graph_pruning`` is on."""
+        if not settings.specter.knowledge.graph_pruning:
+            return {"entities": 0, "relationships": 0}
+        await self.access.flush()
+        stats = await self.cold.run(self._forget, now)
+        if stats["entities"]:
+            logger.info(
+                "kg_cold_tier",
+                db_path=self.db_path,
+                action="archive" if self.cold.archives else "prune",
+                **stats,
             )
-            await db.commit()
+        return stats
+
+    async def sweep_periodically(self) -> None:
+        interval = settings.specter.knowledge.ttl_sweep_interval_seconds
+        while True:
+            try:
+                await self.cleanup_expired()
+                await self.tier_cold()
+            except Exception:  # noqa: BLE001
+                logger.exception("kg_ttl_sweep_failed", db_path=self.db_path)
+            await asyncio.sleep(interval)
+
+    def _forget(self, removed: Removed) -> None:
+        """Drop entities deleted from the main tables from every in-process cache."""
+        self.vectors.invalidate()
+        self.ann.remove([row[0] for row in removed])
+        self.neighbours.clear()
+        self.entity_ids.discard((row[1], row[2]) for row in removed)
+        self.extractor.gazetteer.discard((row[1], row[2]) for row in removed)
 
     def _expires_at(self, ent_type: str) -> str | None:
         days = settings.specter.knowledge.default_ttl_days
@@ -294,7 +1001,7 @@ class KnowledgeGraph:
         if router.routes:
             prompt = (
                 "Summarize the following facts into a concise operational summary.\n\n"
-                + "\\n".join(f"- {fact}" for fact in facts)
+                + "\n".join(f"- {fact}" for fact in facts)
             )
             try:
                 return await router.generate(prompt)
@@ -302,14 +1009,150 @@ class KnowledgeGraph:
                 pass
         return " | ".join(facts[: settings.specter.knowledge.summary_window])
 
+    async def _fold_summary(self, previous: str | None, updates: list[str]) -> str:
+        """Fold ``updates`` into a running summary without re-reading its sources."""
+        if not previous:
+            return await self._summarize_texts(updates)
+        router = LLMRouter()
+        if router.routes:
+            items = "\n".join(f"- {item}" for item in updates)
+            prompt = (
+                "Update the running summary with the new items. Keep it concise.\n\n"
+                f"Summary:\n{previous}\n\nNew items:\n{items}"
+            )
+            try:
+                return await router.generate(prompt)
+            except Exception:
+                pass
+        items = [*previous.split(" | "), *updates]
+        return " | ".join(items[-settings.specter.knowledge.summary_window :])
+
     async def _auto_summarize(self) -> None:
         window = settings.specter.knowledge.summary_window
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT COUNT(*) FROM entities WHERE type = 'fact'")
-            row = await cursor.fetchone()
-            if not row:
-                return
-            count = row[0]
-        if count % window != 0:
-            return
-        await self.summarize_recent(limit=window)
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                "SELECT facts_added - facts_folded FROM summary_state WHERE id = 1"
+            )
+        if rows and rows[0][0] >= window:
+            await self._fold_new_facts(window)
+
+    async def _fold_new_facts(self, window: int, force: bool = False) -> dict[str, Any] | None:
+        """Summarise facts after the cursor in windows and roll them up.
+
+        Without ``force`` a trailing partial window is left for the next call. The
+        pending counter is re-based on what was actually found, so facts that expired
+        before being summarised do not keep re-triggering the summariser.
+        """
+        async with self._summary_lock:
+            async with self.db.reader() as db:
+                state = await db.execute_fetchall(
+                    "SELECT facts_added, cursor_created_at, cursor_id "
+                    "FROM summary_state WHERE id = 1"
+                )
+            if not state:
+                return None
+            added, cursor_at, cursor_id = state[0]
+            latest = None
+            leftover = 0
+            while True:
+                async with self.db.reader() as db:
+                    rows = await db.execute_fetchall(
+                        """
+                        SELECT created_at, id, attributes FROM entities
+                        WHERE type = 'fact' AND (created_at, id) > (?, ?)
+                        ORDER BY created_at, id
+                        LIMIT ?
+                        """,
+                        (cursor_at, cursor_id, window),
+                    )
+                if not rows or (len(rows) < window and not force):
+                    leftover = len(rows)
+                    break
+                latest = await self._store_window(rows)
+                cursor_at, cursor_id = rows[-1][0], rows[-1][1]
+            async with self.db.writer() as db:
+                await db.execute(
+                    "UPDATE summary_state SET facts_folded = ? WHERE id = 1",
+                    (max(0, added - leftover),),
+                )
+        return latest
+
+    async def _store_window(self, rows: list[tuple[str, str, str]]) -> dict[str, Any]:
+        """Summarise one window of facts, fold it into its day and close earlier days.
+
+        Every write (window row, rollups, cursor) commits in one transaction.
+        """
+        facts = [loads(r[2]).get("raw", "") for r in rows if r[2]]
+        start, end = rows[0][0], rows[-1][0]
+        day = end[:10]
+        summary = await self._summarize_texts(facts)
+        async with self.db.reader() as db:
+            open_days = await db.execute_fetchall(
+                """
+                SELECT id, period_start, summary, source_count FROM summaries
+                WHERE level = 'day' AND parent_id IS NULL
+                ORDER BY period_start
+                """
+            )
+        current = next((d for d in open_days if d[1] == day), None)
+        day_id = current[0] if current else str(uuid.uuid4())
+        day_summary = await self._fold_summary(current[2] if current else None, [summary])
+
+        # week start -> [id, text, facts, closed day ids, last day]
+        weeks: dict[str, list[Any]] = {}
+        for closed_id, closed_day, closed_summary, closed_count in open_days:
+            if closed_day >= day:
+                continue
+            closed = date.fromisoformat(closed_day)
+            week = (closed - timedelta(days=closed.weekday())).isoformat()
+            if week not in weeks:
+                async with self.db.reader() as db:
+                    found = await db.execute_fetchall(
+                        "SELECT id, summary FROM summaries "
+                        "WHERE level = 'week' AND period_start = ?",
+                        (week,),
+                    )
+                weeks[week] = [*(found[0] if found else (str(uuid.uuid4()), "")), 0, [], ""]
+            rollup = weeks[week]
+            rollup[1] = await self._fold_summary(rollup[1], [closed_summary])
+            rollup[2] += closed_count or 0
+            rollup[3].append(closed_id)
+            rollup[4] = closed_day
+
+        now = datetime.utcnow().isoformat()
+        window_id = str(uuid.uuid4())
+        async with self.db.writer() as db:
+            await db.execute(
+                """
+                INSERT INTO summaries (
+                    id, summary, source_count, created_at, level, period_start, period_end,
+                    parent_id
+                )
+                VALUES (?, ?, ?, ?, 'window', ?, ?, ?)
+                """,
+                (window_id, summary, len(facts), now, start, end, day_id),
+            )
+            await db.execute(
+                _UPSERT_ROLLUP,
+                (day_id, day_summary, len(facts), now, "day", day, end),
+            )
+            for week, (week_id, text, count, members, last_day) in weeks.items():
+                await db.execute(
+                    _UPSERT_ROLLUP, (week_id, text, count, now, "week", week, last_day)
+                )
+                await db.executemany(
+                    "UPDATE summaries SET parent_id = ? WHERE id = ?",
+                    [(week_id, member) for member in members],
+                )
+            await db.execute(
+                "UPDATE summary_state SET cursor_created_at = ?, cursor_id = ? WHERE id = 1",
+                (end, rows[-1][1]),
+            )
+        return {
+            "summary": summary,
+            "source_count": len(facts),
+            "id": window_id,
+            "level": "window",
+            "period_start": start,
+            "period_end": end,
+        }
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+import structlog
+
+from ..config import KnowledgeConfig, settings
+from ..core.batching import drain_batches
+
+logger = structlog.get_logger(__name__)
+
+AddFacts = Callable[[list[str], float], Awaitable[list[str]]]
+
+
+class IngestQueue:
+    """Write-behind fact ingestion for the request path.
+
+    ``submit`` only enqueues; a small pool of workers drains the bounded queue,
+    coalescing facts that arrive within ``ingest_coalesce_ms`` of each other into one
+    ``add_facts`` call (one extraction prompt, one transaction). Memory is eventually
+    consistent; ``flush`` waits for everything submitted so far.
+    """
+
+    def __init__(self, add_facts: AddFacts, config: KnowledgeConfig | None = None) -> None:
+        cfg = config or settings.specter.knowledge
+        self._add_facts = add_facts
+        self.workers = max(1, cfg.ingest_workers)
+        self.batch_size = max(1, cfg.ingest_batch_size)
+        self.coalesce = cfg.ingest_coalesce_ms / 1000
+        self.drain_timeout = cfg.ingest_drain_timeout_seconds
+        self._queue: asyncio.Queue[tuple[str, float]] = asyncio.Queue(maxsize=cfg.ingest_queue_size)
+        self._tasks: list[asyncio.Task[None]] = []
+        self.stored = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict[str, int]:
+        return {"pending": self.pending, "stored": self.stored, "failed": self.failed}
+
+    async def submit(self, statement: str, confidence: float = 1.0) -> None:
+        """Queue a fact; waits only when the queue is full (backpressure)."""
+        if not statement.strip():
+            return
+        self._tasks = [task for task in self._tasks if not task.done()]
+        while len(self._tasks) < self.workers:
+            self._tasks.append(asyncio.create_task(self._run()))
+        await self._queue.put((statement, confidence))
+
+    async def flush(self) -> None:
+        if any(not task.done() for task in self._tasks):
+            await self._queue.join()
+
+    async def close(self) -> None:
+        """Drain queued facts (up to ``ingest_drain_timeout_seconds``), then stop workers."""
+        try:
+            await asyncio.wait_for(self.flush(), self.drain_timeout)
+        except TimeoutError:
+            logger.warning("ingest_drain_timeout", dropped=self.pending)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        await drain_batches(self._queue, self._store, self.batch_size, self.coalesce)
+
+    async def _store(self, batch: list[tuple[str, float]]) -> None:
+        # Identical statements in one burst are stored once; one call per confidence.
+        groups: dict[float, list[str]] = {}
+        for statement, confidence in dict.fromkeys(batch):
+            groups.setdefault(confidence, []).append(statement)
+        for confidence, statements in groups.items():
+            try:
+                await self._add_facts(statements, confidence)
+                self.stored += len(statements)
+            except Exception:  # noqa: BLE001
+                self.failed += len(statements)
+                logger.exception("ingest_failed", facts=len(statements))
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+from collections.abc import Iterable, Sequence
+
+from ..core.database import Database
+from .cache import LRUCache
+
+# (neighbour_id, relation_type, strength)
+Edge = tuple[str, str, float]
+
+
+def rrf_merge(
+    rankings: dict[str, Sequence[str]], k: int = 60, weights: dict[str, float] | None = None
+) -> list[tuple[str, float, dict[str, int]]]:
+    """Reciprocal-rank fusion: ``sum(w / (k + rank))`` over the rankings an id appears in.
+
+    Returns ``(id, score, {ranking: 1-based rank})`` best first.
+    """
+    scores: dict[str, float] = {}
+    ranks: dict[str, dict[str, int]] = {}
+    for name, ids in rankings.items():
+        weight = (weights or {}).get(name, 1.0)
+        for rank, item_id in enumerate(ids, start=1):
+            if name in ranks.setdefault(item_id, {}):
+                continue
+            ranks[item_id][name] = rank
+            scores[item_id] = scores.get(item_id, 0.0) + weight / (k + rank)
+    ordered = sorted(scores, key=lambda i: (-scores[i], i))
+    return [(item_id, scores[item_id], ranks[item_id]) for item_id in ordered]
+
+
+class NeighbourhoodCache:
+    """LRU of each entity's strongest relationships, in either direction.
+
+    Misses for a batch of entities are loaded with one set-based query. Entries are
+    invalidated by the write paths that add or delete relationships.
+    """
+
+    def __init__(self, db: Database, capacity: int = 4096, fan_out: int = 32) -> None:
+        self.db = db
+        self.fan_out = fan_out
+        self._entries: LRUCache[str, list[Edge]] = LRUCache(capacity)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def neighbours(self, entity_ids: Sequence[str]) -> dict[str, list[Edge]]:
+        found: dict[str, list[Edge]] = {}
+        missing: list[str] = []
+        for entity_id in dict.fromkeys(entity_ids):
+            edges = self._entries.get(entity_id)
+            if edges is None:
+                missing.append(entity_id)
+            else:
+                found[entity_id] = edges
+        if missing:
+            loaded = await self._load(missing)
+            for entity_id in missing:
+                found[entity_id] = loaded.get(entity_id, [])
+                self._entries.put(entity_id, found[entity_id])
+        return found
+
+    def invalidate(self, entity_ids: Iterable[str]) -> None:
+        self._entries.discard(entity_ids)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    async def _load(self, entity_ids: list[str]) -> dict[str, list[Edge]]:
+        marks = ",".join("?" * len(entity_ids))
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                f"""
+                SELECT source_id, target_id, relation_type, strength
+                FROM relationships WHERE source_id IN ({marks})
+                UNION ALL
+                SELECT target_id, source_id, relation_type, strength
+                FROM relationships WHERE target_id IN ({marks})
+                """,
+                [*entity_ids, *entity_ids],
+            )
+        edges: dict[str, list[Edge]] = {}
+        for seed, other, relation_type, strength in rows:
+            edges.setdefault(seed, []).append((other, relation_type, strength or 0.0))
+        for items in edges.values():
+            items.sort(key=lambda e: -e[2])
+            del items[self.fan_out :]
+        return edges
+
+
+def expand(seeds: Sequence[str], neighbours: dict[str, list[Edge]], limit: int) -> list[str]:
+    """Neighbours of ranked seeds: by seed rank, then edge strength; seeds excluded."""
+    seen = set(seeds)
+    ranked: list[str] = []
+    for seed in seeds:
+        for other, _, _ in neighbours.get(seed, []):
+            if other not in seen:
+                seen.add(other)
+                ranked.append(other)
+                if len(ranked) >= limit:
+                    return ranked
+    return ranked
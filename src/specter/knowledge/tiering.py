@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import asyncio
+from collections import Counter
+from collections.abc import Callable, Iterable
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import aiosqlite
+import structlog
+
+from ..config import KnowledgeConfig, settings
+from ..core.database import Database
+from ..core.serialization import dumps
+from ..retention import attached
+
+logger = structlog.get_logger(__name__)
+
+ENTITY_COLUMNS = "id, type, name, attributes, vector, created_at, expires_at, access_count"
+RELATIONSHIP_COLUMNS = (
+    "id, source_id, target_id, relation_type, strength, context, created_at, mentions, last_seen_at"
+)
+
+COLD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cold.entities (
+    id TEXT PRIMARY KEY,
+    type TEXT NOT NULL,
+    name TEXT NOT NULL,
+    attributes JSON,
+    vector BLOB,
+    created_at TIMESTAMP,
+    expires_at TIMESTAMP,
+    access_count INT DEFAULT 0,
+    last_accessed_at TIMESTAMP,
+    archived_at TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS cold.relationships (
+    id TEXT PRIMARY KEY,
+    source_id TEXT,
+    target_id TEXT,
+    relation_type TEXT NOT NULL,
+    strength FLOAT,
+    context JSON,
+    created_at TIMESTAMP,
+    mentions INTEGER NOT NULL DEFAULT 1,
+    last_seen_at TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS cold.idx_cold_entities_type_name ON entities(type, name);
+CREATE INDEX IF NOT EXISTS cold.idx_cold_rel_source ON relationships(source_id);
+CREATE INDEX IF NOT EXISTS cold.idx_cold_rel_target ON relationships(target_id);
+"""
+
+# (id, type, name) of entities that left the main tables.
+Removed = list[tuple[str, str, str]]
+
+
+class AccessTracker:
+    """Write-behind access counts for entities returned by reads.
+
+    ``record`` only bumps an in-memory counter; a background task folds the counts
+    into ``entities.access_count`` / ``last_accessed_at`` every
+    ``access_flush_seconds`` with one UPDATE per flush.
+    """
+
+    def __init__(self, db: Database, config: KnowledgeConfig | None = None) -> None:
+        cfg = config or settings.specter.knowledge
+        self.db = db
+        self.interval = cfg.access_flush_seconds
+        self._pending: Counter[str] = Counter()
+        self._task: asyncio.Task[None] | None = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def record(self, entity_ids: Iterable[str]) -> None:
+        self._pending.update(entity_ids)
+        if self._pending and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+
+    async def flush(self) -> int:
+        pending, self._pending = self._pending, Counter()
+        if not pending:
+            return 0
+        now = datetime.utcnow().isoformat()
+        async with self.db.writer() as db:
+            await db.execute(
+                """
+                UPDATE entities
+                SET access_count = coalesce(access_count, 0) + json_extract(j.value, '$[1]'),
+                    last_accessed_at = ?
+                FROM json_each(?) AS j
+                WHERE entities.id = json_extract(j.value, '$[0]')
+                """,
+                (now, dumps(list(pending.items()))),
+            )
+        return len(pending)
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while self._pending:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.flush()
+            except Exception:  # noqa: BLE001
+                logger.exception("kg_access_flush_failed", db_path=self.db.db_path)
+
+
+class ColdTier:
+    """Moves rarely read entities out of the main tables.
+
+    Reads decay with ``tier_access_half_life_days``, counted from the last read.
+    Entities whose decayed reads reach ``tier_hot_min_access`` stay hot; the others
+    go cold once unread for ``tier_cold_after_days`` (at least ``default_ttl_days``).
+    While the graph holds more than ``tier_max_entities``, the lowest scored go
+    first, hot or not. Cold entities and every relationship touching
+    them are moved to ``<db>.cold.db`` (``tier_cold_action: archive``) or deleted
+    (``prune``, and always for in-memory databases). Document chunks (facts with a
+    ``source``) stay for as long as their file is indexed.
+    """
+
+    def __init__(self, db: Database, config: KnowledgeConfig | None = None) -> None:
+        self.db = db
+        self.config = config or settings.specter.knowledge
+        self.path = None if db.db_path == ":memory:" else Path(db.db_path).with_suffix(".cold.db")
+
+    @property
+    def archives(self) -> bool:
+        return self.config.tier_cold_action == "archive" and self.path is not None
+
+    async def run(
+        self, on_removed: Callable[[Removed], None], now: datetime | None = None
+    ) -> dict[str, int]:
+        now = now or datetime.utcnow()
+        days = max(self.config.tier_cold_after_days, self.config.default_ttl_days)
+        cutoff = (now - timedelta(days=days)).isoformat()
+        stats = {"entities": 0, "relationships": 0}
+        await self._drain(now.isoformat(), cutoff, None, stats, on_removed)
+        budget = self.config.tier_max_entities
+        if budget > 0:
+            async with self.db.reader() as db:
+                count = (await db.execute_fetchall("SELECT COUNT(*) FROM entities"))[0][0]
+            if count > budget:
+                await self._drain(now.isoformat(), None, count - budget, stats, on_removed)
+        return stats
+
+    async def _drain(
+        self,
+        now: str,
+        cutoff: str | None,
+        limit: int | None,
+        stats: dict[str, int],
+        on_removed: Callable[[Removed], None],
+    ) -> None:
+        """Remove cold entities unread since ``cutoff``, or else the ``limit`` lowest scored."""
+        batch = max(1, self.config.ttl_sweep_batch_size)
+        remaining = limit
+        where = (
+            ""
+            if cutoff is None
+            else "AND coalesce(last_accessed_at, created_at) < ?4 AND score < ?5"
+        )
+        while remaining is None or remaining > 0:
+            size = batch if remaining is None else min(batch, remaining)
+            async with self.db.writer() as db:
+                rows = await db.execute_fetchall(
+                    f"""
+                    SELECT id, type, name FROM (
+                        SELECT id, type, name, created_at, last_accessed_at, attributes,
+                               coalesce(access_count, 0) * pow(
+                                   0.5,
+                                   max(0, julianday(?1)
+                                          - julianday(coalesce(last_accessed_at, created_at)))
+                                   / ?2
+                               ) AS score
+                        FROM entities
+                    )
+                    WHERE json_extract(attributes, '$.source') IS NULL {where}
+                    ORDER BY score, coalesce(last_accessed_at, created_at)
+                    LIMIT ?3
+                    """,
+                    (
+                        now,
+                        self.config.tier_access_half_life_days,
+                        size,
+                        *(() if cutoff is None else (cutoff, self.config.tier_hot_min_access)),
+                    ),
+                )
+                if not rows:
+                    return
+                stats["relationships"] += await self._remove(db, [row[0] for row in rows])
+            stats["entities"] += len(rows)
+            on_removed(rows)
+            if remaining is not None:
+                remaining -= len(rows)
+            if len(rows) < size:
+                return
+            await asyncio.sleep(0)
+
+    async def _remove(self, db: aiosqlite.Connection, ids: list[str]) -> int:
+        """Archive (or delete) entities and their relationships; returns relationships."""
+        payload = dumps(ids)
+        edges = (
+            "SELECT rowid FROM main.relationships WHERE source_id IN "
+            "(SELECT value FROM json_each(?1)) "
+            "UNION SELECT rowid FROM main.relationships WHERE target_id IN "
+            "(SELECT value FROM json_each(?1))"
+        )
+        if not self.archives:
+            cursor = await db.execute(
+                f"DELETE FROM main.relationships WHERE rowid IN ({edges})", (payload,)
+            )
+            await db.execute(
+                "DELETE FROM main.entities WHERE id IN (SELECT value FROM json_each(?))",
+                (payload,),
+            )
+            return cursor.rowcount
+        # ATTACH must run outside a transaction: commit the candidate read first.
+        await db.commit()
+        assert self.path is not None
+        async with attached(db, self.path, "cold"):
+            await db.executescript(COLD_SCHEMA)
+            try:
+                await db.execute(
+                    f"INSERT OR REPLACE INTO cold.entities ({ENTITY_COLUMNS}, "
+                    "last_accessed_at, archived_at) "
+                    f"SELECT {ENTITY_COLUMNS}, last_accessed_at, ?2 FROM main.entities "
+                    "WHERE id IN (SELECT value FROM json_each(?1))",
+                    (payload, datetime.utcnow().isoformat()),
+                )
+                await db.execute(
+                    f"INSERT OR REPLACE INTO cold.relationships ({RELATIONSHIP_COLUMNS}) "
+                    f"SELECT {RELATIONSHIP_COLUMNS} FROM main.relationships "
+                    f"WHERE rowid IN ({edges})",
+                    (payload,),
+                )
+                cursor = await db.execute(
+                    f"DELETE FROM main.relationships WHERE rowid IN ({edges})", (payload,)
+                )
+                await db.execute(
+                    "DELETE FROM main.entities WHERE id IN (SELECT value FROM json_each(?))",
+                    (payload,),
+                )
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+        return cursor.rowcount
@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+
+import aiosqlite
+
+from ..core.serialization import dumps
+
+DIRECTIONS = ("out", "in", "both")
+
+
+@dataclass(frozen=True)
+class TraversalEdge:
+    source_id: str
+    target_id: str
+    relation_type: str
+    strength: float
+
+    def other(self, node: str) -> str:
+        return self.target_id if node == self.source_id else self.source_id
+
+    def to_dict(self) -> dict[str, str | float]:
+        return {
+            "source_id": self.source_id,
+            "target_id": self.target_id,
+            "relation_type": self.relation_type,
+            "strength": self.strength,
+        }
+
+
+@dataclass(frozen=True)
+class EdgeFilter:
+    """Which relationships a traversal may follow, and how many per node."""
+
+    direction: str = "both"
+    relation_types: Sequence[str] = ()
+    min_strength: float = 0.0
+    fan_out: int = 25
+
+    def reversed(self) -> EdgeFilter:
+        flipped = {"out": "in", "in": "out"}.get(self.direction, self.direction)
+        return EdgeFilter(flipped, self.relation_types, self.min_strength, self.fan_out)
+
+
+async def expand(
+    db: aiosqlite.Connection, node_ids: Sequence[str], edges: EdgeFilter
+) -> dict[str, list[TraversalEdge]]:
+    """One hop from every node in ``node_ids`` with a single set-based query.
+
+    Both directions use the ``relationships`` source/target indexes; each node keeps
+    its ``fan_out`` strongest matching edges.
+    """
+    if not node_ids or edges.fan_out <= 0:
+        return {}
+    branches = []
+    if edges.direction in ("out", "both"):
+        branches.append(
+            "SELECT r.source_id AS node, r.source_id, r.target_id, r.relation_type, r.strength "
+            "FROM frontier f JOIN relationships r ON r.source_id = f.id"
+        )
+    if edges.direction in ("in", "both"):
+        branches.append(
+            "SELECT r.target_id AS node, r.source_id, r.target_id, r.relation_type, r.strength "
+            "FROM frontier f JOIN relationships r ON r.target_id = f.id"
+        )
+    types = list(dict.fromkeys(edges.relation_types))
+    rows = await db.execute_fetchall(
+        f"""
+        WITH frontier(id) AS (SELECT DISTINCT value FROM json_each(?)),
+        hop AS ({" UNION ALL ".join(branches)}),
+        ranked AS (
+            SELECT node, source_id, target_id, relation_type, coalesce(strength, 0) AS strength,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY node ORDER BY coalesce(strength, 0) DESC, relation_type
+                   ) AS position
+            FROM hop
+            WHERE coalesce(strength, 0) >= ?
+              AND (? = 0 OR relation_type IN (SELECT value FROM json_each(?)))
+        )
+        SELECT node, source_id, target_id, relation_type, strength
+        FROM ranked WHERE position <= ?
+        ORDER BY node, position
+        """,
+        (dumps(list(node_ids)), edges.min_strength, len(types), dumps(types), edges.fan_out),
+    )
+    found: dict[str, list[TraversalEdge]] = {}
+    for node, source_id, target_id, relation_type, strength in rows:
+        found.setdefault(node, []).append(
+            TraversalEdge(source_id, target_id, relation_type, strength)
+        )
+    return found
+
+
+async def k_hop(
+    db: aiosqlite.Connection, root: str, depth: int, edges: EdgeFilter, max_nodes: int
+) -> tuple[dict[str, int], list[TraversalEdge], bool]:
+    """Breadth-first neighbourhood of ``root``: one query per hop.
+
+    Returns ``({node_id: hops}, edges, truncated)``; ``truncated`` is set when
+    ``max_nodes`` stopped the expansion early.
+    """
+    depths = {root: 0}
+    seen_edges: dict[tuple[str, str, str], TraversalEdge] = {}
+    frontier = [root]
+    truncated = False
+    for hop in range(1, depth + 1):
+        if not frontier:
+            break
+        adjacency = await expand(db, frontier, edges)
+        next_frontier: list[str] = []
+        for node in frontier:
+            for edge in adjacency.get(node, []):
+                other = edge.other(node)
+                if other not in depths:
+                    if len(depths) >= max_nodes:
+                        truncated = True
+                        continue
+                    depths[other] = hop
+                    next_frontier.append(other)
+                seen_edges.setdefault((edge.source_id, edge.target_id, edge.relation_type), edge)
+        frontier = next_frontier
+    return depths, list(seen_edges.values()), truncated
+
+
+async def shortest_path(
+    db: aiosqlite.Connection,
+    source: str,
+    target: str,
+    max_depth: int,
+    edges: EdgeFilter,
+    max_nodes: int,
+) -> list[TraversalEdge] | None:
+    """Fewest-hop path from ``source`` to ``target`` by bidirectional BFS.
+
+    The smaller frontier is expanded each round, so the nodes visited grow with
+    roughly twice ``fan_out ** (hops / 2)`` rather than ``fan_out ** hops``. Returns
+    the edges along the path in order, ``[]`` when source is target, or ``None``.
+    """
+    if source == target:
+        return []
+    # node -> (previous node towards that side's start, edge used); hops from the start
+    parents: list[dict[str, tuple[str, TraversalEdge] | None]] = [{source: None}, {target: None}]
+    hops: list[dict[str, int]] = [{source: 0}, {target: 0}]
+    frontiers = [[source], [target]]
+    filters = [edges, edges.reversed()]
+    for _ in range(max_depth):
+        if not frontiers[0] or not frontiers[1]:
+            return None
+        side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+        other_side = 1 - side
+        adjacency = await expand(db, frontiers[side], filters[side])
+        next_frontier: list[str] = []
+        meeting: str | None = None
+        for node in frontiers[side]:
+            for edge in adjacency.get(node, []):
+                other = edge.other(node)
+                if other in parents[side]:
+                    continue
+                parents[side][other] = (node, edge)
+                hops[side][other] = hops[side][node] + 1
+                next_frontier.append(other)
+                # Any meeting in this round has the same hops on this side; take the
+                # one closest to the other side's start.
+                if other in hops[other_side] and (
+                    meeting is None or hops[other_side][other] < hops[other_side][meeting]
+                ):
+                    meeting = other
+        if meeting:
+            return _join(parents, meeting)
+        if len(hops[0]) + len(hops[1]) >= max_nodes:
+            return None
+        frontiers[side] = next_frontier
+    return None
+
+
+def _join(
+    parents: list[dict[str, tuple[str, TraversalEdge] | None]], meeting: str
+) -> list[TraversalEdge]:
+    forward: list[TraversalEdge] = []
+    node = meeting
+    while (step := parents[0][node]) is not None:
+        node, edge = step
+        forward.append(edge)
+    forward.reverse()
+    node = meeting
+    while (step := parents[1][node]) is not None:
+        node, edge = step
+        forward.append(edge)
+    return forward
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Sequence
+from typing import Any
+
+from ..core.database import Database
+
+try:  # optional, required for semantic search
+    import numpy as np
+except ImportError:  # pragma: no cover - depends on the environment
+    np = None
+
+Hit = tuple[str, float]
+
+
+def require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Semantic search requires the numpy package")
+
+
+def normalise(matrix: Any) -> Any:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores: Any, k: int) -> Any:
+    """Indices of the ``k`` highest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores, kind="stable")
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx], kind="stable")]
+
+
+class VectorCache:
+    """Exact top-k cosine search over ``entities.vector``.
+
+    While the table holds at most ``capacity`` vectors they live in one contiguous
+    float32 matrix and every query batch is a single matrix multiply. Past that,
+    searches stream the table in ``capacity``-row chunks so memory stays bounded.
+    """
+
+    def __init__(self, db: Database, dim: int, capacity: int) -> None:
+        self.db = db
+        self.dim = dim
+        self.capacity = max(1, capacity)
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._complete = False
+        self._matrix: Any = None
+        self._codes: Any = None
+        self._ids: list[str] = []
+        self._type_codes: dict[str, int] = {}
+
+    @property
+    def size(self) -> int:
+        return len(self._ids)
+
+    @property
+    def cached(self) -> bool:
+        """True when every stored vector is in the in-memory matrix."""
+        return self._loaded and self._complete
+
+    def invalidate(self) -> None:
+        """Drop the matrix; the next search reloads it (e.g. after deletes)."""
+        self._loaded = False
+        self._complete = False
+        self._matrix = None
+        self._codes = None
+        self._ids = []
+
+    def add(self, rows: Sequence[tuple[str, str, bytes]]) -> None:
+        """Append freshly inserted ``(id, type, vector)`` rows to a loaded matrix."""
+        if not self.cached or not rows:
+            return
+        rows = [row for row in rows if len(row[2]) == self.dim * 4]
+        if self.size + len(rows) > self.capacity:
+            # Too big to hold: fall back to chunked scans until the next reload.
+            self.invalidate()
+            self._loaded = True
+            return
+        blob = b"".join(r[2] for r in rows)
+        vectors = normalise(np.frombuffer(blob, dtype=np.float32).reshape(-1, self.dim))
+        codes = [self._code(r[1]) for r in rows]
+        start, end = self.size, self.size + len(rows)
+        if end > len(self._matrix):
+            grown = min(self.capacity, max(end, 2 * len(self._matrix)))
+            self._matrix = np.resize(self._matrix, (grown, self.dim))
+            self._codes = np.resize(self._codes, grown)
+        self._matrix[start:end] = vectors
+        self._codes[start:end] = codes
+        self._ids.extend(r[0] for r in rows)
+
+    async def search(
+        self, queries: Sequence[Sequence[float]], k: int, ent_type: str | None = None
+    ) -> list[list[Hit]]:
+        """Top ``k`` ``(entity_id, cosine)`` hits for each query vector."""
+        require_numpy()
+        if k <= 0 or not queries:
+            return [[] for _ in queries]
+        q = normalise(np.asarray(queries, dtype=np.float32).reshape(-1, self.dim))
+        async with self._lock:
+            if not self._loaded:
+                await self._load()
+            if self._complete:
+                matrix, codes, ids = self._matrix[: self.size], self._codes[: self.size], self._ids
+                return await asyncio.to_thread(self._rank, matrix, codes, ids, q, k, ent_type)
+        return await self._scan(q, k, ent_type)
+
+    async def _load(self) -> None:
+        async with self.db.reader() as db:
+            rows = await db.execute_fetchall(
+                "SELECT id, type, vector FROM entities WHERE length(vector) = ? LIMIT ?",
+                (self.dim * 4, self.capacity + 1),
+            )
+        self._loaded = True
+        self._complete = len(rows) <= self.capacity
+        if not self._complete:
+            return
+        allocated = min(self.capacity, max(64, 2 * len(rows)))
+        self._matrix = np.zeros((allocated, self.dim), dtype=np.float32)
+        self._codes = np.full(allocated, -1, dtype=np.int32)
+        if rows:
+            blob = b"".join(r[2] for r in rows)
+            self._matrix[: len(rows)] = normalise(
+                np.frombuffer(blob, dtype=np.float32).reshape(-1, self.dim)
+            )
+            self._codes[: len(rows)] = [self._code(r[1]) for r in rows]
+        self._ids = [r[0] for r in rows]
+
+    async def _scan(self, q: Any, k: int, ent_type: str | None) -> list[list[Hit]]:
+        sql = "SELECT id, vector FROM entities WHERE length(vector) = ?"
+        params: list[Any] = [self.dim * 4]
+        if ent_type:
+            sql += " AND type = ?"
+            params.append(ent_type)
+        best: list[list[Hit]] = [[] for _ in range(len(q))]
+        async with self.db.reader() as db:
+            cursor = await db.execute(sql, params)
+            try:
+                while rows := await cursor.fetchmany(self.capacity):
+                    blob = b"".join(r[1] for r in rows)
+                    chunk = normalise(np.frombuffer(blob, dtype=np.float32).reshape(-1, self.dim))
+                    ids = [r[0] for r in rows]
+                    hits = await asyncio.to_thread(self._rank, chunk, None, ids, q, k, None)
+                    best = [
+                        sorted(prev + new, key=lambda h: h[1], reverse=True)[:k]
+                        for prev, new in zip(best, hits, strict=True)
+                    ]
+            finally:
+                await cursor.close()
+        return best
+
+    def _rank(
+        self, matrix: Any, codes: Any, ids: list[str], q: Any, k: int, ent_type: str | None
+    ) -> list[list[Hit]]:
+        scores = matrix @ q.T  # (rows, queries)
+        if ent_type is not None and codes is not None:
+            code = self._type_codes.get(ent_type, -2)
+            scores[codes != code] = -np.inf
+        results: list[list[Hit]] = []
+        for column in scores.T:
+            top = top_k(column, k)
+            results.append([(ids[i], float(column[i])) for i in top if np.isfinite(column[i])])
+        return results
+
+    def _code(self, ent_type: str) -> int:
+        return self._type_codes.setdefault(ent_type, len(self._type_codes))
@@ -1,17 +1,28 @@
 from __future__ import annotations
 
 from contextlib import asynccontextmanager
-from typing import Any
+from html import escape
+from typing import Annotated, Any
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, WebSocket
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel
+from fastapi import FastAPI, Query, WebSocket
+from fastapi.responses import HTMLResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 
 from .agent import AgentRuntime, build_agent_runtime, resolve_agent_by_role
+from .blobs import BLOB_KEY, is_blob_ref
 from .config import settings
+from .core.database import close_databases
 from .core.logging import configure_logging
+from .core.serialization import FastJSONResponse
 from .graph.models import ExecutionGraph
 from .graph.streaming import StreamCallback
+from .graph.trace import build_timeline
+from .skills.builtin.file_ops import resolve_workspace_path
+from .storage import encode_cursor
+
+# Upper bound on POST /knowledge/facts; specter-cli kg-import sends 500 per request.
+MAX_FACTS_PER_REQUEST = 5000
 
 
 class SimpleCallback(StreamCallback):
@@ -88,6 +99,11 @@ class MemoryEntitiesResponse(BaseModel):
     entities: list[dict[str, Any]]
 
 
+class FactsRequest(BaseModel):
+    statements: list[str] = Field(max_length=MAX_FACTS_PER_REQUEST)
+    confidence: float = 1.0
+
+
 class DelegateRequest(BaseModel):
     task: str
     role: str | None = None
@@ -117,18 +133,27 @@ def get_agent(agent_id: str | None) -> AgentRuntime:
 
 @asynccontextmanager
 async def lifespan(_: FastAPI):
+    # Runtimes start their background loops on first init; runtimes created later
+    # through get_agent start theirs on the request that creates them.
     for agent_id in settings.specter.agents.keys() or [settings.specter.default_agent]:
-        runtime = get_agent(agent_id)
-        await runtime.init()
+        await get_agent(agent_id).init()
     yield
+    for runtime in _agents.values():
+        await runtime.close()
+    await close_databases()
 
 
-app = FastAPI(title="Specter", version="0.1.0", lifespan=lifespan)
+app = FastAPI(
+    title="Specter",
+    version="0.1.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse,
+)
 
 
 @app.get("/health")
-async def health() -> JSONResponse:
-    return JSONResponse({"status": "ok"})
+async def health() -> FastJSONResponse:
+    return FastJSONResponse({"status": "ok"})
 
 
 @app.get("/config")
@@ -142,12 +167,12 @@ async def config() -> ConfigResponse:
 
 
 @app.post("/webhook/{channel}")
-async def receive_message(channel: str, payload: dict[str, Any]) -> JSONResponse:
+async def receive_message(channel: str, payload: dict[str, Any]) -> FastJSONResponse:
     callback = SimpleCallback()
     user_text = payload.get("text", "")
     agent = get_agent(payload.get("agent_id"))
     await agent.init()
-    await agent.kg.add_fact(user_text, confidence=0.6)
+    await agent.kg.ingest.submit(user_text, confidence=0.6)
     result = await agent.orchestrator.run(
         user_text,
         {
@@ -156,30 +181,224 @@ async def receive_message(channel: str, payload: dict[str, Any]) -> JSONResponse
         },
         callback,
     )
-    return JSONResponse({"result": result, "events": callback.events})
+    return FastJSONResponse({"result": result, "events": callback.events})
 
 
 @app.get("/knowledge/search")
-async def search_knowledge(q: str, user_id: str) -> JSONResponse:
+async def search_knowledge(q: str, user_id: str, limit: int = 5) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    result = await agent.kg.query(q, limit=limit)
+    return FastJSONResponse({"user_id": user_id, "results": result})
+
+
+@app.post("/knowledge/facts")
+async def add_facts(payload: FactsRequest, user_id: str) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    ids = await agent.kg.add_facts(payload.statements, confidence=payload.confidence)
+    return FastJSONResponse({"user_id": user_id, "ids": ids, "count": len(ids)})
+
+
+@app.get("/knowledge/ingest")
+async def ingest_status(user_id: str, flush: bool = False) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    if flush:
+        await agent.kg.ingest.flush()
+    return FastJSONResponse(
+        {"user_id": user_id, **agent.kg.ingest.stats(), "extraction": agent.kg.extraction}
+    )
+
+
+@app.post("/knowledge/documents/index")
+async def index_documents(user_id: str, path: str = ".", wait: bool = False) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    documents = agent.kg.documents
+    try:
+        started = documents.start(path)
+    except ValueError as exc:
+        return FastJSONResponse({"error": "invalid_request", "detail": str(exc)}, status_code=400)
+    except FileNotFoundError:
+        return FastJSONResponse({"error": "not_found", "path": path}, status_code=404)
+    if not started:
+        return FastJSONResponse(
+            {"error": "busy", "user_id": user_id, **documents.progress}, status_code=409
+        )
+    if wait:
+        return FastJSONResponse({"user_id": user_id, **await documents.wait()})
+    return FastJSONResponse({"user_id": user_id, **documents.progress}, status_code=202)
+
+
+@app.get("/knowledge/documents")
+async def documents_status(user_id: str) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    return FastJSONResponse({"user_id": user_id, **agent.kg.documents.progress})
+
+
+@app.get("/knowledge/semantic")
+async def semantic_search(
+    q: str, user_id: str, limit: int = 5, ent_type: str | None = None
+) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    try:
+        results = await agent.kg.semantic_search(q, limit=limit, ent_type=ent_type)
+    except RuntimeError as exc:
+        return FastJSONResponse({"error": "unavailable", "detail": str(exc)}, status_code=503)
+    return FastJSONResponse({"user_id": user_id, "results": results})
+
+
+@app.get("/knowledge/retrieve")
+async def retrieve_knowledge(
+    q: str, user_id: str, limit: int = 10, budget_ms: float | None = None
+) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    result = await agent.kg.retrieve(q, limit=limit, budget_ms=budget_ms)
+    return FastJSONResponse({"user_id": user_id, **result})
+
+
+@app.get("/knowledge/neighbourhood")
+async def knowledge_neighbourhood(
+    entity: str,
+    user_id: str,
+    depth: int = 2,
+    direction: str = "both",
+    relation_type: Annotated[list[str] | None, Query()] = None,
+    min_strength: float = 0.0,
+    fan_out: int | None = None,
+    max_nodes: int | None = None,
+) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    try:
+        result = await agent.kg.neighbourhood(
+            entity,
+            depth,
+            direction=direction,
+            relation_types=relation_type,
+            min_strength=min_strength,
+            fan_out=fan_out,
+            max_nodes=max_nodes,
+        )
+    except ValueError as exc:
+        return FastJSONResponse({"error": "invalid_request", "detail": str(exc)}, status_code=400)
+    if result is None:
+        return FastJSONResponse({"error": "not_found", "entity": entity}, status_code=404)
+    return FastJSONResponse({"user_id": user_id, **result})
+
+
+@app.get("/knowledge/path")
+async def knowledge_path(
+    source: str,
+    target: str,
+    user_id: str,
+    max_depth: int | None = None,
+    direction: str = "both",
+    relation_type: Annotated[list[str] | None, Query()] = None,
+    min_strength: float = 0.0,
+    fan_out: int | None = None,
+) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    try:
+        result = await agent.kg.shortest_path(
+            source,
+            target,
+            max_depth,
+            direction=direction,
+            relation_types=relation_type,
+            min_strength=min_strength,
+            fan_out=fan_out,
+        )
+    except ValueError as exc:
+        return FastJSONResponse({"error": "invalid_request", "detail": str(exc)}, status_code=400)
+    if result is None:
+        return FastJSONResponse(
+            {"error": "not_found", "source": source, "target": target}, status_code=404
+        )
+    return FastJSONResponse({"user_id": user_id, **result})
+
+
+@app.post("/knowledge/reindex")
+async def reindex_knowledge(user_id: str) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    hashed = await agent.kg.backfill_fact_hashes()
+    embedded = await agent.kg.backfill_vectors()
+    ann = await agent.kg.ann.rebuild() if agent.kg.ann.enabled else None
+    return FastJSONResponse({"status": "ok", "hashed": hashed, "embedded": embedded, "ann": ann})
+
+
+@app.post("/knowledge/export")
+async def export_knowledge(user_id: str, path: str) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    try:
+        target = resolve_workspace_path(path)
+    except ValueError as exc:
+        return FastJSONResponse({"error": "invalid_request", "detail": str(exc)}, status_code=400)
+    manifest = await agent.kg.export_bundle(target)
+    return FastJSONResponse({"user_id": user_id, "path": str(target), **manifest})
+
+
+@app.post("/knowledge/import")
+async def import_knowledge(
+    user_id: str, path: str, defer_indexes: bool | None = None
+) -> FastJSONResponse:
+    agent = get_agent(user_id)
+    await agent.init()
+    try:
+        stats = await agent.kg.import_bundle(resolve_workspace_path(path), defer_indexes)
+    except ValueError as exc:
+        return FastJSONResponse({"error": "invalid_request", "detail": str(exc)}, status_code=400)
+    except FileNotFoundError:
+        return FastJSONResponse({"error": "not_found", "path": path}, status_code=404)
+    return FastJSONResponse({"user_id": user_id, **stats})
+
+
+@app.get("/knowledge/ann/benchmark")
+async def benchmark_ann(user_id: str, queries: int = 100, k: int = 10) -> FastJSONResponse:
     agent = get_agent(user_id)
     await agent.init()
-    result = await agent.kg.query(q)
-    return JSONResponse({"user_id": user_id, "results": result})
+    if not agent.kg.ann.enabled:
+        return FastJSONResponse(
+            {"error": "unavailable", "detail": "ANN index disabled"}, status_code=503
+        )
+    if agent.kg.ann.index is None:
+        await agent.kg.ann.rebuild()
+    report = await agent.kg.ann.benchmark(agent.kg.vectors, queries=queries, k=k)
+    return FastJSONResponse(report)
 
 
 @app.get("/knowledge/entities")
-async def search_entities(q: str, user_id: str) -> EntityQueryResponse:
+async def search_entities(
+    q: str,
+    user_id: str,
+    limit: int = 10,
+    relation_limit: int = 5,
+    relation_names: bool = False,
+) -> EntityQueryResponse:
     agent = get_agent(user_id)
     await agent.init()
-    entities = await agent.kg.query_entities(q)
+    entities = await agent.kg.query_entities(
+        q, limit=limit, relation_limit=relation_limit, relation_names=relation_names
+    )
     return EntityQueryResponse(entities=entities)
 
 
 @app.get("/knowledge/summary")
-async def list_summaries(user_id: str) -> SummaryResponse:
+async def list_summaries(
+    user_id: str,
+    level: str | None = None,
+    limit: int = 5,
+) -> SummaryResponse:
     agent = get_agent(user_id)
     await agent.init()
-    summaries = await agent.kg.list_summaries()
+    summaries = await agent.kg.list_summaries(limit=limit, level=level)
     return SummaryResponse(summaries=summaries)
 
 
@@ -192,11 +411,13 @@ async def create_summary(user_id: str) -> SummaryCreateResponse:
 
 
 @app.post("/knowledge/cleanup")
-async def cleanup_memory(user_id: str) -> JSONResponse:
+async def cleanup_memory(user_id: str) -> FastJSONResponse:
     agent = get_agent(user_id)
     await agent.init()
-    await agent.kg.cleanup_expired()
-    return JSONResponse({"status": "ok"})
+    reclaimed = await agent.kg.cleanup_expired()
+    return FastJSONResponse(
+        {"status": "ok", "reclaimed": reclaimed, "total_reclaimed": agent.kg.reclaimed}
+    )
 
 
 @app.get("/knowledge/entities/list")
@@ -206,6 +427,8 @@ async def list_entities(
     limit: int = 50,
     search: str | None = None,
     include_relations: bool = False,
+    relation_limit: int = 12,
+    relation_names: bool = False,
 ) -> MemoryEntitiesResponse:
     agent = get_agent(user_id)
     await agent.init()
@@ -214,6 +437,8 @@ async def list_entities(
         limit=limit,
         search=search,
         include_relations=include_relations,
+        relation_limit=relation_limit,
+        relation_names=relation_names,
     )
     return MemoryEntitiesResponse(entities=entities)
 
@@ -229,7 +454,7 @@ async def list_agents() -> AgentListResponse:
 
 
 @app.post("/agents/delegate")
-async def delegate_task(payload: DelegateRequest) -> JSONResponse:
+async def delegate_task(payload: DelegateRequest) -> FastJSONResponse:
     target_id = payload.agent_id
     if not target_id and payload.role:
         target_id = resolve_agent_by_role(settings.specter, payload.role)
@@ -241,29 +466,31 @@ async def delegate_task(payload: DelegateRequest) -> JSONResponse:
         {"channel": "delegate", "user_id": payload.user_id or "local"},
         callback,
     )
-    return JSONResponse({"agent_id": agent.agent_id, "result": result, "events": callback.events})
+    return FastJSONResponse(
+        {"agent_id": agent.agent_id, "result": result, "events": callback.events}
+    )
 
 
 @app.post("/skills/forge")
-async def create_skill(payload: SkillForgeRequest) -> JSONResponse:
+async def create_skill(payload: SkillForgeRequest) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
     result = await agent.forge.forge(
         payload.description,
         examples=payload.examples,
         persist=lambda name, data: agent.orchestrator.skills.persist_template_skill(
-            agent.store.db_path, name, data
+            agent.store.db, name, data
         ),
     )
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
 @app.post("/tools/invoke")
-async def invoke_tool(payload: ToolInvokeRequest) -> JSONResponse:
+async def invoke_tool(payload: ToolInvokeRequest) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
     result = await agent.orchestrator.skills.execute(payload.tool_name, payload.params)
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
 @app.get("/tools")
@@ -276,14 +503,14 @@ async def list_tools() -> ToolListResponse:
 
 
 @app.post("/skills/install")
-async def install_skill(payload: SkillInstallRequest) -> JSONResponse:
+async def install_skill(payload: SkillInstallRequest) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
     await agent.orchestrator.skills.persist_template_skill(
-        agent.store.db_path, payload.name, {"description": payload.description}
+        agent.store.db, payload.name, {"description": payload.description}
     )
-    await agent.orchestrator.skills.load_from_db(agent.store.db_path)
-    return JSONResponse({"installed": True, "name": payload.name})
+    await agent.orchestrator.skills.load_from_db(agent.store.db)
+    return FastJSONResponse({"installed": True, "name": payload.name})
 
 
 @app.get("/skills")
@@ -294,46 +521,114 @@ async def list_skills() -> SkillListResponse:
 
 
 @app.post("/skills/run")
-async def run_skill(payload: SkillRunRequest) -> JSONResponse:
+async def run_skill(payload: SkillRunRequest) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
     result = await agent.orchestrator.skills.execute(payload.name, payload.params)
-    return JSONResponse(result)
+    return FastJSONResponse(result)
 
 
 @app.get("/executions/{exec_id}")
-async def get_execution(exec_id: str) -> JSONResponse:
+async def get_execution(exec_id: str, include_archived: bool = True) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
-    result = await agent.store.get_execution(exec_id)
+    result = await agent.store.get_execution(exec_id, include_archived=include_archived)
     if result is None:
-        return JSONResponse({"error": "not_found", "id": exec_id}, status_code=404)
-    return JSONResponse(result)
+        return FastJSONResponse({"error": "not_found", "id": exec_id}, status_code=404)
+    return FastJSONResponse(result)
 
 
 @app.get("/executions")
-async def list_executions() -> JSONResponse:
+async def list_executions(
+    limit: int = 20,
+    cursor: str | None = None,
+    user_id: str | None = None,
+    status: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    q: str | None = None,
+) -> FastJSONResponse:
+    agent = get_agent(None)
+    await agent.init()
+    limit = max(1, min(limit, 200))
+    try:
+        result = await agent.store.list_executions(
+            limit=limit,
+            cursor=cursor,
+            user_id=user_id,
+            status=status,
+            since=since,
+            until=until,
+            q=q,
+        )
+    except ValueError:
+        return FastJSONResponse({"error": "invalid_cursor", "cursor": cursor}, status_code=400)
+    next_cursor = encode_cursor(result[-1]) if len(result) == limit else None
+    return FastJSONResponse({"executions": result, "next_cursor": next_cursor})
+
+
+@app.get("/executions/{exec_id}/timeline")
+async def execution_timeline(exec_id: str) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
-    result = await agent.store.list_executions()
-    return JSONResponse({"executions": result})
+    existing = await agent.store.get_execution(exec_id, include_archived=True)
+    if existing is None:
+        return FastJSONResponse({"error": "not_found", "id": exec_id}, status_code=404)
+    deps = {n["id"]: n.get("deps", []) for n in existing["graph"].get("nodes", [])}
+    runs = await agent.store.get_node_runs(exec_id, include_archived=True)
+    return FastJSONResponse({"id": exec_id, **build_timeline(runs, deps)})
+
+
+@app.get("/executions/{exec_id}/results/{node_id}")
+async def get_node_result(exec_id: str, node_id: str) -> Response:
+    agent = get_agent(None)
+    await agent.init()
+    existing = await agent.store.get_execution(exec_id, include_archived=True)
+    results = ((existing or {}).get("result") or {}).get("results") or {}
+    if node_id not in results:
+        return FastJSONResponse(
+            {"error": "not_found", "id": exec_id, "node_id": node_id}, status_code=404
+        )
+    value = results[node_id]
+    if is_blob_ref(value):
+        return await get_blob(value[BLOB_KEY])
+    return FastJSONResponse(value)
+
+
+@app.get("/blobs/{digest}")
+async def get_blob(digest: str) -> Response:
+    blobs = get_agent(None).orchestrator.blobs
+    try:
+        if not blobs.exists(digest):
+            return FastJSONResponse({"error": "not_found", "digest": digest}, status_code=404)
+    except ValueError:
+        return FastJSONResponse({"error": "invalid_digest", "digest": digest}, status_code=400)
+    return StreamingResponse(blobs.iter_chunks(digest), media_type="application/json")
 
 
 @app.post("/executions/{exec_id}/replay")
-async def replay_execution(exec_id: str) -> JSONResponse:
+async def replay_execution(exec_id: str) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
-    existing = await agent.store.get_execution(exec_id)
+    existing = await agent.store.get_execution(exec_id, include_archived=True)
     if existing is None:
-        return JSONResponse({"error": "not_found", "id": exec_id}, status_code=404)
+        return FastJSONResponse({"error": "not_found", "id": exec_id}, status_code=404)
     graph = ExecutionGraph.from_dict(existing["graph"])
     callback = SimpleCallback()
     result = await agent.orchestrator.executor.execute(graph, callback)
-    return JSONResponse({"replayed": True, "result": result, "events": callback.events})
+    return FastJSONResponse({"replayed": True, "result": result, "events": callback.events})
+
+
+@app.post("/maintenance/retention")
+async def run_retention(full_vacuum: bool = False) -> FastJSONResponse:
+    agent = get_agent(None)
+    await agent.init()
+    stats = await agent.store.run_retention(full_vacuum=full_vacuum)
+    return FastJSONResponse(stats)
 
 
 @app.post("/healing/override")
-async def manual_heal(payload: HealingOverrideRequest) -> JSONResponse:
+async def manual_heal(payload: HealingOverrideRequest) -> FastJSONResponse:
     agent = get_agent(None)
     await agent.init()
     await agent.store.set_status(payload.execution_id, "healing")
@@ -342,7 +637,7 @@ async def manual_heal(payload: HealingOverrideRequest) -> JSONResponse:
         "manual_heal",
         {"fix_type": payload.fix_type},
     )
-    return JSONResponse(
+    return FastJSONResponse(
         {"execution_id": payload.execution_id, "fix_type": payload.fix_type, "status": "healing"}
     )
 
@@ -356,20 +651,34 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str) -> None:
         callback = SimpleCallback()
         agent = get_agent(user_id)
         await agent.init()
-        await agent.kg.add_fact(data, confidence=0.6)
+        await agent.kg.ingest.submit(data, confidence=0.6)
         result = await agent.orchestrator.run(data, {"user_id": user_id}, callback)
         await websocket.send_json({"result": result, "events": callback.events})
 
 
 @app.get("/ui")
-async def ui() -> HTMLResponse:
+async def ui(
+    cursor: str | None = None,
+    status: str | None = None,
+    q: str | None = None,
+) -> HTMLResponse:
     agent = get_agent(None)
     await agent.init()
-    items = await agent.store.list_executions()
+    limit = 50
+    try:
+        items = await agent.store.list_executions(limit=limit, cursor=cursor, status=status, q=q)
+    except ValueError:
+        items = []
     rows = "\n".join(
-        f"<tr><td>{i['id']}</td><td>{i['status']}</td><td>{i['intent']}</td></tr>"
+        f"<tr><td>{escape(i['id'])}</td><td>{escape(str(i['status']))}</td>"
+        f"<td>{escape(i['intent'])}</td></tr>"
         for i in items
     )
+    next_link = ""
+    if len(items) == limit:
+        params = {"cursor": encode_cursor(items[-1]), "status": status, "q": q}
+        query = urlencode({k: v for k, v in params.items() if v})
+        next_link = f'<p><a href="/ui?{escape(query)}">Older &rarr;</a></p>'
     html = f"""
     <html>
       <head><title>Specter UI</title></head>
@@ -379,6 +688,7 @@ async def ui() -> HTMLResponse:
           <tr><th>ID</th><th>Status</th><th>Intent</th></tr>
           {rows}
         </table>
+        {next_link}
       </body>
     </html>
     """
@@ -0,0 +1,239 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any
+
+import aiosqlite
+import structlog
+
+from .config import RetentionConfig, settings
+from .core.database import Database
+
+logger = structlog.get_logger(__name__)
+
+EXECUTION_COLUMNS = (
+    "id, user_id, intent, graph_json, status, result, started_at, completed_at, duration_ms"
+)
+AUDIT_COLUMNS = "id, execution_id, action, details, timestamp"
+NODE_RUN_COLUMNS = (
+    "id, execution_id, node_id, node_type, tool_name, attempt, phase, status, "
+    "queued_ms, started_ms, ended_ms, error, healing_strategy"
+)
+
+ARCHIVE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS archive.executions (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    intent TEXT NOT NULL,
+    graph_json JSON NOT NULL,
+    status TEXT,
+    result JSON,
+    started_at TIMESTAMP,
+    completed_at TIMESTAMP,
+    duration_ms INT
+);
+CREATE TABLE IF NOT EXISTS archive.audit_log (
+    id INTEGER PRIMARY KEY,
+    execution_id TEXT,
+    action TEXT,
+    details JSON,
+    timestamp TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS archive.node_runs (
+    id INTEGER PRIMARY KEY,
+    execution_id TEXT NOT NULL,
+    node_id TEXT NOT NULL,
+    node_type TEXT,
+    tool_name TEXT,
+    attempt INT NOT NULL,
+    phase TEXT NOT NULL,
+    status TEXT NOT NULL,
+    queued_ms REAL,
+    started_ms REAL,
+    ended_ms REAL,
+    error TEXT,
+    healing_strategy TEXT
+);
+CREATE INDEX IF NOT EXISTS archive.idx_archive_started ON executions(started_at);
+CREATE INDEX IF NOT EXISTS archive.idx_archive_audit_execution ON audit_log(execution_id);
+CREATE INDEX IF NOT EXISTS archive.idx_archive_node_runs ON node_runs(execution_id);
+"""
+
+
+@asynccontextmanager
+async def attached(
+    db: aiosqlite.Connection, path: Path, alias: str = "archive"
+) -> AsyncIterator[aiosqlite.Connection]:
+    """ATTACH an archive file for the duration of the block. Must start outside a transaction."""
+    await db.execute(f"ATTACH DATABASE ? AS {alias}", (str(path),))
+    try:
+        yield db
+    finally:
+        await db.execute(f"DETACH DATABASE {alias}")
+
+
+class RetentionEngine:
+    """Moves old executions (with audit rows and node runs) into monthly archive files."""
+
+    def __init__(self, db: Database, config: RetentionConfig | None = None) -> None:
+        self.db = db
+        self.config = config or settings.specter.retention
+        archive_dir = self.config.archive_dir or str(Path(settings.specter.data_dir) / "archive")
+        self.archive_dir = Path(archive_dir)
+        self._prefix = f"{Path(db.db_path).stem}_executions_"
+
+    def archive_path(self, partition: str) -> Path:
+        return self.archive_dir / f"{self._prefix}{partition}.db"
+
+    def archives(self) -> list[Path]:
+        """Existing archive files, newest partition first."""
+        if not self.archive_dir.exists():
+            return []
+        return sorted(self.archive_dir.glob(f"{self._prefix}*.db"), reverse=True)
+
+    def archives_for(self, exec_id: str) -> list[Path]:
+        """Archive files to search for an execution, most likely partition first."""
+        paths = self.archives()
+        try:
+            millis = int(exec_id.split("_")[1])
+        except (IndexError, ValueError):
+            return paths
+        likely = self.archive_path(datetime.utcfromtimestamp(millis / 1000).strftime("%Y_%m"))
+        if likely in paths:
+            paths.remove(likely)
+            paths.insert(0, likely)
+        return paths
+
+    async def run(self, now: datetime | None = None) -> dict[str, int]:
+        now = now or datetime.utcnow()
+        archived = await self.archive_executions(now)
+        pruned = await self.prune_audit(now)
+        freed = await self.compact()
+        stats = {"archived": archived, "audit_pruned": pruned, "pages_freed": freed}
+        logger.info("retention_run", db_path=self.db.db_path, **stats)
+        return stats
+
+    async def run_periodically(self) -> None:
+        while True:
+            try:
+                await self.run()
+            except Exception:  # noqa: BLE001
+                logger.exception("retention_run_failed", db_path=self.db.db_path)
+            await asyncio.sleep(self.config.interval_seconds)
+
+    async def archive_executions(self, now: datetime | None = None) -> int:
+        now = now or datetime.utcnow()
+        cutoff = (now - timedelta(days=self.config.execution_max_age_days)).isoformat()
+        batch_size = max(1, self.config.batch_size)
+        total = 0
+        while True:
+            async with self.db.writer() as db:
+                rows = await db.execute_fetchall(
+                    """
+                    SELECT id, substr(started_at, 1, 7) FROM executions
+                    WHERE started_at < ?
+                    ORDER BY started_at
+                    LIMIT ?
+                    """,
+                    (cutoff, batch_size),
+                )
+                partitions: dict[str, list[str]] = {}
+                for exec_id, month in rows:
+                    partitions.setdefault((month or "unknown").replace("-", "_"), []).append(
+                        exec_id
+                    )
+                for partition, ids in partitions.items():
+                    await self._move(db, self.archive_path(partition), ids)
+            total += len(rows)
+            if len(rows) < batch_size:
+                return total
+            # Yield between batches so queued writers get the lock.
+            await asyncio.sleep(0)
+
+    async def _move(self, db: aiosqlite.Connection, path: Path, ids: list[str]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        marks = ",".join("?" * len(ids))
+        async with attached(db, path):
+            await db.executescript(ARCHIVE_SCHEMA)
+            try:
+                # INSERT OR REPLACE keeps a re-run idempotent if a previous move was
+                # interrupted between the archive and main commits.
+                await db.execute(
+                    f"INSERT OR REPLACE INTO archive.executions ({EXECUTION_COLUMNS}) "
+                    f"SELECT {EXECUTION_COLUMNS} FROM main.executions WHERE id IN ({marks})",
+                    ids,
+                )
+                await db.execute(
+                    f"INSERT OR REPLACE INTO archive.audit_log ({AUDIT_COLUMNS}) "
+                    f"SELECT {AUDIT_COLUMNS} FROM main.audit_log WHERE execution_id IN ({marks})",
+                    ids,
+                )
+                await db.execute(
+                    f"INSERT OR REPLACE INTO archive.node_runs ({NODE_RUN_COLUMNS}) "
+                    f"SELECT {NODE_RUN_COLUMNS} FROM main.node_runs "
+                    f"WHERE execution_id IN ({marks})",
+                    ids,
+                )
+                await db.execute(f"DELETE FROM main.audit_log WHERE execution_id IN ({marks})", ids)
+                await db.execute(f"DELETE FROM main.node_runs WHERE execution_id IN ({marks})", ids)
+                await db.execute(f"DELETE FROM main.executions WHERE id IN ({marks})", ids)
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                raise
+
+    async def prune_audit(self, now: datetime | None = None) -> int:
+        now = now or datetime.utcnow()
+        # audit_log.timestamp uses SQLite's CURRENT_TIMESTAMP format.
+        cutoff = (now - timedelta(days=self.config.audit_max_age_days)).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+        batch_size = max(1, self.config.batch_size)
+        total = 0
+        while True:
+            async with self.db.writer() as db:
+                cursor = await db.execute(
+                    """
+                    DELETE FROM audit_log WHERE id IN (
+                        SELECT id FROM audit_log WHERE timestamp < ? LIMIT ?
+                    )
+                    """,
+                    (cutoff, batch_size),
+                )
+                deleted = cursor.rowcount
+            total += deleted
+            if deleted < batch_size:
+                return total
+            await asyncio.sleep(0)
+
+    async def compact(self, full: bool = False) -> int:
+        """Return freed pages to the OS.
+
+        ``full`` runs a one-off VACUUM, which also switches files created before
+        incremental auto_vacuum was enabled, and rebuilds the rowid-keyed FTS indexes.
+        """
+        async with self.db.writer() as db:
+            before = await self._scalar(db, "PRAGMA freelist_count")
+            if full:
+                await db.executescript(
+                    "PRAGMA auto_vacuum = INCREMENTAL;"
+                    "VACUUM;"
+                    "INSERT INTO executions_fts(executions_fts) VALUES ('rebuild');"
+                    "INSERT INTO entities_fts(entities_fts) VALUES ('rebuild');"
+                )
+            elif before and await self._scalar(db, "PRAGMA auto_vacuum") == 2:
+                await db.executescript(
+                    f"PRAGMA incremental_vacuum({int(self.config.vacuum_pages)});"
+                )
+            after = await self._scalar(db, "PRAGMA freelist_count")
+            await db.executescript("PRAGMA wal_checkpoint(TRUNCATE);")
+        return max(0, before - after)
+
+    @staticmethod
+    async def _scalar(db: aiosqlite.Connection, sql: str) -> Any:
+        rows = await db.execute_fetchall(sql)
+        return rows[0][0] if rows else 0
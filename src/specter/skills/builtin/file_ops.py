@@ -5,8 +5,13 @@ from pathlib import Path
 from ...config import settings
 
 
-def _resolve_path(path: str) -> Path:
-    root = Path(settings.specter.data_dir).resolve().parent
+def workspace_root() -> Path:
+    """Directory the file tools (and document indexing) are confined to."""
+    return Path(settings.specter.data_dir).resolve().parent
+
+
+def resolve_workspace_path(path: str) -> Path:
+    root = workspace_root()
     candidate = Path(path)
     if not candidate.is_absolute():
         candidate = (root / candidate).resolve()
@@ -16,7 +21,7 @@ def _resolve_path(path: str) -> Path:
 
 
 async def file_read(path: str, max_chars: int = 5000) -> dict:
-    target = _resolve_path(path)
+    target = resolve_workspace_path(path)
     if not target.exists():
         return {"success": False, "data": None, "error": "File not found"}
     data = target.read_text(encoding="utf-8", errors="ignore")
@@ -26,7 +31,7 @@ async def file_read(path: str, max_chars: int = 5000) -> dict:
 
 
 async def file_write(path: str, content: str, append: bool = False) -> dict:
-    target = _resolve_path(path)
+    target = resolve_workspace_path(path)
     target.parent.mkdir(parents=True, exist_ok=True)
     mode = "a" if append else "w"
     with open(target, mode, encoding="utf-8") as f:
@@ -35,7 +40,7 @@ async def file_write(path: str, content: str, append: bool = False) -> dict:
 
 
 async def file_list(path: str = ".", pattern: str = "*") -> dict:
-    target = _resolve_path(path)
+    target = resolve_workspace_path(path)
     if not target.exists():
         return {"success": False, "data": None, "error": "Path not found"}
     results = [str(p.relative_to(target)) for p in target.glob(pattern)]
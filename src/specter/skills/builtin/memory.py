@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from ...knowledge.graph import KnowledgeGraph
+
+MemoryTool = Callable[..., Awaitable[dict]]
+
+
+def memory_tools(kg: KnowledgeGraph) -> dict[str, MemoryTool]:
+    """Graph traversal tools bound to one agent's knowledge graph."""
+
+    async def memory_neighbourhood(
+        entity: str,
+        depth: int = 2,
+        relation_types: list[str] | None = None,
+        min_strength: float = 0.0,
+        fan_out: int | None = None,
+    ) -> dict:
+        try:
+            result = await kg.neighbourhood(
+                entity,
+                depth,
+                relation_types=relation_types,
+                min_strength=min_strength,
+                fan_out=fan_out,
+            )
+        except ValueError as exc:
+            return {"success": False, "data": None, "error": str(exc)}
+        if result is None:
+            return {"success": False, "data": None, "error": f"Unknown entity: {entity}"}
+        return {"success": True, "data": _compact(result), "error": None}
+
+    async def memory_path(
+        source: str,
+        target: str,
+        max_depth: int | None = None,
+        relation_types: list[str] | None = None,
+        min_strength: float = 0.0,
+    ) -> dict:
+        try:
+            result = await kg.shortest_path(
+                source,
+                target,
+                max_depth,
+                relation_types=relation_types,
+                min_strength=min_strength,
+            )
+        except ValueError as exc:
+            return {"success": False, "data": None, "error": str(exc)}
+        if result is None:
+            return {"success": False, "data": None, "error": "Unknown source or target entity"}
+        return {"success": True, "data": _compact(result), "error": None}
+
+    return {"memory_neighbourhood": memory_neighbourhood, "memory_path": memory_path}
+
+
+def _compact(result: dict[str, Any]) -> dict[str, Any]:
+    # Attributes (raw fact text aside) are noise in a plan context.
+    def node(item: dict[str, Any]) -> dict[str, Any]:
+        compact = {key: value for key, value in item.items() if key != "attributes"}
+        raw = item.get("attributes", {}).get("raw")
+        if raw:
+            compact["text"] = raw
+        return compact
+
+    return {
+        **result,
+        **{key: [node(item) for item in result[key]] for key in ("nodes", "path") if key in result},
+    }
@@ -5,14 +5,14 @@ from dataclasses import dataclass
 from types import MappingProxyType
 from typing import Any
 
-import aiosqlite
-
 from ..config import settings
+from ..core.database import Database
 from ..core.reliability import CircuitBreaker, RetryPolicy
 from .builtin.calc import calculate
 from .builtin.calendar import calendar_create_event, calendar_list_events
 from .builtin.email import email_search, email_send
 from .builtin.file_ops import file_list, file_read, file_write
+from .builtin.memory import memory_tools
 from .builtin.search import web_search
 from .builtin.web import web_fetch
 
@@ -160,6 +160,44 @@ class SkillManager:
             ),
         )
 
+    def register_memory_tools(self, kg: Any) -> None:
+        """Traversal tools over an agent's knowledge graph (a ``KnowledgeGraph``)."""
+        tools = memory_tools(kg)
+        self.register_tool(
+            "memory_neighbourhood",
+            tools["memory_neighbourhood"],
+            ToolSpec(
+                name="memory_neighbourhood",
+                description="Entities related to a remembered entity within a few hops.",
+                params={
+                    "entity": "string",
+                    "depth": "int",
+                    "relation_types": "list[string]",
+                    "min_strength": "float",
+                    "fan_out": "int",
+                },
+                category="memory",
+                example="memory_neighbourhood: Acme Corp, depth 2",
+            ),
+        )
+        self.register_tool(
+            "memory_path",
+            tools["memory_path"],
+            ToolSpec(
+                name="memory_path",
+                description="Shortest chain of relationships between two remembered entities.",
+                params={
+                    "source": "string",
+                    "target": "string",
+                    "max_depth": "int",
+                    "relation_types": "list[string]",
+                    "min_strength": "float",
+                },
+                category="memory",
+                example="memory_path: Alice to Project Zephyr",
+            ),
+        )
+
     def register(self, name: str, func: Any) -> None:
         self._skills[name] = func
         self._breakers.setdefault(
@@ -187,17 +225,17 @@ class SkillManager:
     def set_audit_hook(self, hook: callable | None) -> None:
         self._audit_hook = hook
 
-    async def load_from_db(self, db_path: str) -> None:
-        async with aiosqlite.connect(db_path) as db:
+    async def load_from_db(self, database: Database) -> None:
+        async with database.reader() as db:
             cursor = await db.execute("SELECT name, code FROM skills")
             rows = await cursor.fetchall()
-            for name, code in rows:
-                await self._register_from_code(name, code)
+        for name, code in rows:
+            await self._register_from_code(name, code)
 
     async def persist_template_skill(
-        self, db_path: str, name: str, payload: dict[str, Any]
+        self, database: Database, name: str, payload: dict[str, Any]
     ) -> None:
-        async with aiosqlite.connect(db_path) as db:
+        async with database.writer() as db:
             cursor = await db.execute(
                 "SELECT MAX(version) FROM skills WHERE name = ?",
                 (name,),
@@ -218,7 +256,6 @@ class SkillManager:
                     next_version,
                 ),
             )
-            await db.commit()
 
     async def _register_from_code(self, name: str, code: str) -> None:
         try:
@@ -1,33 +1,160 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import base64
+import heapq
 from datetime import datetime
+from itertools import islice
 from typing import Any
 
-import aiosqlite
+import structlog
+
+from .config import StorageConfig, settings
+from .core.backends import SQLiteBackend, StorageBackend
+from .core.batching import drain_batches
+from .core.database import Database, fts_query
+from .core.serialization import encode_payload, loads
+from .graph.trace import NodeRun
+from .retention import RetentionEngine, attached
+
+logger = structlog.get_logger(__name__)
+
+AuditRow = tuple[str, str, str, str]
+
+
+def encode_cursor(item: dict[str, Any]) -> str:
+    raw = f"{item['started_at'] or ''}|{item['id']}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[str, str]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        started_at, exec_id = raw.split("|", 1)
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError(f"Invalid cursor: {cursor}") from exc
+    return started_at, exec_id
+
+
+class AuditWriter:
+    """Write-behind audit log: rows are queued and flushed in batched transactions.
+
+    In ``sync`` durability mode every row is written and committed before ``write``
+    returns, matching the previous behaviour.
+    """
+
+    def __init__(self, db: Database, config: StorageConfig | None = None) -> None:
+        cfg = config or settings.specter.storage
+        self.db = db
+        self.durability = cfg.audit_durability
+        self.batch_size = max(1, cfg.audit_batch_size)
+        self.flush_interval = cfg.audit_flush_interval
+        self.codec = cfg.payload_codec
+        self._queue: asyncio.Queue[AuditRow] = asyncio.Queue(maxsize=cfg.audit_queue_size)
+        self._task: asyncio.Task[None] | None = None
+
+    async def write(self, exec_id: str, action: str, details: dict[str, Any]) -> None:
+        row = (
+            exec_id,
+            action,
+            encode_payload(details, self.codec),
+            datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+        )
+        if self.durability == "sync":
+            await self._insert([row])
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        await self._queue.put(row)
+
+    async def flush(self) -> None:
+        if self._task is not None and not self._task.done():
+            await self._queue.join()
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        await drain_batches(self._queue, self._flush_batch, self.batch_size, self.flush_interval)
+
+    async def _flush_batch(self, rows: list[AuditRow]) -> None:
+        try:
+            await self._insert(rows)
+        except Exception:  # noqa: BLE001
+            logger.exception("audit_flush_failed", db_path=self.db.db_path, rows=len(rows))
+
+    async def _insert(self, rows: list[AuditRow]) -> None:
+        async with self.db.writer() as db:
+            await db.executemany(
+                """
+                INSERT INTO audit_log (execution_id, action, details, timestamp)
+                VALUES (?, ?, ?, ?)
+                """,
+                rows,
+            )
 
 
 class ExecutionStore:
-    def __init__(self, db_path: str) -> None:
+    def __init__(self, db_path: str, backend: StorageBackend | None = None) -> None:
         self.db_path = db_path
+        self.backend = backend or SQLiteBackend(db_path)
+        self.codec = settings.specter.storage.payload_codec
+        self.db = self.backend.home
+        self._audits: dict[str, AuditWriter] = {}
+        self.retention_engines = [
+            RetentionEngine(db) for db in self.backend.databases() if db.db_path != ":memory:"
+        ]
+
+    async def init(self) -> None:
+        await self.backend.init()
+
+    async def close(self) -> None:
+        for writer in self._audits.values():
+            await writer.close()
+
+    def audit_for(self, exec_id: str) -> AuditWriter:
+        db = self.backend.for_execution(exec_id)
+        if db.db_path not in self._audits:
+            self._audits[db.db_path] = AuditWriter(db)
+        return self._audits[db.db_path]
+
+    async def flush_audit(self) -> None:
+        for writer in self._audits.values():
+            await writer.flush()
+
+    async def run_retention(self, full_vacuum: bool = False) -> dict[str, int]:
+        totals = {"archived": 0, "audit_pruned": 0, "pages_freed": 0}
+        for engine in self.retention_engines:
+            stats = await engine.run()
+            if full_vacuum:
+                stats["pages_freed"] += await engine.compact(full=True)
+            for key, value in stats.items():
+                totals[key] += value
+        return totals
 
     async def create_execution(self, user_id: str, intent: str, graph: dict[str, Any]) -> str:
-        exec_id = f"exec_{int(datetime.utcnow().timestamp() * 1000)}"
+        exec_id = self.backend.new_execution_id(user_id)
         now = datetime.utcnow().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.backend.for_user(user_id).writer() as db:
             await db.execute(
                 """
                 INSERT INTO executions (id, user_id, intent, graph_json, status, started_at)
                 VALUES (?, ?, ?, ?, ?, ?)
                 """,
-                (exec_id, user_id, intent, json.dumps(graph), "running", now),
+                (exec_id, user_id, intent, encode_payload(graph, self.codec), "running", now),
             )
-            await db.commit()
         return exec_id
 
     async def complete_execution(self, exec_id: str, result: dict[str, Any]) -> None:
         now = datetime.utcnow().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.backend.for_execution(exec_id).writer() as db:
             cursor = await db.execute(
                 "SELECT started_at FROM executions WHERE id = ?",
                 (exec_id,),
@@ -43,18 +170,17 @@ class ExecutionStore:
                 SET status = ?, result = ?, completed_at = ?
                 WHERE id = ?
                 """,
-                ("completed", json.dumps(result), now, exec_id),
+                ("completed", encode_payload(result, self.codec), now, exec_id),
             )
             if duration_ms is not None:
                 await db.execute(
                     "UPDATE executions SET duration_ms = ? WHERE id = ?",
                     (duration_ms, exec_id),
                 )
-            await db.commit()
 
     async def fail_execution(self, exec_id: str, error: str) -> None:
         now = datetime.utcnow().isoformat()
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.backend.for_execution(exec_id).writer() as db:
             cursor = await db.execute(
                 "SELECT started_at FROM executions WHERE id = ?",
                 (exec_id,),
@@ -70,77 +196,187 @@ class ExecutionStore:
                 SET status = ?, result = ?, completed_at = ?
                 WHERE id = ?
                 """,
-                ("failed", json.dumps({"error": error}), now, exec_id),
+                ("failed", encode_payload({"error": error}, self.codec), now, exec_id),
             )
             if duration_ms is not None:
                 await db.execute(
                     "UPDATE executions SET duration_ms = ? WHERE id = ?",
                     (duration_ms, exec_id),
                 )
-            await db.commit()
 
     async def set_status(self, exec_id: str, status: str) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.backend.for_execution(exec_id).writer() as db:
             await db.execute(
                 "UPDATE executions SET status = ? WHERE id = ?",
                 (status, exec_id),
             )
-            await db.commit()
 
-    async def get_execution(self, exec_id: str) -> dict[str, Any] | None:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
-                """
-                SELECT id, user_id, intent, graph_json, status, result, started_at, completed_at
-                FROM executions WHERE id = ?
-                """,
-                (exec_id,),
-            )
+    async def get_execution(
+        self, exec_id: str, include_archived: bool = False
+    ) -> dict[str, Any] | None:
+        query = """
+            SELECT id, user_id, intent, graph_json, status, result, started_at, completed_at
+            FROM {table} WHERE id = ?
+        """
+        home = self.backend.for_execution(exec_id)
+        async with home.reader() as db:
+            cursor = await db.execute(query.format(table="executions"), (exec_id,))
             row = await cursor.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "user_id": row[1],
-                "intent": row[2],
-                "graph": json.loads(row[3]),
-                "status": row[4],
-                "result": json.loads(row[5]) if row[5] else None,
-                "started_at": row[6],
-                "completed_at": row[7],
+            engine = next((e for e in self.retention_engines if e.db is home), None)
+            if not row and include_archived and engine is not None:
+                for path in engine.archives_for(exec_id):
+                    async with attached(db, path):
+                        cursor = await db.execute(
+                            query.format(table="archive.executions"), (exec_id,)
+                        )
+                        row = await cursor.fetchone()
+                        await cursor.close()
+                    if row:
+                        break
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "user_id": row[1],
+            "intent": row[2],
+            "graph": loads(row[3]),
+            "status": row[4],
+            "result": loads(row[5]) if row[5] else None,
+            "started_at": row[6],
+            "completed_at": row[7],
+        }
+
+    async def list_executions(
+        self,
+        limit: int = 20,
+        cursor: str | None = None,
+        user_id: str | None = None,
+        status: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        q: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """Newest-first execution history, paginated by an opaque keyset cursor."""
+        clauses: list[str] = []
+        params: list[Any] = []
+        if user_id:
+            clauses.append("user_id = ?")
+            params.append(user_id)
+        if status:
+            clauses.append("status = ?")
+            params.append(status)
+        if since:
+            clauses.append("started_at >= ?")
+            params.append(since)
+        if until:
+            clauses.append("started_at < ?")
+            params.append(until)
+        if q:
+            clauses.append(
+                "rowid IN (SELECT rowid FROM executions_fts WHERE executions_fts MATCH ?)"
+            )
+            params.append(fts_query(q))
+        if cursor:
+            clauses.append("(started_at, id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        query = "SELECT id, user_id, intent, status, started_at, completed_at, duration_ms"
+        query += " FROM executions"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY started_at DESC, id DESC LIMIT ?"
+        params.append(limit)
+        databases = [self.backend.for_user(user_id)] if user_id else self.backend.databases()
+
+        async def fetch(database: Database) -> list[Any]:
+            async with database.reader() as db:
+                return list(await db.execute_fetchall(query, params))
+
+        pages = await asyncio.gather(*(fetch(database) for database in databases))
+        # Each shard page is already sorted, so a k-way merge keeps keyset order.
+        rows = list(
+            islice(heapq.merge(*pages, key=lambda r: (r[4] or "", r[0]), reverse=True), limit)
+        )
+        return [
+            {
+                "id": r[0],
+                "user_id": r[1],
+                "intent": r[2],
+                "status": r[3],
+                "started_at": r[4],
+                "completed_at": r[5],
+                "duration_ms": r[6],
             }
+            for r in rows
+        ]
 
-    async def list_executions(self, limit: int = 20) -> list[dict[str, Any]]:
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute(
+    async def add_node_runs(self, exec_id: str, runs: list[NodeRun]) -> None:
+        if not runs:
+            return
+        async with self.backend.for_execution(exec_id).writer() as db:
+            await db.executemany(
                 """
-                SELECT id, intent, status, started_at, completed_at, duration_ms
-                FROM executions
-                ORDER BY started_at DESC
-                LIMIT ?
+                INSERT INTO node_runs (
+                    execution_id, node_id, node_type, tool_name, attempt, phase, status,
+                    queued_ms, started_ms, ended_ms, error, healing_strategy
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                (limit,),
+                [
+                    (
+                        exec_id,
+                        r.node_id,
+                        r.node_type,
+                        r.tool_name,
+                        r.attempt,
+                        r.phase,
+                        r.status,
+                        r.queued_ms,
+                        r.started_ms,
+                        r.ended_ms,
+                        r.error,
+                        r.healing_strategy,
+                    )
+                    for r in runs
+                ],
             )
-            rows = await cursor.fetchall()
-            return [
-                {
-                    "id": r[0],
-                    "intent": r[1],
-                    "status": r[2],
-                    "started_at": r[3],
-                    "completed_at": r[4],
-                    "duration_ms": r[5],
-                }
-                for r in rows
-            ]
+
+    async def get_node_runs(
+        self, exec_id: str, include_archived: bool = False
+    ) -> list[dict[str, Any]]:
+        query = """
+            SELECT node_id, node_type, tool_name, attempt, phase, status,
+                   queued_ms, started_ms, ended_ms, error, healing_strategy
+            FROM {table} WHERE execution_id = ?
+            ORDER BY started_ms
+        """
+        home = self.backend.for_execution(exec_id)
+        async with home.reader() as db:
+            rows = await db.execute_fetchall(query.format(table="node_runs"), (exec_id,))
+            engine = next((e for e in self.retention_engines if e.db is home), None)
+            if not rows and include_archived and engine is not None:
+                for path in engine.archives_for(exec_id):
+                    async with attached(db, path):
+                        rows = await db.execute_fetchall(
+                            query.format(table="archive.node_runs"), (exec_id,)
+                        )
+                    if rows:
+                        break
+        return [
+            {
+                "node_id": r[0],
+                "node_type": r[1],
+                "tool_name": r[2],
+                "attempt": r[3],
+                "phase": r[4],
+                "status": r[5],
+                "queued_ms": r[6],
+                "started_ms": r[7],
+                "ended_ms": r[8],
+                "error": r[9],
+                "healing_strategy": r[10],
+            }
+            for r in rows
+        ]
 
     async def add_audit(self, exec_id: str, action: str, details: dict[str, Any]) -> None:
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                INSERT INTO audit_log (execution_id, action, details)
-                VALUES (?, ?, ?)
-                """,
-                (exec_id, action, json.dumps(details)),
-            )
-            await db.commit()
+        await self.audit_for(exec_id).write(exec_id, action, details)
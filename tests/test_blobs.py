@@ -0,0 +1,17 @@
+from specter.blobs import BLOB_KEY, BlobStore, is_blob_ref
+
+
+def test_spill_keeps_small_values_inline(tmp_path):
+    blobs = BlobStore(tmp_path, threshold=64)
+    assert blobs.spill({"success": True}) == {"success": True}
+
+
+def test_spill_dedupes_large_values_and_reads_back(tmp_path):
+    blobs = BlobStore(tmp_path, threshold=64)
+    value = {"success": True, "data": "x" * 1000}
+    first = blobs.spill(value)
+    second = blobs.spill(dict(value))
+    assert is_blob_ref(first)
+    assert first[BLOB_KEY] == second[BLOB_KEY]
+    assert len(list(tmp_path.rglob("*"))) == 2  # one shard directory, one blob
+    assert blobs.load(first) == value
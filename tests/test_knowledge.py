@@ -0,0 +1,763 @@
+import asyncio
+import os
+import shutil
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic import ValidationError
+
+from specter import agent, main
+from specter.agent import build_agent_runtime
+from specter.config import KnowledgeConfig, settings
+from specter.core.database import Database, close_databases
+from specter.knowledge.documents import chunk_text
+from specter.knowledge.embeddings import HashingEmbedder
+from specter.knowledge.extraction import Scan
+from specter.knowledge.graph import _UPSERT_EDGE, KnowledgeGraph
+from specter.skills.builtin.memory import memory_tools
+
+
+@pytest.fixture
+async def kg(tmp_path, monkeypatch):
+    # No LLM routes: entity extraction and summaries use the local fallbacks.
+    monkeypatch.setitem(settings.specter.llm, "router", [])
+    kg = KnowledgeGraph(str(tmp_path / "specter.db"))
+    await kg.init()
+    yield kg
+    await close_databases()
+
+
+async def resolve(kg, db, ent_type, name, now="2026-01-01T00:00:00"):
+    """One entity through the batch resolver add_facts uses; returns ``(id, created)``."""
+    ids, created = await kg._resolve_entities(db, [(ent_type, name)], {}, now)
+    return ids[ent_type, name], (ent_type, name) in created
+
+
+async def test_fulltext_query_ranks_and_tracks_writes(kg):
+    first = await kg.add_fact("Deploy the billing service to production")
+    await kg.add_fact("Lunch with the billing team on Friday")
+    results = await kg.query("billing prod")
+    assert [r["id"] for r in results] == [first]
+    assert "[production]" in results[0]["snippet"]
+
+    async with kg.db.writer() as db:
+        await db.execute("DELETE FROM entities WHERE id = ?", (first,))
+    assert await kg.query("production") == []
+    assert await kg.query("   ") == []
+
+
+async def test_entity_lookup_uses_name_prefix(kg):
+    await kg.add_fact("Contact Margaret about the Zephyr rollout")
+    async with kg.db.writer() as db:
+        for name in ("Zephyr", "Margaret"):
+            await resolve(kg, db, "proper_noun", name, "2026-01-01T00:00:00")
+    names = [e["name"] for e in await kg.query_entities("Zeph")]
+    # The short entity name outranks the fact whose text also mentions it.
+    assert names == ["Zephyr", "Contact Margaret about the Zephyr rollout"]
+    listed = await kg.list_entities(search="marg", ent_type="proper_noun")
+    assert [e["name"] for e in listed] == ["Margaret"]
+
+
+async def test_semantic_search_uses_vector_cache(kg):
+    pytest.importorskip("numpy")
+    fact = await kg.add_fact("The staging database runs out of disk every Monday")
+    await kg.add_fact("Invoices are sent on the first of the month")
+    results = await kg.semantic_search("staging disk space", limit=1)
+    assert [r["id"] for r in results] == [fact]
+    assert kg.vectors.cached
+
+    # Facts added after the cache is loaded are appended in place.
+    late = await kg.add_fact("Rotate the staging disk encryption keys")
+    hits = await kg.semantic_search("staging disk", limit=2, ent_type="fact")
+    assert {r["id"] for r in hits} == {fact, late}
+
+    # Rows without vectors are picked up by a backfill.
+    async with kg.db.writer() as db:
+        await db.execute("UPDATE entities SET vector = NULL")
+    # The three facts and the "Monday" entity.
+    assert await kg.backfill_vectors(batch_size=1) == 4
+    kg.vectors.capacity = 1  # force the chunked scan path
+    kg.vectors.invalidate()
+    results = await kg.semantic_search("invoices month", limit=1)
+    assert results[0]["name"].startswith("Invoices")
+    assert not kg.vectors.cached
+
+
+async def test_hashing_embedder_keeps_the_event_loop_responsive():
+    embedder = HashingEmbedder(64)
+    ticks = 0
+
+    async def ticker() -> None:
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = ticks
+    vectors = await embedder.embed([f"statement number {i} about deploys" for i in range(20000)])
+    task.cancel()
+    assert len(vectors) == 20000 and vectors[0] == embedder.embed_one(
+        "statement number 0 about deploys"
+    )
+    # Other coroutines kept running while the batch was hashed.
+    assert ticks - start > 10
+
+
+def test_ivf_index_recall_updates_and_persistence(tmp_path):
+    np = pytest.importorskip("numpy")
+    from specter.knowledge.ann import IVFIndex
+    from specter.knowledge.embeddings import pack_vector
+
+    rng = np.random.default_rng(7)
+    centres = rng.normal(size=(20, 32))
+    vectors = (centres[rng.integers(0, 20, 2000)] + 0.3 * rng.normal(size=(2000, 32))).astype(
+        np.float32
+    )
+    ids = [f"e{i}" for i in range(len(vectors))]
+    index = IVFIndex.build(32, ids, ["fact"] * len(ids), vectors)
+
+    queries = vectors[:50]
+    normed = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    truth = np.argsort(-(queries @ normed.T), axis=1)[:, :10]
+    found = index.search(queries, 10, nprobe=8)
+    recall = np.mean(
+        [
+            len({ids[j] for j in row} & {h[0] for h in hits}) / 10
+            for row, hits in zip(truth, found, strict=True)
+        ]
+    )
+    assert recall >= 0.9
+
+    index.add([("new", "person", pack_vector(vectors[0] * 2))])
+    index.remove(["e0"])
+    assert [h[0] for h in index.search(vectors[:1], 1, nprobe=1)[0]] == ["new"]
+    assert index.search(vectors[:1], 5, nprobe=8, ent_type="person")[0][0][0] == "new"
+
+    path = tmp_path / "index.ann.npz"
+    index.save(path, "hashing")
+    loaded, embedder = IVFIndex.load(path)
+    assert embedder == "hashing"
+    assert (loaded.live, loaded.built, loaded.stale_ratio) == (
+        index.live,
+        index.built,
+        index.stale_ratio,
+    )
+    assert loaded.search(vectors[:1], 1, nprobe=1) == index.search(vectors[:1], 1, nprobe=1)
+
+
+async def test_ann_index_follows_writes_and_expiry(kg, monkeypatch):
+    pytest.importorskip("numpy")
+    monkeypatch.setattr(kg.ann.config, "ann_min_entities", 1)
+    old = await kg.add_fact("Rotate the production TLS certificates")
+    assert await kg.ann.maintain()
+    assert kg.ann.active
+    new = await kg.add_fact("Renew the staging TLS certificates")
+    assert kg.ann.index.size - kg.ann.index.built == 1
+
+    async with kg.db.writer() as db:
+        await db.execute("UPDATE entities SET expires_at = '2000-01-01' WHERE id = ?", (old,))
+    await kg.cleanup_expired()
+    assert [r["id"] for r in await kg.semantic_search("TLS certificates", limit=5)] == [new]
+
+    await kg.close()
+    reloaded = KnowledgeGraph(kg.db_path, db=kg.db)
+    await reloaded.ann.load()
+    assert reloaded.ann.index.live == 1
+
+    # Deleted after the index was saved: dropped when the file is loaded again.
+    async with kg.db.writer() as db:
+        await db.execute("DELETE FROM entities WHERE id = ?", (new,))
+    reloaded = KnowledgeGraph(kg.db_path, db=kg.db)
+    await reloaded.ann.load()
+    assert reloaded.ann.index.live == 0
+
+
+async def test_hybrid_retrieval_fuses_generators(kg):
+    pytest.importorskip("numpy")
+    fact = await kg.add_fact("Quarterly planning is owned by the platform group")
+    other = await kg.add_fact("Snacks arrive on Thursdays")
+    async with kg.db.writer() as db:
+        person, _ = await resolve(kg, db, "person", "Priya", "2026-01-01T00:00:00")
+        await db.execute(
+            "INSERT INTO relationships (id, source_id, target_id, relation_type, strength) "
+            "VALUES ('r1', ?, ?, 'mentioned_in', 1.0)",
+            (person, other),
+        )
+
+    result = await kg.retrieve("quarterly planning", limit=3)
+    assert result["partial"] == []
+    top = result["results"][0]
+    assert top["id"] == fact
+    assert set(top["sources"]) == {"keyword", "vector"}
+    assert "[Quarterly]" in top["snippet"]
+
+    # Relationship expansion surfaces the fact linked to a matching entity name.
+    result = await kg.retrieve("Priya", limit=5)
+    by_id = {r["id"]: r for r in result["results"]}
+    assert by_id[other]["sources"]["graph"] == 1
+    cached = len(kg.neighbours)
+    await kg.retrieve("Priya", limit=5)
+    assert len(kg.neighbours) == cached
+
+    result = await kg.retrieve("quarterly planning", budget_ms=0)
+    assert sorted(result["partial"]) == ["graph", "keyword", "vector"]
+    assert result["results"] == []
+
+
+async def test_relations_fetched_per_page_with_cap(kg):
+    async with kg.db.writer() as db:
+        now = "2026-01-01T00:00:00"
+        team, _ = await resolve(kg, db, "org", "Platform", now)
+        for i in range(4):
+            member, _ = await resolve(kg, db, "person", f"Member{i}", now)
+            await db.execute(
+                "INSERT INTO relationships (id, source_id, target_id, relation_type, strength) "
+                "VALUES (?, ?, ?, 'has_member', ?)",
+                (f"r{i}", team, member, i / 10),
+            )
+
+    statements: list[str] = []
+    conns = [kg.db._writer, *kg.db._reader_conns]
+    for conn in conns:
+        await conn.set_trace_callback(statements.append)
+    entities = await kg.list_entities(include_relations=True, relation_limit=2, relation_names=True)
+    for conn in conns:
+        await conn.set_trace_callback(None)
+    assert sum("FROM relationships" in sql for sql in statements) == 1
+
+    platform = next(e for e in entities if e["name"] == "Platform")
+    assert [r["target_name"] for r in platform["relations"]] == ["Member3", "Member2"]
+    [match] = await kg.query_entities("Platf", relation_limit=1)
+    assert match["relations"] == [
+        {"type": "has_member", "target_id": platform["relations"][0]["target_id"]}
+    ]
+
+
+async def test_add_facts_batches_extraction_and_resolves_entities(kg, monkeypatch):
+    def extract(text):
+        return [{"type": "person", "name": w} for w in text.split() if w.istitle()]
+
+    monkeypatch.setattr(kg.extractor, "scan", lambda text: Scan(extract(text)))
+    async with kg.db.writer() as db:
+        existing, _ = await resolve(kg, db, "person", "Ada", "2026-01-01T00:00:00")
+
+    ids = await kg.add_facts(["Ada met Grace", "Grace paged Ada", "no entities here"])
+    assert len(ids) == len(set(ids)) == 3
+    async with kg.db.reader() as db:
+        people = await db.execute_fetchall(
+            "SELECT name, id FROM entities WHERE type = 'person' ORDER BY name"
+        )
+        links = await db.execute_fetchall(
+            "SELECT COUNT(*), COUNT(DISTINCT source_id) FROM relationships"
+        )
+    assert [p[0] for p in people] == ["Ada", "Grace"]
+    assert dict(people)["Ada"] == existing
+    assert links == [(4, 2)]
+    assert [r["id"] for r in await kg.query("paged")] == [ids[1]]
+
+
+async def test_ingest_queue_coalesces_and_drains(kg, monkeypatch):
+    calls: list[list[str]] = []
+    add_facts = kg.add_facts
+
+    async def recording(statements, confidence=1.0):
+        calls.append(list(statements))
+        return await add_facts(statements, confidence)
+
+    monkeypatch.setattr(kg.ingest, "_add_facts", recording)
+    for text in ["deploy at noon", "deploy at noon", "rollback plan ready", "   "]:
+        await kg.ingest.submit(text, confidence=0.6)
+    await kg.ingest.flush()
+    assert calls == [["deploy at noon", "rollback plan ready"]]
+    assert kg.ingest.stats() == {"pending": 0, "stored": 2, "failed": 0}
+
+    await kg.ingest.submit("late fact")
+    await kg.close()
+    assert [r["name"] for r in await kg.query("late")] == ["late fact"]
+
+
+async def test_entities_unique_by_type_and_name_with_id_cache(kg, monkeypatch):
+    monkeypatch.setattr(
+        kg.extractor, "scan", lambda text: Scan([{"type": "person", "name": text.split()[0]}])
+    )
+    await kg.add_facts(["Ada wrote notes"])
+    await kg.add_facts(["Ada reviewed notes"])
+    assert kg.entity_ids.hits >= 1
+    lookup = kg._lookup_entities
+    lookups = 0
+
+    async def stale_once(db, pairs):
+        # The first lookup misses, as if another writer stored Ada just after it.
+        nonlocal lookups
+        lookups += 1
+        return {} if lookups == 1 else await lookup(db, pairs)
+
+    monkeypatch.setattr(kg, "_lookup_entities", stale_once)
+    kg.entity_ids.discard([("person", "Ada")])
+    async with kg.db.writer() as db:
+        ada, created = await resolve(kg, db, "person", "Ada", "2026-01-01")
+        assert not created and lookups == 2
+        kg.entity_ids.put(("person", "Ada"), ada)  # as add_facts does after commit
+        with pytest.raises(sqlite3.IntegrityError):
+            await db.execute(
+                "INSERT INTO entities (id, type, name) VALUES ('dup', 'person', 'Ada')"
+            )
+        await db.execute("UPDATE entities SET expires_at = '2000-01-01' WHERE id = ?", (ada,))
+    assert kg.entity_ids.get(("person", "Ada")) == ada
+    await kg.cleanup_expired()
+    assert kg.entity_ids.get(("person", "Ada")) is None
+    await kg.add_facts(["Ada returned"])
+    async with kg.db.reader() as db:
+        rows = await db.execute_fetchall("SELECT id FROM entities WHERE type = 'person'")
+    assert len(rows) == 1 and rows[0][0] != ada
+
+
+async def test_summaries_fold_new_facts_and_roll_up(kg, monkeypatch):
+    monkeypatch.setattr(settings.specter.knowledge, "summary_window", 4)
+    for batch, day in enumerate(("2026-03-02", "2026-03-02", "2026-03-03")):
+        ids = await kg.add_facts([f"{day} note {i}" for i in range(3)])
+        async with kg.db.writer() as db:
+            await db.executemany(
+                "UPDATE entities SET created_at = ? WHERE id = ?",
+                [(f"{day}T{batch}{i}:00:00", fact_id) for i, fact_id in enumerate(ids)],
+            )
+        await kg.summarize_recent(limit=3)
+    windows = await kg.list_summaries(limit=10, level="window")
+    assert [w["source_count"] for w in windows] == [3, 3, 3]
+    days = await kg.list_summaries(level="day")
+    assert sorted((d["period_start"], d["source_count"]) for d in days) == [
+        ("2026-03-02", 6),
+        ("2026-03-03", 3),
+    ]
+    (week,) = await kg.list_summaries(level="week")
+    assert (week["period_start"], week["source_count"]) == ("2026-03-02", 6)
+
+    # Expired facts do not leave the counter stuck above the window.
+    await kg.add_facts(["pending one", "pending two"])
+    async with kg.db.writer() as db:
+        await db.execute("UPDATE entities SET expires_at = '2000-01-01' WHERE type = 'fact'")
+    await kg.cleanup_expired()
+    assert await kg.summarize_recent() == {"summary": "", "source_count": 0}
+    await kg.add_facts(["one", "two", "three"])
+    assert len(await kg.list_summaries(limit=10, level="window")) == 3
+    await kg.add_facts(["four"])
+    latest = (await kg.list_summaries(limit=1, level="window"))[0]
+    assert sorted(latest["summary"].split(" | ")) == ["four", "one", "three", "two"]
+
+
+async def test_ttl_sweep_deletes_in_batches_with_relationships(kg, monkeypatch):
+    monkeypatch.setattr(kg.extractor, "scan", lambda text: Scan([{"type": "topic", "name": text}]))
+    ids = await kg.add_facts([f"topic {i}" for i in range(5)])
+    async with kg.db.writer() as db:
+        await db.execute(
+            "UPDATE entities SET expires_at = '2000-01-01' WHERE id IN (?, ?, ?)", ids[:3]
+        )
+        plan = await db.execute_fetchall(
+            "EXPLAIN QUERY PLAN SELECT id FROM entities "
+            "WHERE expires_at IS NOT NULL AND expires_at < '2001-01-01'"
+        )
+    assert "idx_entities_expires" in str(plan)
+
+    # KnowledgeGraph.init does not sweep; the runtime's background task and
+    # /knowledge/cleanup do.
+    await kg.init()
+    async with kg.db.reader() as db:
+        assert (await db.execute_fetchall("SELECT COUNT(*) FROM entities"))[0][0] == 10
+
+    stats = await kg.cleanup_expired(batch_size=2)
+    assert stats == {"entities": 3, "relationships": 3, "batches": 2}
+    assert kg.reclaimed == {"entities": 3, "relationships": 3}
+    async with kg.db.reader() as db:
+        left = await db.execute_fetchall(
+            "SELECT COUNT(*) FROM relationships WHERE target_id IN (?, ?)", ids[3:]
+        )
+    assert left == [(2,)]
+    assert await kg.cleanup_expired() == {"entities": 0, "relationships": 0, "batches": 0}
+
+
+def test_facts_endpoint_caps_statements(kg, monkeypatch):
+    agent = SimpleNamespace(kg=kg, init=kg.init)
+    monkeypatch.setattr(main, "get_agent", lambda user_id: agent)
+    client = TestClient(main.app)
+    limit = main.MAX_FACTS_PER_REQUEST
+    statements = [f"fact {i}" for i in range(limit + 1)]
+    resp = client.post(
+        "/knowledge/facts", params={"user_id": "u1"}, json={"statements": statements}
+    )
+    assert resp.status_code == 422
+    resp = client.post(
+        "/knowledge/facts", params={"user_id": "u1"}, json={"statements": statements[:limit]}
+    )
+    assert resp.status_code == 200 and resp.json()["count"] == limit
+
+
+async def test_runtime_init_starts_background_sweep_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.specter, "data_dir", str(tmp_path))
+    monkeypatch.setattr(settings.specter.knowledge, "ttl_sweep_interval_seconds", 3600)
+    monkeypatch.setattr(settings.specter.knowledge, "ann_enabled", False)
+    monkeypatch.setattr(settings.specter.retention, "enabled", True)
+    first = build_agent_runtime(settings.specter, "ops")
+    second = build_agent_runtime(settings.specter, "ops")
+    await first.init()
+    await second.init()
+    # Runtimes built on demand sweep too; one loop per job and database.
+    path = first.kg.db.db_path
+    assert sorted(agent._background) == [f"retention:{path}", f"ttl:{path}"]
+    assert len(first.tasks) == 2 and second.tasks == []
+    tasks = list(first.tasks)
+    await first.close()
+    assert all(task.cancelled() for task in tasks) and not agent._background
+    await second.close()
+    await close_databases()
+
+
+async def test_traversal_neighbourhood_and_shortest_path(kg):
+    # a -> b -> c -> d, a -> e (weak), b -> f (other type)
+    async with kg.db.writer() as db:
+        ids = {}
+        for name in "abcdef":
+            ids[name], _ = await resolve(kg, db, "node", f"Node {name}", "2026-01-01")
+        await db.executemany(
+            "INSERT INTO relationships (id, source_id, target_id, relation_type, strength) "
+            "VALUES (?, ?, ?, ?, ?)",
+            [
+                (f"r{i}", ids[src], ids[dst], rel, strength)
+                for i, (src, dst, rel, strength) in enumerate(
+                    [
+                        ("a", "b", "knows", 1.0),
+                        ("b", "c", "knows", 0.9),
+                        ("c", "d", "knows", 0.8),
+                        ("a", "e", "knows", 0.1),
+                        ("b", "f", "owns", 1.0),
+                    ]
+                )
+            ],
+        )
+
+    result = await kg.neighbourhood("node a", depth=2)
+    depths = {node["name"]: node["depth"] for node in result["nodes"]}
+    assert depths == {"Node a": 0, "Node b": 1, "Node e": 1, "Node c": 2, "Node f": 2}
+    filtered = await kg.neighbourhood(ids["a"], depth=3, relation_types=["knows"], min_strength=0.5)
+    assert {n["name"] for n in filtered["nodes"]} == {"Node a", "Node b", "Node c", "Node d"}
+    capped = await kg.neighbourhood(ids["b"], depth=1, fan_out=1)
+    assert len(capped["edges"]) == 1
+    assert (await kg.neighbourhood(ids["b"], depth=1, direction="out"))["edges"] == [
+        {"source_id": ids["b"], "target_id": ids[x], "relation_type": r, "strength": 1.0 - d}
+        for x, r, d in (("f", "owns", 0.0), ("c", "knows", 0.1))
+    ]
+    assert await kg.neighbourhood("missing") is None
+
+    path = await kg.shortest_path("Node e", "Node d")
+    assert path["hops"] == 4
+    assert [n["name"] for n in path["path"]] == ["Node e", "Node a", "Node b", "Node c", "Node d"]
+    assert (await kg.shortest_path(ids["e"], ids["d"], max_depth=3))["path"] == []
+    assert (await kg.shortest_path(ids["d"], ids["a"], direction="out"))["hops"] is None
+    assert (await kg.shortest_path(ids["a"], ids["d"], direction="out"))["hops"] == 3
+    with pytest.raises(ValueError):
+        await kg.shortest_path(ids["a"], ids["d"], direction="sideways")
+
+    tools = memory_tools(kg)
+    found = await tools["memory_path"]("Node a", "Node f")
+    assert found["success"] and [n["name"] for n in found["data"]["path"]][-1] == "Node f"
+    assert not (await tools["memory_neighbourhood"]("nobody"))["success"]
+
+
+async def test_access_tracking_and_cold_tier(kg, monkeypatch):
+    ids = await kg.add_facts(["alpha report", "beta report", "gamma report"])
+    async with kg.db.writer() as db:
+        await db.execute("UPDATE entities SET created_at = '2026-01-01'")
+        person, _ = await resolve(kg, db, "person", "Reporter", "2026-01-01")
+        await db.execute(
+            "INSERT INTO relationships (id, source_id, target_id, relation_type, strength) "
+            "VALUES ('r1', ?, ?, 'wrote', 1.0)",
+            (person, ids[1]),
+        )
+    for _ in range(3):
+        await kg.query("alpha")
+    await kg.query("beta")
+    assert kg.access.pending == 2
+    assert await kg.access.flush() == 2
+    async with kg.db.reader() as db:
+        counts = dict(await db.execute_fetchall("SELECT id, access_count FROM entities"))
+    assert (counts[ids[0]], counts[ids[1]], counts[ids[2]]) == (3, 1, 0)
+
+    stats = await kg.tier_cold(now=datetime(2026, 1, 10))
+    assert stats == {"entities": 0, "relationships": 0}
+    stats = await kg.tier_cold(now=datetime(2026, 3, 1))
+    # alpha is hot and beta was read recently; the unread fact and person go cold,
+    # taking the person's edge with them.
+    assert stats == {"entities": 2, "relationships": 1}
+    assert {r["id"] for r in await kg.query("report")} == set(ids[:2])
+    cold = sqlite3.connect(kg.cold.path)
+    assert cold.execute("SELECT COUNT(*) FROM entities").fetchone() == (2,)
+    assert cold.execute("SELECT source_id FROM relationships").fetchall() == [(person,)]
+    cold.close()
+
+    monkeypatch.setattr(settings.specter.knowledge, "tier_max_entities", 2)
+    monkeypatch.setattr(settings.specter.knowledge, "tier_cold_action", "prune")
+    await kg.add_facts(["delta", "epsilon", "zeta"])
+    stats = await kg.tier_cold()
+    assert stats["entities"] == 3
+    async with kg.db.reader() as db:
+        left = await db.execute_fetchall("SELECT id FROM entities ORDER BY access_count DESC")
+    assert len(left) == 2 and left[0][0] == ids[0]
+
+    monkeypatch.setattr(settings.specter.knowledge, "graph_pruning", False)
+    await kg.add_facts(["eta"])
+    assert (await kg.tier_cold())["entities"] == 0
+
+
+async def test_cold_tier_decays_reads_and_enforces_budget_on_hot_entities(kg, monkeypatch):
+    ids = await kg.add_facts([f"runbook {name}" for name in ("one", "two", "three", "four")])
+    for reads, ent_id in enumerate(ids, start=3):
+        kg.access.record([ent_id] * reads)
+    await kg.access.flush()
+    # Every entity is hot, yet the budget still evicts the least read.
+    monkeypatch.setattr(settings.specter.knowledge, "tier_max_entities", 2)
+    monkeypatch.setattr(settings.specter.knowledge, "tier_cold_action", "prune")
+    assert (await kg.tier_cold())["entities"] == 2
+    async with kg.db.reader() as db:
+        left = await db.execute_fetchall("SELECT id FROM entities ORDER BY access_count")
+    assert [row[0] for row in left] == ids[2:]
+
+    # Reads decay: months without one, the most read entity goes cold too.
+    monkeypatch.setattr(settings.specter.knowledge, "tier_max_entities", 0)
+    assert (await kg.tier_cold(now=datetime.utcnow() + timedelta(days=20)))["entities"] == 0
+    assert (await kg.tier_cold(now=datetime.utcnow() + timedelta(days=120)))["entities"] == 2
+
+
+async def test_access_migration_gives_existing_entities_a_grace_period(tmp_path):
+    migrations = tmp_path / "migrations"
+    migrations.mkdir()
+    for path in sorted(Path("migrations").glob("*.sql")):
+        if path.name < "010":
+            shutil.copy(path, migrations)
+    db = Database(str(tmp_path / "access.db"))
+    await db.migrate(migrations)
+    async with db.writer() as conn:
+        await conn.execute(
+            "INSERT INTO entities (id, type, name, created_at) "
+            "VALUES ('e1', 'person', 'Old', '2020-01-01')"
+        )
+    shutil.copy("migrations/010_entity_access.sql", migrations)
+    await db.migrate(migrations)
+    async with db.reader() as conn:
+        rows = await conn.execute_fetchall("SELECT last_accessed_at FROM entities")
+    assert rows[0][0] >= datetime.utcnow().date().isoformat()
+    await db.close()
+    with pytest.raises(ValidationError):
+        KnowledgeConfig(tier_cold_action="purge")
+
+
+async def test_relationship_edges_aggregate(tmp_path):
+    migrations = tmp_path / "migrations"
+    migrations.mkdir()
+    for path in sorted(Path("migrations").glob("*.sql")):
+        if path.name < "011":
+            shutil.copy(path, migrations)
+    db = Database(str(tmp_path / "edges.db"))
+    await db.migrate(migrations)
+    async with db.writer() as conn:
+        await conn.executemany(
+            "INSERT INTO relationships "
+            "(id, source_id, target_id, relation_type, strength, context, created_at) "
+            "VALUES (?, 'e1', 'f1', 'mentioned_in', ?, '{\"statement\": \"x\"}', ?)",
+            [(f"r{i}", 0.5, f"2026-01-0{i + 1}") for i in range(3)],
+        )
+    shutil.copy("migrations/011_relationship_edges.sql", migrations)
+    await db.migrate(migrations)
+    async with db.writer() as conn:
+        rows = await conn.execute_fetchall(
+            "SELECT id, mentions, strength, context, last_seen_at FROM relationships"
+        )
+        assert rows == [("r0", 3, 1.5, None, "2026-01-03")]
+        # A repeat 30 days later: 1.5 halves, then the new confidence is added.
+        await conn.execute(
+            _UPSERT_EDGE, ("r9", "e1", "f1", "mentioned_in", 1.0, "x", "2026-02-02", 30.0)
+        )
+        rows = await conn.execute_fetchall("SELECT id, mentions, strength FROM relationships")
+    assert rows == [("r0", 4, pytest.approx(1.75))]
+    await db.close()
+
+
+async def test_repeated_facts_are_deduplicated_by_content_hash(kg, monkeypatch):
+    calls: list[str] = []
+
+    def extract(text):
+        calls.append(text)
+        return [{"type": "topic", "name": "status"}]
+
+    monkeypatch.setattr(kg.extractor, "scan", lambda text: Scan(extract(text)))
+    first = await kg.add_fact("Status check: all green")
+    async with kg.db.writer() as db:
+        await db.execute("UPDATE entities SET expires_at = '2001-01-01' WHERE id = ?", (first,))
+    ids = await kg.add_facts(["status check:  ALL green", "new fact", "New  fact"])
+    assert ids[0] == first and ids[1] == ids[2] != first
+    assert calls == ["Status check: all green", "new fact"]
+    async with kg.db.reader() as db:
+        facts = await db.execute_fetchall(
+            "SELECT id, access_count, expires_at FROM entities WHERE type = 'fact'"
+        )
+        edges = await db.execute_fetchall("SELECT COUNT(*) FROM relationships")
+    by_id = {row[0]: row[1:] for row in facts}
+    assert len(by_id) == 2
+    assert by_id[first][0] == 1 and by_id[first][1] > "2001-01-01"
+    assert by_id[ids[1]][0] == 1
+    assert edges == [(2,)]
+
+    async with kg.db.writer() as db:
+        await db.execute("UPDATE entities SET content_hash = NULL")
+    assert await kg.backfill_fact_hashes() == 2
+    assert await kg.add_fact("new FACT") == ids[1]
+
+
+async def test_gazetteer_skips_llm_for_known_entities(kg, monkeypatch):
+    prompts: list[str] = []
+
+    class Router:
+        routes = [{"local": True}]
+
+        async def generate(self, prompt):
+            prompts.append(prompt)
+            return '{"1": [{"type": "person", "name": "Ada Lovelace"}]}'
+
+    monkeypatch.setattr("specter.knowledge.graph.LLMRouter", Router)
+    await kg.add_fact("Ada Lovelace wrote to ops@example.com about https://x.io/a")
+    assert len(prompts) == 1
+    await kg.add_facts(["Paged ada lovelace at 3.5 hours", "Deploys are green"])
+    assert len(prompts) == 1
+    assert kg.extraction == {"local": 2, "llm": 1}
+    async with kg.db.reader() as db:
+        rows = await db.execute_fetchall(
+            "SELECT e.type, e.name, COUNT(*) FROM relationships r "
+            "JOIN entities e ON e.id = r.source_id GROUP BY e.id ORDER BY e.name"
+        )
+    assert rows == [
+        ("number", "3.5", 1),
+        ("person", "Ada Lovelace", 2),
+        ("url", "https://x.io/a", 1),
+        ("email", "ops@example.com", 1),
+    ]
+
+
+async def test_documents_are_indexed_incrementally(kg, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings.specter, "data_dir", str(tmp_path / "data"))
+    monkeypatch.setattr(settings.specter.knowledge, "documents_chunk_chars", 40)
+    assert chunk_text("one two three\n\nfour\n\n" + "x" * 50, 20) == [
+        "one two three\n\nfour",
+        "x" * 20,
+        "x" * 20,
+        "x" * 10,
+    ]
+    docs = tmp_path / "runbooks"
+    (docs / ".drafts").mkdir(parents=True)
+    (docs / "db.md").write_text("Restart the primary.\n\nThen check replication lag.")
+    (docs / "cache.txt").write_text("Flush the cache after deploys.")
+    (docs / "tool.py").write_text("print('not a document')")
+    (docs / ".drafts" / "wip.md").write_text("Unfinished notes.")
+
+    first = await kg.documents.run("runbooks")
+    assert (first["files"], first["indexed"], first["chunks"]) == (2, 2, 3)
+    assert not first["running"] and first["files_per_s"] > 0
+    again = await kg.documents.run("runbooks")
+    assert (again["indexed"], again["unchanged"], again["chunks"]) == (0, 2, 0)
+
+    (docs / "db.md").write_text("Restart the primary.\n\nThen page the on-call DBA.")
+    os.utime(docs / "cache.txt", ns=(1, 1))
+    (docs / "old.md").write_text("Retired.")
+    await kg.documents.run(".")
+    (docs / "old.md").unlink()
+    stats = await kg.documents.run(".")
+    assert (stats["indexed"], stats["unchanged"], stats["removed"]) == (0, 2, 1)
+    async with kg.db.reader() as db:
+        rows = await db.execute_fetchall("SELECT path, chunks FROM documents ORDER BY path")
+        facts = await db.execute_fetchall("SELECT COUNT(*) FROM entities WHERE type = 'fact'")
+    assert rows == [("runbooks/cache.txt", 1), ("runbooks/db.md", 2)]
+    # Three original chunks, the new second paragraph and old.md.
+    assert facts == [(5,)]
+    await kg.tier_cold(now=datetime(2100, 1, 1))
+    async with kg.db.reader() as db:
+        chunks = await db.execute_fetchall(
+            "SELECT json_extract(attributes, '$.source'), expires_at IS NULL FROM entities "
+            "WHERE type = 'fact' ORDER BY 1"
+        )
+        plan = await db.execute_fetchall(
+            "EXPLAIN QUERY PLAN SELECT id FROM entities "
+            "WHERE json_extract(attributes, '$.source') IN (SELECT value FROM json_each(?))",
+            ("[]",),
+        )
+    # Chunks of live files survive tiering; replaced and deleted ones carry the fact TTL.
+    assert chunks == [("runbooks/cache.txt", 1), ("runbooks/db.md", 1), ("runbooks/db.md", 1)]
+    assert any("idx_entities_source" in row[-1] for row in plan)
+
+    # A file emptied of chunks still gives up the ones it had.
+    (docs / "db.md").write_text("\n\n   \n")
+    stats = await kg.documents.run("runbooks")
+    assert (stats["indexed"], stats["chunks"]) == (1, 0)
+    async with kg.db.reader() as db:
+        pinned = await db.execute_fetchall(
+            "SELECT json_extract(attributes, '$.source') FROM entities "
+            "WHERE json_extract(attributes, '$.source') IS NOT NULL"
+        )
+        row = await db.execute_fetchall("SELECT chunks FROM documents WHERE path LIKE '%db.md'")
+    assert pinned == [("runbooks/cache.txt",)] and row == [(0,)]
+    with pytest.raises(ValueError):
+        kg.documents.start("../elsewhere")
+
+
+async def test_bundle_export_import_round_trip(kg, tmp_path):
+    await kg.add_facts(
+        [
+            "Deploy owner is Alice Smith",
+            "Paged Bob Jones about disk alerts",
+            "Billing reviews go to Bob Jones",
+        ]
+    )
+    await kg.summarize_recent()
+    manifest = await kg.export_bundle(tmp_path / "bundle")
+    counts = manifest["counts"]
+    lines = (tmp_path / "bundle" / "entities.ndjson").read_text().splitlines()
+    assert len(lines) == counts["entities"] == 5 and counts["summaries"] >= 1
+    vectors = (tmp_path / "bundle" / "vectors.f32").stat().st_size
+    assert vectors == counts["vectors"] * kg.embedder.dim * 4
+
+    other = KnowledgeGraph(str(tmp_path / "other.db"))
+    await other.init()
+    async with other.db.writer() as db:
+        bob, _ = await resolve(other, db, "proper_noun", "Bob Jones", "2026-01-01")
+        indexes = await db.execute_fetchall("SELECT name FROM sqlite_master ORDER BY name")
+    stats = await other.import_bundle(tmp_path / "bundle")
+    assert stats["deferred_indexes"] and stats["vectors_compatible"]
+    assert (stats["entities"], stats["remapped"], stats["skipped"]) == (4, 1, 0)
+    assert (stats["relationships"], stats["summaries"]) == (
+        counts["relationships"],
+        counts["summaries"],
+    )
+    assert [r["name"] for r in await other.query("disk alerts")] == [
+        "Paged Bob Jones about disk alerts"
+    ]
+    async with other.db.reader() as db:
+        assert await db.execute_fetchall("SELECT name FROM sqlite_master ORDER BY name") == indexes
+        assert await db.execute_fetchall("SELECT COUNT(*) FROM deferred_schema") == [(0,)]
+        edges = await db.execute_fetchall(
+            "SELECT COUNT(*) FROM relationships WHERE source_id = ?", (bob,)
+        )
+        pending = await db.execute_fetchall("SELECT facts_added - facts_folded FROM summary_state")
+        copied = await db.execute_fetchall(
+            "SELECT id, vector FROM entities WHERE type = 'fact' ORDER BY id"
+        )
+    async with kg.db.reader() as db:
+        original = await db.execute_fetchall(
+            "SELECT id, vector FROM entities WHERE type = 'fact' ORDER BY id"
+        )
+    assert edges == [(2,)] and pending == [(0,)]
+    assert copied == original
+
+    again = await other.import_bundle(tmp_path / "bundle", defer_indexes=False)
+    assert (again["entities"], again["relationships"], again["summaries"]) == (0, 0, 0)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+
+import pytest
+
+from specter.config import RetentionConfig
+from specter.core.backends import MemoryBackend, ShardedSQLiteBackend
+from specter.core.database import close_databases
+from specter.core.serialization import dumps, encode_payload, loads
+from specter.graph.trace import NodeRun
+from specter.knowledge.graph import KnowledgeGraph
+from specter.retention import RetentionEngine
+from specter.storage import ExecutionStore, encode_cursor
+
+
+@pytest.fixture
+async def store(tmp_path):
+    db_path = str(tmp_path / "specter.db")
+    await KnowledgeGraph(db_path).init()
+    store = ExecutionStore(db_path)
+    yield store
+    await store.close()
+    await close_databases()
+
+
+@pytest.fixture(params=["sharded", "memory"])
+async def backend_store(request, tmp_path):
+    db_path = str(tmp_path / "specter.db")
+    if request.param == "sharded":
+        backend = ShardedSQLiteBackend(db_path, shards=3)
+    else:
+        backend = MemoryBackend()
+    store = ExecutionStore(db_path, backend=backend)
+    await store.init()
+    yield store
+    await store.close()
+    await backend.close()
+    await close_databases()
+
+
+async def test_execution_roundtrip(store):
+    exec_id = await store.create_execution("u1", "say hi", {"nodes": []})
+    await store.complete_execution(exec_id, {"ok": True})
+    record = await store.get_execution(exec_id)
+    assert record["status"] == "completed"
+    assert record["result"] == {"ok": True}
+    assert [e["id"] for e in await store.list_executions()] == [exec_id]
+
+
+async def test_pool_uses_wal_and_handles_concurrent_writes(store):
+    async with store.db.reader() as db:
+        cursor = await db.execute("PRAGMA journal_mode")
+        assert (await cursor.fetchone())[0] == "wal"
+    exec_id = await store.create_execution("u1", "audit", {"nodes": []})
+    await asyncio.gather(*(store.add_audit(exec_id, "tool_call", {"i": i}) for i in range(20)))
+    await store.flush_audit()
+    async with store.db.reader() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM audit_log")
+        assert (await cursor.fetchone())[0] == 20
+
+
+async def test_audit_rows_are_batched_and_flushed_on_close(store):
+    exec_id = await store.create_execution("u1", "audit", {"nodes": []})
+    for i in range(5):
+        await store.add_audit(exec_id, "tool_call", {"i": i})
+    await store.close()
+    async with store.db.reader() as db:
+        cursor = await db.execute("SELECT details FROM audit_log ORDER BY id")
+        rows = await cursor.fetchall()
+    assert [json.loads(r[0])["i"] for r in rows] == list(range(5))
+
+
+async def test_list_executions_keyset_pagination_and_filters(store):
+    ids = []
+    for i in range(5):
+        exec_id = await store.create_execution(f"u{i % 2}", f"deploy service {i}", {"nodes": []})
+        async with store.db.writer() as db:
+            await db.execute(
+                "UPDATE executions SET started_at = ? WHERE id = ?",
+                (f"2025-01-0{i + 1}T00:00:00", exec_id),
+            )
+        ids.append(exec_id)
+    first = await store.list_executions(limit=2)
+    second = await store.list_executions(limit=2, cursor=encode_cursor(first[-1]))
+    assert [e["id"] for e in first + second] == ids[::-1][:4]
+    assert [e["id"] for e in await store.list_executions(user_id="u0")] == ids[::-2]
+    assert len(await store.list_executions(since="2025-01-04")) == 2
+    assert [e["id"] for e in await store.list_executions(q="servi")] == ids[::-1]
+    assert await store.list_executions(q="rollback") == []
+
+
+async def test_retention_archives_old_executions_and_prunes_audit(store, tmp_path):
+    engine = RetentionEngine(
+        store.db, RetentionConfig(archive_dir=str(tmp_path / "archive"), batch_size=2)
+    )
+    store.retention_engines = [engine]
+    old_ids = [await store.create_execution("u1", f"old {i}", {"nodes": []}) for i in range(3)]
+    fresh_id = await store.create_execution("u1", "fresh", {"nodes": []})
+    for exec_id in old_ids:
+        await store.add_audit(exec_id, "tool_call", {})
+    await store.add_audit(fresh_id, "tool_call", {})
+    await store.add_node_runs(
+        old_ids[0], [NodeRun("n1", "tool", "echo", 1, "run", "completed", 0.0, 1.0, 2.0)]
+    )
+    await store.flush_audit()
+    async with store.db.writer() as db:
+        marks = ",".join("?" * len(old_ids))
+        await db.execute(
+            f"UPDATE executions SET started_at = '2020-01-15T00:00:00' WHERE id IN ({marks})",
+            old_ids,
+        )
+        await db.execute("UPDATE audit_log SET timestamp = '2020-01-15 00:00:00'")
+
+    stats = await store.run_retention()
+
+    assert stats["archived"] == 3
+    assert [p.name for p in engine.archives()] == ["specter_executions_2020_01.db"]
+    assert [e["id"] for e in await store.list_executions()] == [fresh_id]
+    assert await store.get_execution(old_ids[0]) is None
+    archived = await store.get_execution(old_ids[0], include_archived=True)
+    assert archived["intent"] == "old 0"
+    assert await store.get_node_runs(old_ids[0]) == []
+    runs = await store.get_node_runs(old_ids[0], include_archived=True)
+    assert [r["node_id"] for r in runs] == ["n1"]
+    async with store.db.reader() as db:
+        rows = await db.execute_fetchall("SELECT COUNT(*) FROM audit_log")
+    assert rows[0][0] == 0
+
+
+async def test_backends_route_executions_and_merge_history(backend_store):
+    store = backend_store
+    ids = {}
+    for i in range(6):
+        exec_id = await store.create_execution(f"user{i}", f"task {i}", {"nodes": []})
+        await store.add_audit(exec_id, "tool_call", {"i": i})
+        ids[exec_id] = f"user{i}"
+    await store.flush_audit()
+    for exec_id, user_id in ids.items():
+        assert store.backend.for_execution(exec_id) is store.backend.for_user(user_id)
+        assert (await store.get_execution(exec_id))["user_id"] == user_id
+    listed = await store.list_executions(limit=10)
+    assert sorted(e["id"] for e in listed) == sorted(ids)
+    assert listed == sorted(listed, key=lambda e: (e["started_at"], e["id"]), reverse=True)
+    assert [e["id"] for e in await store.list_executions(user_id="user3")] == [
+        i for i, u in ids.items() if u == "user3"
+    ]
+    audit_rows = 0
+    for db in store.backend.databases():
+        async with db.reader() as conn:
+            audit_rows += (await conn.execute_fetchall("SELECT COUNT(*) FROM audit_log"))[0][0]
+    assert audit_rows == 6
+
+
+@pytest.mark.parametrize("codec", ["json", "zjson"])
+def test_payload_codecs_roundtrip_and_read_legacy_rows(codec):
+    value = {"results": {"n1": {"text": "é/ok", "n": [1, 2.5, None]}}}
+    encoded = encode_payload(value, codec)
+    assert isinstance(encoded, str) == (codec == "json")
+    assert loads(encoded) == value
+    assert loads(json.dumps(value)) == value
+
+
+def test_loads_reads_legacy_non_finite_floats():
+    value = loads(json.dumps({"x": float("nan"), "y": float("inf")}))
+    assert value["x"] != value["x"] and value["y"] == float("inf")
+
+
+def test_dumps_encodes_integers_beyond_64_bits():
+    assert dumps({"n": 2**70, "s": "é/ok"}) == f'{{"n":{2**70},"s":"é/ok"}}'
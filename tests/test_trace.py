@@ -0,0 +1,100 @@
+import pytest
+
+from specter.brain.orchestrator import Orchestrator
+from specter.core.backends import MemoryBackend
+from specter.core.security import ToolPolicy
+from specter.graph.executor import StreamingExecutor
+from specter.graph.models import ExecutionGraph, Node
+from specter.graph.trace import ExecutionTrace, build_timeline
+from specter.healing.engine import HealingEngine
+from specter.skills.manager import SkillManager
+from specter.storage import ExecutionStore
+
+
+class NullCallback:
+    async def on_node_start(self, node, progress): ...
+
+    async def on_node_output(self, node, result, progress): ...
+
+    async def on_node_error(self, node, error, progress): ...
+
+    async def on_healing_failed(self, node, fix, progress): ...
+
+    async def on_complete(self, result): ...
+
+
+def _run(node_id, queued, started, ended, node_type="tool"):
+    return {
+        "node_id": node_id,
+        "node_type": node_type,
+        "attempt": 1,
+        "queued_ms": queued,
+        "started_ms": started,
+        "ended_ms": ended,
+    }
+
+
+def test_timeline_critical_path_idle_and_parallelism():
+    runs = [
+        _run("a", 0, 0, 10),
+        _run("b", 0, 0, 30, node_type="llm"),
+        _run("c", 35, 40, 50),
+    ]
+    timeline = build_timeline(runs, {"c": ["a", "b"]})
+    assert [step["node_id"] for step in timeline["critical_path"]] == ["b", "c"]
+    assert timeline["critical_path"][-1]["scheduler_delay_ms"] == 10
+    assert timeline["makespan_ms"] == 50
+    assert timeline["idle_ms"] == 10
+    assert timeline["parallelism"] == {"average": 1.0, "max": 2}
+    assert timeline["time_by_type"] == {"tool": 20, "llm": 30}
+
+
+async def test_executor_records_one_run_per_node():
+    graph = ExecutionGraph(
+        nodes=[
+            Node(
+                id="one",
+                type="tool",
+                spec={"tool_name": "calculate", "params": {"expression": "1+1"}},
+            ),
+            Node(
+                id="two",
+                type="tool",
+                spec={"tool_name": "calculate", "params": {"expression": "2*3"}},
+                deps=["one"],
+            ),
+        ]
+    )
+    executor = StreamingExecutor(SkillManager(), HealingEngine(), ToolPolicy(set(), set()))
+    trace = ExecutionTrace()
+    await executor.execute(graph, NullCallback(), trace=trace)
+    assert [(r.node_id, r.phase, r.status) for r in trace.runs] == [
+        ("one", "run", "completed"),
+        ("two", "run", "completed"),
+    ]
+    assert trace.runs[1].started_ms >= trace.runs[0].ended_ms
+
+
+async def test_orchestrator_keeps_the_node_error_when_trace_write_fails(monkeypatch):
+    store = ExecutionStore(":memory:", backend=MemoryBackend())
+    await store.init()
+    orchestrator = Orchestrator(store, ToolPolicy(set(), set()))
+
+    async def compile(user_input, context):
+        return ExecutionGraph(nodes=[])
+
+    async def execute(graph, callback, audit=None, trace=None):
+        raise ValueError("node bad failed")
+
+    async def broken(exec_id, runs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(orchestrator.compiler, "compile", compile)
+    monkeypatch.setattr(orchestrator.executor, "execute", execute)
+    monkeypatch.setattr(store, "add_node_runs", broken)
+    try:
+        with pytest.raises(ValueError, match="node bad failed"):
+            await orchestrator.run("do it", {}, NullCallback())
+    finally:
+        await store.close()
+        await store.backend.close()
@@ -2,11 +2,13 @@ import { NextResponse } from "next/server";
 
 const backendUrl = process.env.BACKEND_URL ?? "http://127.0.0.1:8000";
 
-export async function GET() {
+export async function GET(request: Request) {
+  const url = new URL(request.url);
   const controller = new AbortController();
   const timeout = setTimeout(() => controller.abort(), 5000);
   try {
-    const resp = await fetch(`${backendUrl}/executions`, {
+    const query = url.searchParams.toString();
+    const resp = await fetch(`${backendUrl}/executions${query ? `?${query}` : ""}`, {
       cache: "no-store",
       signal: controller.signal
     });
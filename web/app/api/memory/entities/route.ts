@@ -8,15 +8,17 @@ export async function GET(request: Request) {
   const type = url.searchParams.get("type") ?? "";
   const limit = url.searchParams.get("limit") ?? "20";
   const includeRelations = url.searchParams.get("include_relations") ?? "false";
+  const relationNames = url.searchParams.get("relation_names") ?? "";
   const userId = url.searchParams.get("user_id") ?? "";
   const controller = new AbortController();
   const timeout = setTimeout(() => controller.abort(), 5000);
   try {
     const params = new URLSearchParams();
-    if (query) params.set("q", query);
+    if (query) params.set("search", query);
     if (type && type !== "all") params.set("ent_type", type);
     params.set("limit", limit);
     params.set("include_relations", includeRelations);
+    if (relationNames) params.set("relation_names", relationNames);
     if (userId) params.set("user_id", userId);
     const resp = await fetch(
       `${backendUrl}/knowledge/entities/list?${params.toString()}`,